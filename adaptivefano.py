@@ -0,0 +1,246 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bitbuffer import BitBuffer, Bits, as_bitbuffer
+from cache import normalize_code_table
+from codetable import CodeTable, code_words, words_to_bits
+from fanoshannon import FanoShannon
+from huffman import canonical_codes
+from utils import byte_histogram
+
+DEFAULT_BLOCK_SIZE = 1 << 16
+# On the wire a table is a 256-bit presence bitmap plus one length byte per symbol present
+TABLE_BITMAP_BYTES = 32
+
+def table_cost(counts: np.ndarray) -> int:
+    return 8 * (TABLE_BITMAP_BYTES + int(np.count_nonzero(counts)))
+
+def coded_bits(lengths: np.ndarray, counts: np.ndarray) -> float:
+    # A table that lacks a symbol of the block cannot code it at all
+    if np.any(counts[lengths == 0]):
+        return float('inf')
+    return float(np.dot(lengths, counts))
+
+class BlockCodeTable:
+    def __init__(self, code_lengths: List[Dict], selectors: List[int], block_size: int, context: bool):
+        self.code_lengths = [normalize_code_table(lengths) for lengths in code_lengths]
+        self.selectors = [int(selector) for selector in selectors]
+        self.block_size = block_size
+        self.context = bool(context)
+        # Codes are rebuilt canonically from the Fano lengths, so only the lengths need to be sent
+        self.tables = [canonical_codes(lengths) for lengths in self.code_lengths]
+
+    def canonical(self) -> str:
+        tables = ';'.join(
+            ','.join(f"{symbol}:{length}" for symbol, length in sorted(lengths.items()))
+            for lengths in self.code_lengths
+        )
+        return f"{self.block_size}|{int(self.context)}|{tables}|{','.join(map(str, self.selectors))}"
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+class AdaptiveFano(FanoShannon):
+    name = 'adaptive-fano'
+    model_parameter = 'block_model'
+    prefix_code = False
+    context = False
+
+    def __init__(self, symbol_size: int = 1, block_size: int = DEFAULT_BLOCK_SIZE):
+        if symbol_size != 1:
+            raise ValueError("Adaptive Fano-Shannon coding supports 1-byte symbols only")
+        if block_size <= 0:
+            raise ValueError("Block size must be positive")
+        super().__init__(symbol_size)
+        self.block_size = block_size
+
+    def _code_lengths(self, counts: np.ndarray) -> np.ndarray:
+        symbols_freq = {int(symbol): int(counts[symbol]) for symbol in np.flatnonzero(counts)}
+        lengths = np.zeros(self.alphabet_size, dtype=np.int64)
+        for symbol, (_, length) in self._build_fano_code_pairs(symbols_freq).items():
+            lengths[symbol] = length
+        return lengths
+
+    def _block_model(self, symbols: np.ndarray, histogram: np.ndarray) -> Tuple[list, list, int]:
+        # Table 0 is the order-0 table of the whole input; a block gets its own table only
+        # when the bits it saves pay for sending it, otherwise it reuses the previous or global one
+        tables = [self._code_lengths(histogram)]
+        selectors = []
+        total_bits = 0
+        current = 0
+        for start in range(0, len(symbols), self.block_size):
+            counts = byte_histogram(symbols[start:start + self.block_size])
+            costs = {0: coded_bits(tables[0], counts), current: coded_bits(tables[current], counts)}
+            best = min(costs, key=costs.get)
+            lengths = self._code_lengths(counts)
+            own_bits = coded_bits(lengths, counts)
+            if own_bits + table_cost(counts) < costs[best]:
+                tables.append(lengths)
+                best = len(tables) - 1
+                costs[best] = own_bits
+            selectors.append(best)
+            total_bits += int(costs[best])
+            current = best
+        return tables, selectors, total_bits
+
+    def _context_counts(self, symbols: np.ndarray) -> np.ndarray:
+        pairs = np.zeros(self.alphabet_size * self.alphabet_size, dtype=np.int64)
+        previous = 0
+        for start in range(0, len(symbols), self.block_size):
+            chunk = symbols[start:start + self.block_size].astype(np.int64)
+            contexts = np.empty_like(chunk)
+            contexts[0] = previous
+            contexts[1:] = chunk[:-1]
+            pairs += np.bincount(contexts * self.alphabet_size + chunk, minlength=len(pairs))
+            previous = chunk[-1]
+        return pairs.reshape(self.alphabet_size, self.alphabet_size)
+
+    def _context_model(self, symbols: np.ndarray, histogram: np.ndarray) -> Tuple[list, list, int]:
+        # Order-1: the previous byte picks the table; contexts whose own table would not pay
+        # for itself share the order-0 table 0. The first byte is coded in context 0
+        tables = [self._code_lengths(histogram)]
+        selectors = [0] * self.alphabet_size
+        total_bits = 0
+        pairs = self._context_counts(symbols)
+        for context in np.flatnonzero(pairs.sum(axis=1)):
+            counts = pairs[context]
+            shared_bits = coded_bits(tables[0], counts)
+            lengths = self._code_lengths(counts)
+            own_bits = coded_bits(lengths, counts)
+            if own_bits + table_cost(counts) < shared_bits:
+                selectors[context] = len(tables)
+                tables.append(lengths)
+                total_bits += int(own_bits)
+            else:
+                total_bits += int(shared_bits)
+        return tables, selectors, total_bits
+
+    def _encode_blocks(self, symbols: np.ndarray, code_table: BlockCodeTable, total_bits: int) -> BitBuffer:
+        words = code_words(total_bits)
+        base = 0
+        if code_table.context:
+            # One table over every (context table, symbol) pair; the key picks the row
+            table = CodeTable.concat([CodeTable.from_dict(codes) for codes in code_table.tables])
+            selectors = np.array(code_table.selectors, dtype=np.int64)
+            previous = 0
+            for start in range(0, len(symbols), self.block_size):
+                chunk = symbols[start:start + self.block_size].astype(np.int64)
+                contexts = np.empty_like(chunk)
+                contexts[0] = previous
+                contexts[1:] = chunk[:-1]
+                base = table.pack(words, selectors[contexts] * self.alphabet_size + chunk, base)
+                previous = chunk[-1]
+            return words_to_bits(words, total_bits)
+
+        tables = {}
+        for index, start in enumerate(range(0, len(symbols), code_table.block_size)):
+            selector = code_table.selectors[index]
+            if selector not in tables:
+                tables[selector] = CodeTable.from_dict(code_table.tables[selector])
+            base = tables[selector].pack(words, symbols[start:start + code_table.block_size], base)
+        return words_to_bits(words, total_bits)
+
+    def export_model(self, code_table: BlockCodeTable) -> Dict:
+        return {
+            'block_size': code_table.block_size,
+            'context': code_table.context,
+            'code_lengths': code_table.code_lengths,
+            'selectors': code_table.selectors
+        }
+
+    def import_model(self, model: Dict) -> BlockCodeTable:
+        return BlockCodeTable(model['code_lengths'], model['selectors'], model['block_size'], model['context'])
+
+    def compress(self, data: bytes, packed: bool = False, histogram=None) -> Tuple[Bits, BlockCodeTable]:
+        if not data:
+            return (BitBuffer() if packed else ''), BlockCodeTable([], [], self.block_size, self.context)
+
+        symbols = self._symbols(data)
+        histogram = byte_histogram(data) if histogram is None else np.asarray(histogram)
+        build = self._context_model if self.context else self._block_model
+        tables, selectors, total_bits = build(symbols, histogram)
+
+        self.sync_points = []
+        self.code_table = BlockCodeTable(
+            [{int(symbol): int(lengths[symbol]) for symbol in np.flatnonzero(lengths)} for lengths in tables],
+            selectors, self.block_size, self.context
+        )
+        compressed_bits = self._encode_blocks(symbols, self.code_table, total_bits)
+        return (compressed_bits if packed else compressed_bits.to_str()), self.code_table
+
+    def _decode_blocks(self, compressed_bits: BitBuffer, code_table: BlockCodeTable) -> bytearray:
+        result = bytearray()
+        roots = {}
+        position = 0
+        last = len(code_table.selectors) - 1
+        for index, selector in enumerate(code_table.selectors):
+            codes = code_table.tables[selector]
+            if selector not in roots:
+                roots[selector] = (self.build_decode_table(codes), max(len(code) for code in codes.values()))
+            root, max_length = roots[selector]
+            # Only a block's worth of bits is sliced off, so unaligned starts stay cheap
+            if index == last:
+                symbols, consumed = self._decode_symbols(root, compressed_bits[position:])
+            else:
+                window = compressed_bits[position:position + code_table.block_size * max_length]
+                symbols, consumed = self._decode_symbols(root, window, code_table.block_size)
+            result += symbols
+            position += consumed
+        return result
+
+    def _decode_context(self, compressed_bits: BitBuffer, code_table: BlockCodeTable) -> bytearray:
+        roots = [self.build_decode_table(codes) for codes in code_table.tables]
+        context_roots = [roots[selector] for selector in code_table.selectors]
+        data = compressed_bits.to_bytes() + bytes(8)
+        remaining = len(compressed_bits)
+
+        result = bytearray()
+        accumulator = 0
+        available = 0
+        position = 0
+        previous = 0
+
+        while remaining > 0:
+            table, width = context_roots[previous]
+            while True:
+                while available < width:
+                    accumulator = (accumulator << 8) | data[position]
+                    position += 1
+                    available += 8
+
+                entry = table[(accumulator >> (available - width)) & ((1 << width) - 1)]
+                if entry is None or entry[1] > remaining:
+                    print(f"Warning: Incomplete code at end of compressed data ({remaining} bits)")
+                    return result
+
+                symbol, length, subtable = entry
+                available -= length
+                remaining -= length
+                if subtable is None:
+                    break
+                table, width = subtable
+
+            result.append(symbol)
+            previous = symbol
+            accumulator &= (1 << available) - 1
+
+        return result
+
+    def decompress(self, compressed_bits: Bits, code_table: BlockCodeTable, original_size: int = None) -> bytes:
+        if not compressed_bits or not code_table:
+            return b''
+
+        compressed_bits = as_bitbuffer(compressed_bits)
+        if code_table.context:
+            result = self._decode_context(compressed_bits, code_table)
+        else:
+            result = self._decode_blocks(compressed_bits, code_table)
+
+        if original_size is not None:
+            result = result[:original_size]
+        return bytes(result)
+
+class ContextFano(AdaptiveFano):
+    name = 'context-fano'
+    context = True
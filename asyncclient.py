@@ -0,0 +1,125 @@
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import requests
+from client import CompressionClient
+from utils import check_mime_type
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+class AsyncCompressionClient:
+    def __init__(self, client: CompressionClient = None, max_in_flight: int = None, **options):
+        self.client = client or CompressionClient(**options)
+        self.max_in_flight = max_in_flight or self.client.max_in_flight
+        if aiohttp is None:
+            print("aiohttp is not installed, uploading through the pooled requests session in threads")
+
+    def prepare(self, file_path: str, error_percentage: float):
+        message = self.client.process_image(file_path, error_percentage)
+        body, headers = self.client.encode_request(message)
+        return message, body, headers
+
+    def _session(self):
+        if aiohttp is None:
+            return contextlib.nullcontext()
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_in_flight))
+
+    async def _post(self, http, io_executor: ThreadPoolExecutor, body, headers: dict):
+        url = f"{self.client.server_url}/decode"
+        if aiohttp is None:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                io_executor, partial(self.client.http.post, url, data=body, headers=headers, timeout=30)
+            )
+            return response.status_code, response.json() if response.status_code == 200 else response.text
+
+        async with http.post(url, data=body, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if response.status == 200:
+                return response.status, await response.json()
+            return response.status, await response.text()
+
+    async def _upload(self, http, io_executor: ThreadPoolExecutor, slots: asyncio.Semaphore,
+                      message: dict, body, headers: dict):
+        connection_errors = (requests.exceptions.RequestException, asyncio.TimeoutError)
+        if aiohttp is not None:
+            connection_errors += (aiohttp.ClientError,)
+        try:
+            try:
+                status, reply = await self._post(http, io_executor, body, headers)
+            except connection_errors as e:
+                print(f"Connection error: {e}")
+                self.client.drop_frames(message)
+                return None
+
+            if status != 200:
+                print(f"Server error: {status}")
+                print(reply)
+                self.client.drop_frames(message)
+                return None
+
+            # Retransmissions and code-table resends are rare and go through the blocking client
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(io_executor, self.client.handle_result, message, reply)
+        finally:
+            slots.release()
+
+    async def run(self, paths, error_percentage: float = 0.0):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        uploads = {}
+
+        start_time = time.perf_counter()
+        # A single thread keeps the CPU stages in order while uploads wait on the network;
+        # both pools are shut down when the run ends, whether it finishes or fails
+        with ThreadPoolExecutor(max_workers=1) as cpu_executor, \
+                ThreadPoolExecutor(max_workers=self.max_in_flight) as io_executor:
+            async with self._session() as http:
+                try:
+                    for index, file_path in enumerate(paths):
+                        try:
+                            message, body, headers = await loop.run_in_executor(
+                                cpu_executor, self.prepare, file_path, error_percentage
+                            )
+                        except (ValueError, FileNotFoundError) as e:
+                            print(f"Skipping {file_path}: {e}")
+                            continue
+
+                        # Image k uploads while image k+1 is compressed; waiting for a free slot
+                        # stops compression from running more than max_in_flight images ahead
+                        await slots.acquire()
+                        uploads[index] = asyncio.create_task(
+                            self._upload(http, io_executor, slots, message, body, headers)
+                        )
+
+                    replies = await asyncio.gather(*uploads.values())
+                finally:
+                    # Uploads still running after a failure must not outlive their executor
+                    for upload in uploads.values():
+                        upload.cancel()
+        elapsed = time.perf_counter() - start_time
+
+        results = [None] * len(paths)
+        for index, reply in zip(uploads, replies):
+            results[index] = reply
+
+        # Throughput counts only images the server decoded, so failed uploads do not inflate it
+        decoded = sum(1 for result in results if result and result.get('success'))
+        matched = sum(1 for result in results if result and result.get('sha256_match'))
+        if paths:
+            print(f"Decoded {decoded} of {len(paths)} images in {elapsed:.2f}s ({decoded / elapsed:.1f} images/s), "
+                  f"{matched} with matching SHA256")
+        return results
+
+    def run_dir(self, directory: str, error_percentage: float = 0.0):
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if os.path.isfile(os.path.join(directory, name)) and check_mime_type(os.path.join(directory, name))
+        )
+        print(f"Found {len(paths)} images in {directory}")
+        return asyncio.run(self.run(paths, error_percentage))
@@ -0,0 +1,919 @@
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import struct
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+import requests
+
+from asyncclient import AsyncCompressionClient
+from bitbuffer import BitBuffer, BitWriter
+from channel import ChannelSimulator
+from channelcoding import AdaptiveCodeSelector, create_channel_coder
+from client import CompressionClient
+from codetable import CodeTable
+from coding import OrthogonalCoding
+from interleaver import BlockInterleaver
+from protocol import MODELS, pack_message, unpack_message
+from fanoshannon import FanoShannon
+from sourcecoding import SOURCE_CODERS, create_source_coder
+from utils import (
+    add_errors, analyze_bytes, calculate_entropy, calculate_sha256, bytes_to_bits, bits_to_bytes, transform_from_base64,
+    bits_to_bytes_with_padding, bytes_to_bits_with_unpadding
+)
+
+def time_call(func: Callable, *args, repeat: int = 3) -> Tuple[float, object]:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def measure(func: Callable, *args) -> Tuple[float, int, object]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def _measure_rss(func: Callable, args: tuple, seed: int) -> Tuple[float, int, object]:
+    random.seed(seed)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    return elapsed, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * 1024, result
+
+def measure_process(func: Callable, *args, seed: int = 0) -> Tuple[float, int, object]:
+    # Peak resident memory of a fresh process; tracemalloc's own record of millions of small
+    # objects can outgrow the memory it measures on multi-megabyte inputs
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_measure_rss, func, args, seed).result()
+
+def synthetic_image(size: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(128, 24, size), 0, 255).astype(np.uint8).tobytes()
+
+def sylvester_codewords(n: int) -> np.ndarray:
+    # Reference codewords from the recursive Sylvester construction, independent of coding.py
+    H = np.array([[1]])
+    for _ in range(n):
+        H = np.block([[H, H], [H, -H]])
+    return ((H + 1) // 2).astype(np.uint8)
+
+def loop_decode(coder: OrthogonalCoding, encoded_bits: str, parameters: dict) -> Tuple[str, int]:
+    # The original decoder: correlate each received block with every codeword, one row at a time
+    codewords = sylvester_codewords(coder.n)
+    decoded_bits = ''
+    total_errors = 0
+    for i in range(0, len(encoded_bits), coder.code_length):
+        received = np.array([int(b) for b in encoded_bits[i:i+coder.code_length]])
+        correlations = []
+        for codeword in codewords:
+            correlations.append(np.sum(received == codeword))
+        best_match = int(np.argmax(correlations))
+        decoded_bits += format(best_match, f'0{coder.n}b')
+        total_errors += int(np.sum(received != codewords[best_match]))
+    return decoded_bits[:parameters['original_length']], total_errors
+
+def bench_hadamard_decode(num_blocks: int = 2000, error_percentage: float = 10.0, seed: int = 0) -> dict:
+    random.seed(seed)
+    coder = OrthogonalCoding(n=7)
+    data_bits = ''.join(random.choice('01') for _ in range(num_blocks * coder.n))
+    encoded_bits, parameters = coder.encode(data_bits)
+    received_bits, _ = add_errors(encoded_bits, error_percentage)
+
+    loop_time, loop_result = time_call(loop_decode, coder, received_bits, parameters, repeat=1)
+    fwht_time, fwht_result = time_call(coder.decode, received_bits, parameters)
+
+    result = {
+        'blocks': num_blocks,
+        'error_percentage': error_percentage,
+        'loop_seconds': loop_time,
+        'fwht_seconds': fwht_time,
+        'speedup': loop_time / fwht_time,
+        'identical': loop_result == fwht_result,
+    }
+
+    print(f"Hadamard decode of {num_blocks} blocks ({error_percentage}% errors)")
+    print(f"  loop: {loop_time:.4f}s  fwht: {fwht_time:.4f}s  speedup: {result['speedup']:.1f}x")
+    print(f"  identical results: {result['identical']}")
+
+    return result
+
+def bit_pipeline(data: bytes, error_percentage: float, packed: bool) -> bytes:
+    coder = OrthogonalCoding(n=7)
+    compressed_bits, _ = FanoShannon().compress(data, packed=packed)
+    padded_bits = bytes_to_bits(bits_to_bytes_with_padding(compressed_bits), packed=packed)
+    encoded_bits, parameters = coder.encode(padded_bits)
+    error_bits, _ = add_errors(encoded_bits, error_percentage)
+    received_bits = bytes_to_bits(bits_to_bytes(error_bits), packed=packed)
+    decoded_bits, _ = coder.decode(received_bits, parameters)
+    return bytes_to_bits_with_unpadding(bits_to_bytes(decoded_bits), packed=packed)
+
+def bench_bit_pipeline(size: int = 1 << 21, error_percentage: float = 1.0, seed: int = 0) -> dict:
+    # The target is a 10x gain in both time and peak memory on a multi-megabyte image
+    data = synthetic_image(size, seed)
+
+    str_time, str_peak, str_bits = measure_process(bit_pipeline, data, error_percentage, False, seed=seed)
+    packed_time, packed_peak, packed_bits = measure_process(bit_pipeline, data, error_percentage, True, seed=seed)
+
+    result = {
+        'size': size,
+        'error_percentage': error_percentage,
+        'str_seconds': str_time,
+        'packed_seconds': packed_time,
+        'str_peak_bytes': str_peak,
+        'packed_peak_bytes': packed_peak,
+        'speedup': str_time / packed_time,
+        'memory_reduction': str_peak / packed_peak,
+        'identical': packed_bits == str_bits,
+    }
+    result['target_met'] = result['speedup'] >= 10 and result['memory_reduction'] >= 10
+
+    print(f"Bit pipeline on {size} bytes ({error_percentage}% errors)")
+    print(f"  str:    {str_time:.4f}s  peak {str_peak / 2**20:.1f} MiB")
+    print(f"  packed: {packed_time:.4f}s  peak {packed_peak / 2**20:.1f} MiB")
+    print(f"  speedup: {result['speedup']:.1f}x  memory reduction: {result['memory_reduction']:.1f}x  "
+          f"10x target met: {result['target_met']}")
+    print(f"  identical results: {result['identical']}")
+
+    return result
+
+def bench_fano_decompress(size: int = 1 << 18, seed: int = 0) -> dict:
+    data = synthetic_image(size, seed)
+    fano_shannon = FanoShannon()
+    compressed_bits, code_table = fano_shannon.compress(data, packed=True)
+    compressed_str = compressed_bits.to_str()
+
+    str_time, str_result = time_call(fano_shannon.decompress, compressed_str, code_table, repeat=1)
+    table_time, table_result = time_call(fano_shannon.decompress, compressed_bits, code_table)
+
+    result = {
+        'size': size,
+        'str_seconds': str_time,
+        'table_seconds': table_time,
+        'speedup': str_time / table_time,
+        'identical': str_result == table_result == data,
+    }
+
+    print(f"Fano-Shannon decompress of {size} bytes")
+    print(f"  str: {str_time:.4f}s  table: {table_time:.4f}s  speedup: {result['speedup']:.1f}x")
+    print(f"  identical results: {result['identical']}")
+
+    return result
+
+def separate_analysis(data: bytes, coder: FanoShannon):
+    return calculate_sha256(data), calculate_entropy(data), coder.compress(data, True)
+
+def fused_analysis(data: bytes, coder: FanoShannon):
+    stats = analyze_bytes(data)
+    return stats.sha256, stats.entropy, coder.compress(data, True, histogram=stats.histogram)
+
+def bench_analysis(size: int = 1 << 22, seed: int = 0) -> dict:
+    data = synthetic_image(size, seed)
+    coder = FanoShannon()
+
+    separate_time, separate_result = time_call(separate_analysis, data, coder)
+    fused_time, fused_result = time_call(fused_analysis, data, coder)
+
+    result = {
+        'size': size,
+        'separate_seconds': separate_time,
+        'fused_seconds': fused_time,
+        'speedup': separate_time / fused_time,
+        'identical': separate_result[0] == fused_result[0]
+                     and abs(separate_result[1] - fused_result[1]) < 1e-9
+                     and separate_result[2][0] == fused_result[2][0],
+    }
+
+    print(f"SHA256 + entropy + Fano-Shannon compress of {size} bytes")
+    print(f"  separate passes: {separate_time:.4f}s  fused histogram: {fused_time:.4f}s  "
+          f"speedup: {result['speedup']:.2f}x")
+    print(f"  identical results: {result['identical']}")
+
+    return result
+
+def string_encode(data: bytes, code_table: dict) -> BitBuffer:
+    return BitBuffer.from_str(''.join(code_table[byte] for byte in data))
+
+def matrix_encode(data: bytes, code_table: dict, chunk_size: int = 1 << 16) -> BitBuffer:
+    # The previous packed encoder: one row of bits per symbol, gathered and masked per chunk
+    max_length = max(len(code) for code in code_table.values())
+    code_bits = np.zeros((256, max_length), dtype=np.uint8)
+    code_lengths = np.zeros(256, dtype=np.int64)
+    for symbol, code in code_table.items():
+        code_bits[symbol, :len(code)] = np.frombuffer(code.encode('ascii'), dtype=np.uint8) - ord('0')
+        code_lengths[symbol] = len(code)
+    valid = np.arange(max_length) < code_lengths[:, None]
+    symbols = np.frombuffer(data, dtype=np.uint8)
+
+    writer = BitWriter()
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        writer.write(code_bits[chunk][valid[chunk]])
+    return writer.getvalue()
+
+def table_encode(data: bytes, code_table: dict) -> BitBuffer:
+    return CodeTable.from_dict(code_table).encode(np.frombuffer(data, dtype=np.uint8))[0]
+
+def dict_table_size(code_table: dict) -> int:
+    # The earlier wire format: a count, then symbol, length and whole code bytes per entry
+    return 4 + sum(2 + (len(code) + 7) // 8 for code in code_table.values())
+
+def bench_code_table(size: int = 1 << 22, images=('images/linkedin.png', 'images/volume.png'), seed: int = 0) -> list:
+    inputs = [('synthetic', synthetic_image(size, seed)), ('raster', synthetic_raster(1024, 1024, 'pgm', seed))]
+    for path in images:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                inputs.append((os.path.basename(path), f.read()))
+
+    results = []
+    print("Fano-Shannon encode throughput, dict lookups vs bit matrix vs array code table")
+    for label, data in inputs:
+        coder = FanoShannon()
+        code_table = coder.build_code_table(coder._count_symbols(data))
+        table = CodeTable.from_dict(code_table)
+        megabytes = len(data) / (1 << 20)
+
+        string_time, string_bits = time_call(string_encode, data, code_table)
+        matrix_time, matrix_bits = time_call(matrix_encode, data, code_table)
+        table_time, table_bits = time_call(table_encode, data, code_table)
+        compress_time, _ = time_call(coder.compress, data, True)
+
+        result = {
+            'input': label,
+            'size': len(data),
+            'string_mb_s': megabytes / string_time,
+            'matrix_mb_s': megabytes / matrix_time,
+            'table_mb_s': megabytes / table_time,
+            'compress_mb_s': megabytes / compress_time,
+            'identical': string_bits == matrix_bits == table_bits,
+            'dict_table_bytes': dict_table_size(code_table),
+            'packed_table_bytes': len(table.to_bytes()),
+            'lengths_table_bytes': len(table.to_bytes(lengths_only=True)),
+        }
+        results.append(result)
+
+        print(f"  {label:>12} {len(data):>9} B  string {result['string_mb_s']:6.1f} MB/s  "
+              f"matrix {result['matrix_mb_s']:6.1f} MB/s  table {result['table_mb_s']:6.1f} MB/s  "
+              f"compress {result['compress_mb_s']:6.1f} MB/s  identical: {result['identical']}")
+        print(f"  {'':>12} table on the wire: {result['dict_table_bytes']} B per entry, "
+              f"{result['packed_table_bytes']} B packed, {result['lengths_table_bytes']} B lengths only")
+
+    return results
+
+def synthetic_raster(width: int, height: int, image_format: str, seed: int = 0) -> bytes:
+    # Smooth gradients with mild noise, laid out as an uncompressed BMP, binary PPM or grayscale PGM
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    channels = [
+        128 + 100 * np.sin(x / (17 + 9 * c)) * np.cos(y / (23 + 5 * c)) + rng.normal(0, 2, (height, width))
+        for c in range(1 if image_format == 'pgm' else 3)
+    ]
+    pixels = np.clip(np.stack(channels, axis=-1), 0, 255).astype(np.uint8)
+    if image_format in ('ppm', 'pgm'):
+        magic = 'P5' if image_format == 'pgm' else 'P6'
+        return f"{magic} {width} {height} 255\n".encode('ascii') + pixels.tobytes()
+
+    row_size = (3 * width + 3) // 4 * 4
+    rows = np.zeros((height, row_size), dtype=np.uint8)
+    rows[:, :3 * width] = pixels[::-1, :, ::-1].reshape(height, -1)
+    header = b'BM' + struct.pack('<IHHI', 54 + rows.size, 0, 0, 54)
+    info = struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0, rows.size, 2835, 2835, 0, 0)
+    return header + info + rows.tobytes()
+
+def bench_adaptive_fano(images=('images/linkedin.png', 'images/volume.png'), raster_size: int = 512,
+                        seed: int = 0) -> list:
+    inputs = []
+    for path in images:
+        with open(path, 'rb') as f:
+            inputs.append((path, f.read()))
+    for image_format in ('bmp', 'ppm', 'pgm'):
+        inputs.append((f"synthetic.{image_format}", synthetic_raster(raster_size, raster_size, image_format, seed)))
+
+    results = []
+    print("Fano-Shannon bits/byte (model included): single table vs per-block tables vs order-1 contexts")
+    for name, data in inputs:
+        result = {'input': name, 'size': len(data)}
+        for algorithm in ('fano-shannon', 'adaptive-fano', 'context-fano'):
+            coder = create_source_coder(algorithm)
+            encode_time, (compressed_bits, code_table) = time_call(coder.compress, data, True, repeat=1)
+            _, serialize, _ = MODELS[algorithm]
+            model_bytes = len(serialize(coder.export_model(code_table)))
+            decoded = coder.decompress(compressed_bits, code_table, len(data))
+            result[algorithm] = {
+                'bits_per_byte': (len(compressed_bits) + 8 * model_bytes) / len(data),
+                'model_bytes': model_bytes,
+                'tables': len(code_table) if algorithm != 'fano-shannon' else 1,
+                'encode_seconds': encode_time,
+                'identical': decoded == data,
+            }
+        results.append(result)
+
+        print(f"  {name} ({len(data)} bytes): " + ", ".join(
+            f"{algorithm} {result[algorithm]['bits_per_byte']:.3f} "
+            f"({result[algorithm]['tables']} tables, {result[algorithm]['model_bytes']} B model)"
+            for algorithm in ('fano-shannon', 'adaptive-fano', 'context-fano')
+        ))
+        print(f"    identical: {all(result[algorithm]['identical'] for algorithm in ('fano-shannon', 'adaptive-fano', 'context-fano'))}")
+
+    return results
+
+def bench_source_coders(size: int = 1 << 18, images=('images/linkedin.png', 'images/volume.png'),
+                        seed: int = 0) -> list:
+    inputs = [(f"synthetic-{size}", synthetic_image(size, seed))]
+    for path in images:
+        with open(path, 'rb') as f:
+            inputs.append((path, f.read()))
+
+    results = []
+    for name, data in inputs:
+        entropy = calculate_entropy(data)
+        print(f"Source coders on {name} ({len(data)} bytes, entropy {entropy:.4f} bits/symbol)")
+        for algorithm in SOURCE_CODERS:
+            coder = create_source_coder(algorithm)
+            encode_time, (compressed_bits, code_table) = time_call(coder.compress, data, True)
+            decode_time, decoded = time_call(coder.decompress, compressed_bits, code_table, len(data))
+            model = coder.export_model(code_table)
+            _, serialize, _ = MODELS[algorithm]
+
+            result = {
+                'input': name,
+                'algorithm': algorithm,
+                'size': len(data),
+                'entropy': entropy,
+                'bits_per_symbol': len(compressed_bits) / len(data),
+                'redundancy': len(compressed_bits) / len(data) - entropy,
+                'model_json_bytes': len(json.dumps(model)),
+                'model_binary_bytes': len(serialize(model)),
+                'encode_mb_per_second': len(data) / encode_time / 1e6,
+                'decode_mb_per_second': len(data) / decode_time / 1e6,
+                'identical': decoded == data,
+            }
+            results.append(result)
+
+            print(f"  {algorithm:>12}: {result['bits_per_symbol']:.4f} bits/symbol "
+                  f"(+{result['redundancy']:.4f}), model {result['model_binary_bytes']} B binary / "
+                  f"{result['model_json_bytes']} B JSON, encode {result['encode_mb_per_second']:.1f} MB/s, "
+                  f"decode {result['decode_mb_per_second']:.1f} MB/s, identical: {result['identical']}")
+
+    return results
+
+def bench_channel_codes(num_bits: int = 1 << 16, error_percentages=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0),
+                        seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    data = BitBuffer.from_array(rng.integers(0, 2, num_bits, dtype=np.uint8))
+    original = data.to_array()
+
+    results = []
+    print(f"Channel codes on {num_bits} random bits (BSC)")
+    for name, options in AdaptiveCodeSelector.CANDIDATES:
+        coder = create_channel_coder(name, **options)
+        label = name + ''.join(f" {key}={value}" for key, value in options.items())
+        encode_time, (encoded_bits, parameters) = time_call(coder.encode, data)
+
+        for error_percentage in error_percentages:
+            received, num_errors = ChannelSimulator(seed).apply(encoded_bits, error_percentage, 'bsc')
+            with contextlib.redirect_stdout(io.StringIO()):
+                decode_time, (decoded_bits, _) = time_call(coder.decode, received, parameters, repeat=1)
+            residual = np.count_nonzero(decoded_bits.to_array() != original)
+
+            result = {
+                'code': label,
+                'rate': coder.rate,
+                'error_percentage': error_percentage,
+                'channel_errors': num_errors,
+                'residual_ber': residual / num_bits,
+                'estimated_block_error': coder.estimated_block_error(error_percentage / 100),
+                'encode_mbit_per_second': num_bits / encode_time / 1e6,
+                'decode_mbit_per_second': num_bits / decode_time / 1e6,
+            }
+            results.append(result)
+
+            print(f"  {label:>26} rate {coder.rate:.3f} at {error_percentage:>4}%: residual BER "
+                  f"{result['residual_ber']:.2e}, encode {result['encode_mbit_per_second']:.1f} Mbit/s, "
+                  f"decode {result['decode_mbit_per_second']:.2f} Mbit/s")
+
+    return results
+
+def bench_code_dimension(num_bits: int = 1 << 13, dimensions=(3, 5, 7, 9, 12, 16),
+                         error_percentages=(1.0, 5.0, 10.0, 20.0), seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    data = BitBuffer.from_array(rng.integers(0, 2, num_bits, dtype=np.uint8))
+    original = data.to_array()
+
+    results = []
+    print(f"Orthogonal code dimension on {num_bits} random bits (BSC): rate against correction and memory")
+    for n in dimensions:
+        coder = OrthogonalCoding(n=n)
+        encode_time, (encoded_bits, parameters) = time_call(coder.encode, data)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, peak, _ = measure(lambda: coder.decode(coder.encode(data)[0], parameters))
+
+        residuals = {}
+        for error_percentage in error_percentages:
+            received, _ = ChannelSimulator(seed).apply(encoded_bits, error_percentage, 'bsc')
+            with contextlib.redirect_stdout(io.StringIO()):
+                decode_time, (decoded_bits, _) = time_call(coder.decode, received, parameters, repeat=1)
+            residuals[error_percentage] = np.count_nonzero(decoded_bits.to_array() != original) / num_bits
+
+        result = {
+            'n': n,
+            'code_length': coder.code_length,
+            'rate': coder.rate,
+            'correctable_errors': coder.code_length // 4 - 1,
+            'residual_ber': residuals,
+            'encode_mbit_per_second': num_bits / encode_time / 1e6,
+            'decode_mbit_per_second': num_bits / decode_time / 1e6,
+            'peak_bytes': peak,
+            'encoded_bytes': len(encoded_bits) // 8,
+            'dense_matrix_bytes': 8 * coder.code_length ** 2,
+        }
+        results.append(result)
+
+        print(f"  n={n:>2} rate {coder.rate:.5f}, corrects {result['correctable_errors']} of {coder.code_length} bits, "
+              f"encode {result['encode_mbit_per_second']:.2f} Mbit/s, decode {result['decode_mbit_per_second']:.3f} Mbit/s")
+        print("       residual BER " + ', '.join(f"{value:.1e} at {key}%" for key, value in residuals.items()))
+        print(f"       peak {peak / 1e6:.2f} MB for {result['encoded_bytes'] / 1e6:.2f} MB encoded "
+              f"(a dense matrix alone would be {result['dense_matrix_bytes'] / 1e6:.3g} MB)")
+
+    return results
+
+def bench_soft_decoding(num_blocks: int = 4096, snrs_db=(-10.0, -12.0, -14.0), erasure_rate: float = 0.2,
+                        seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    coder = OrthogonalCoding(n=7)
+    data = BitBuffer.from_array(rng.integers(0, 2, num_blocks * coder.n, dtype=np.uint8))
+    encoded_bits, parameters = coder.encode(data)
+    original = data.to_array().reshape(-1, coder.n)
+
+    def block_errors(decoded_bits):
+        return np.any(decoded_bits.to_array().reshape(-1, coder.n) != original, axis=1)
+
+    results = []
+    print(f"Soft-decision decoding of {num_blocks} Walsh-Hadamard blocks (AWGN)")
+    for snr_db in snrs_db:
+        channel = ChannelSimulator(seed)
+        samples = channel.awgn(encoded_bits, snr_db)
+        hard_bits = BitBuffer.from_array((samples > 0).astype(np.uint8))
+        _, erasures = channel.erasure(encoded_bits, erasure_rate)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            hard_time, (hard_decoded, _) = time_call(coder.decode, hard_bits, parameters)
+        soft_time, (soft_decoded, margins) = time_call(coder.decode_soft, samples, parameters)
+        _, (erased_decoded, _) = time_call(coder.decode_soft, samples, parameters, erasures, repeat=1)
+
+        soft_failed = block_errors(soft_decoded)
+        # Flag the tenth of blocks with the smallest margins and see how many failures that catches
+        flagged = margins <= np.quantile(margins, 0.1)
+        result = {
+            'snr_db': snr_db,
+            'hard_block_error_rate': float(block_errors(hard_decoded).mean()),
+            'soft_block_error_rate': float(soft_failed.mean()),
+            'soft_with_erasures_block_error_rate': float(block_errors(erased_decoded).mean()),
+            'erasure_rate': erasure_rate,
+            'failures_flagged': int(np.count_nonzero(soft_failed & flagged)),
+            'failures': int(np.count_nonzero(soft_failed)),
+            'hard_seconds': hard_time,
+            'soft_seconds': soft_time,
+        }
+        results.append(result)
+
+        print(f"  {snr_db:>6} dB: block error hard {result['hard_block_error_rate']:.2e}, "
+              f"soft {result['soft_block_error_rate']:.2e}, soft with {erasure_rate:.0%} erasures "
+              f"{result['soft_with_erasures_block_error_rate']:.2e}; lowest-margin 10% flags "
+              f"{result['failures_flagged']}/{result['failures']} failures; "
+              f"hard {hard_time:.4f}s soft {soft_time:.4f}s")
+
+    return results
+
+def bench_interleaver(num_bits: int = 1 << 16, error_percentages=(1.0, 2.0, 5.0), depths=(0, 4, 16, 64),
+                      codes=(('orthogonal', {}), ('reed-muller', {'m': 5}), ('convolutional', {'rate': '1/2'})),
+                      burst_length: float = 64.0, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    data = BitBuffer.from_array(rng.integers(0, 2, num_bits, dtype=np.uint8))
+    original = data.to_array()
+
+    results = []
+    print(f"Block interleaver on {num_bits} random bits (burst channel, mean burst {burst_length:.0f} bits)")
+    for name, options in codes:
+        coder = create_channel_coder(name, **options)
+        label = name + ''.join(f" {key}={value}" for key, value in options.items())
+        encoded_bits, parameters = coder.encode(data)
+
+        for depth in depths:
+            interleaver = BlockInterleaver.for_coder(coder, depth) if depth else None
+            interleave_time, transmitted = time_call(interleaver.interleave, encoded_bits) if interleaver else (0.0, encoded_bits)
+
+            for error_percentage in error_percentages:
+                received, num_errors = ChannelSimulator(seed, burst_length).apply(transmitted, error_percentage, 'burst')
+                if interleaver:
+                    received = interleaver.deinterleave(received)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    decoded_bits, _ = coder.decode(received, parameters)
+                residual = np.count_nonzero(decoded_bits.to_array() != original)
+
+                result = {
+                    'code': label,
+                    'depth': depth,
+                    'error_percentage': error_percentage,
+                    'channel_errors': num_errors,
+                    'residual_ber': residual / num_bits,
+                    'interleave_mbit_per_second': len(encoded_bits) / interleave_time / 1e6 if interleave_time else None,
+                }
+                results.append(result)
+
+                throughput = (f", interleave {result['interleave_mbit_per_second']:.0f} Mbit/s"
+                              if interleaver else "")
+                print(f"  {label:>24} depth {depth:>3} at {error_percentage:>4}%: residual BER "
+                      f"{result['residual_ber']:.2e}{throughput}")
+
+    return results
+
+def parse_json_message(body: str) -> bytes:
+    return transform_from_base64(json.loads(body)['encoded_message'])
+
+def parse_binary_message(body: bytes) -> bytes:
+    return unpack_message(body)['payload']
+
+def bench_wire_format(file_path: str = 'images/volume.png', error_percentage: float = 5.0, seed: int = 0) -> dict:
+    messages = {}
+    for wire_format in ('json', 'binary'):
+        client = CompressionClient(wire_format=wire_format, seed=seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            messages[wire_format] = client.process_image(file_path, error_percentage)
+
+    json_body = json.dumps(messages['json'])
+    binary_body = pack_message(messages['binary'])
+
+    json_time, json_payload = time_call(parse_json_message, json_body, repeat=5)
+    binary_time, binary_payload = time_call(parse_binary_message, binary_body, repeat=5)
+
+    result = {
+        'file': file_path,
+        'json_bytes': len(json_body),
+        'binary_bytes': len(binary_body),
+        'size_ratio': len(json_body) / len(binary_body),
+        'json_parse_seconds': json_time,
+        'binary_parse_seconds': binary_time,
+        'identical': bytes(binary_payload) == json_payload,
+    }
+
+    print(f"Wire format for {file_path}")
+    print(f"  json: {len(json_body)} bytes, parse {json_time * 1000:.3f}ms")
+    print(f"  binary: {len(binary_body)} bytes, parse {binary_time * 1000:.3f}ms")
+    print(f"  size ratio: {result['size_ratio']:.2f}x  identical payload: {result['identical']}")
+
+    return result
+
+def bench_parallel_decode(size: int = 1 << 20, error_percentage: float = 1.0,
+                          workers: Tuple[int, ...] = (1, 2, 4, 8), seed: int = 0) -> dict:
+    from server import CompressionServer
+
+    with tempfile.NamedTemporaryFile(suffix='.bmp', delete=False) as f:
+        f.write(synthetic_image(size, seed))
+        file_path = f.name
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = CompressionClient(wire_format='binary', seed=seed, frame_bits=0)
+            message = client.process_image(file_path, error_percentage)
+    finally:
+        os.remove(file_path)
+
+    timings = {}
+    print(f"Parallel decode of {size} bytes ({error_percentage}% errors)")
+    for count in workers:
+        server = CompressionServer(workers=count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.decode_message(message)
+            elapsed, response = time_call(server.decode_message, message)
+        server.close()
+        timings[count] = elapsed
+        print(f"  {count} workers: {elapsed:.4f}s  speedup {timings[workers[0]] / elapsed:.2f}x  "
+              f"sha256 match: {response['sha256_match']}")
+
+    speedup = {count: timings[workers[0]] / elapsed for count, elapsed in timings.items()}
+    return {'size': size, 'error_percentage': error_percentage, 'seconds': timings, 'speedup': speedup}
+
+def load_test(server_url: str = "http://localhost:5000", file_path: str = 'images/volume.png',
+              num_requests: int = 100, concurrency: int = 8, error_percentage: float = 1.0,
+              wire_format: str = 'binary') -> dict:
+    client = CompressionClient(server_url, wire_format=wire_format)
+    with contextlib.redirect_stdout(io.StringIO()):
+        message = client.process_image(file_path, error_percentage)
+    body, headers = client.encode_request(message)
+    sessions = threading.local()
+
+    def send(_):
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = sessions.session.post(f"{server_url}/decode", data=body, headers=headers, timeout=120)
+            ok = response.status_code == 200 and response.json().get('sha256_match', False)
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(num_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in results])
+    result = {
+        'server_url': server_url,
+        'file': file_path,
+        'requests': num_requests,
+        'concurrency': concurrency,
+        'failures': sum(1 for _, ok in results if not ok),
+        'requests_per_second': num_requests / elapsed,
+        'p50_seconds': float(np.percentile(latencies, 50)),
+        'p99_seconds': float(np.percentile(latencies, 99)),
+    }
+
+    print(f"Load test against {server_url} ({num_requests} requests, concurrency {concurrency})")
+    print(f"  {result['requests_per_second']:.1f} req/s  p50 {result['p50_seconds'] * 1000:.1f}ms  "
+          f"p99 {result['p99_seconds'] * 1000:.1f}ms  failures {result['failures']}")
+
+    return result
+
+def bit_error_rate(original: bytes, decoded: bytes) -> float:
+    if not original:
+        return 0.0
+    expected = np.frombuffer(original, dtype=np.uint8)
+    received = np.zeros(len(expected), dtype=np.uint8)
+    overlap = min(len(expected), len(decoded))
+    received[:overlap] = np.frombuffer(decoded, dtype=np.uint8, count=overlap)
+    errors = int(np.unpackbits(expected ^ received).sum()) + 8 * max(0, len(decoded) - len(original))
+    return errors / (8 * len(original))
+
+@contextlib.contextmanager
+def local_server():
+    from werkzeug.serving import make_server
+    from server import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    httpd = make_server('localhost', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://localhost:{httpd.server_port}"
+    finally:
+        httpd.shutdown()
+
+@contextlib.contextmanager
+def pipeline_inputs(sizes, images, seed: int = 0):
+    inputs = [(path, path) for path in images]
+    temporary = []
+    try:
+        for size in sizes:
+            with tempfile.NamedTemporaryFile(suffix='.bmp', delete=False) as f:
+                f.write(synthetic_image(size, seed))
+                temporary.append(f.name)
+            inputs.append((f"synthetic-{size}", f.name))
+        yield inputs
+    finally:
+        for path in temporary:
+            os.remove(path)
+
+def bench_memory(sizes=(1 << 20, 1 << 22), error_percentage: float = 1.0, seed: int = 0) -> list:
+    results = []
+    print("Client peak traced memory relative to the encoded payload (binary wire format, up to the request body)")
+    with pipeline_inputs(sizes, (), seed) as inputs:
+        for name, path in inputs:
+            client = CompressionClient(wire_format='binary', seed=seed)
+
+            def prepare():
+                message = client.process_image(path, error_percentage)
+                body, _ = client.encode_request(message)
+                return message, len(body)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, peak, (message, body_bytes) = measure(prepare)
+            encoded_bytes = message['payload_bits'] // 8
+
+            result = {
+                'input': name,
+                'size': os.path.getsize(path),
+                'encoded_bytes': encoded_bytes,
+                'body_bytes': body_bytes,
+                'peak_bytes': peak,
+                'peak_to_encoded': peak / encoded_bytes,
+                'seconds': elapsed,
+            }
+            results.append(result)
+            print(f"  {name}: encoded {encoded_bytes / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB "
+                  f"({result['peak_to_encoded']:.2f}x encoded), {elapsed:.2f}s")
+
+    return results
+
+def bench_pipeline(sizes=(1 << 16, 1 << 18), images=('images/linkedin.png', 'images/volume.png'),
+                   error_percentages=(0.0, 5.0, 10.0, 20.0), trials: int = 1, http: bool = False,
+                   wire_format: str = 'binary', seed: int = 0) -> list:
+    from server import CompressionServer
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        inputs = stack.enter_context(pipeline_inputs(sizes, images, seed))
+        server_url = stack.enter_context(local_server()) if http else None
+        server = CompressionServer()
+
+        for name, path in inputs:
+            with open(path, 'rb') as f:
+                original = f.read()
+
+            for error_percentage in error_percentages:
+                runs = []
+                for trial in range(trials):
+                    # One-shot decoding: no frame checksums, so failed frames show up as BER
+                    client = CompressionClient(server_url or "http://localhost:5000",
+                                               wire_format=wire_format, seed=seed + trial, frame_bits=0)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        client_time, client_peak, message = measure(client.process_image, path, error_percentage)
+                        server_time, server_peak, response = measure(server.decode_message, message, True)
+                        http_time, http_response = time_call(client.send_to_server, message, repeat=1) if http else (None, None)
+
+                    stages = {
+                        'process_image': {'seconds': client_time, 'peak_bytes': client_peak},
+                        'decode_message': {'seconds': server_time, 'peak_bytes': server_peak},
+                    }
+                    if http:
+                        stages['http'] = {
+                            'seconds': http_time,
+                            'sha256_match': bool(http_response and http_response.get('sha256_match'))
+                        }
+
+                    runs.append({
+                        'stages': stages,
+                        'errors': message['errors'],
+                        'ber': bit_error_rate(original, response.get('decompressed_data', b'')),
+                        'sha256_match': response.get('sha256_match', False),
+                        'compressed_length': message['parameters']['compressed_length'],
+                        'payload_bits': message.get('payload_bits'),
+                    })
+
+                first = runs[0]
+                bits_per_byte = first['compressed_length'] / len(original)
+                result = {
+                    'input': name,
+                    'size': len(original),
+                    'error_percentage': error_percentage,
+                    'trials': trials,
+                    'entropy': message['entropy'],
+                    'bits_per_byte': bits_per_byte,
+                    'compression_ratio': 8 / bits_per_byte,
+                    'entropy_efficiency': message['entropy'] / bits_per_byte,
+                    'payload_bits': first['payload_bits'],
+                    'errors': [run['errors'] for run in runs],
+                    'ber': sum(run['ber'] for run in runs) / trials,
+                    'sha256_success_rate': sum(run['sha256_match'] for run in runs) / trials,
+                    'stages': {
+                        stage: {
+                            key: sum(run['stages'][stage][key] for run in runs) / trials
+                            for key in first['stages'][stage]
+                        }
+                        for stage in first['stages']
+                    }
+                }
+                results.append(result)
+
+                print(f"{name} ({len(original)} bytes) at {error_percentage}% errors: "
+                      f"{bits_per_byte:.3f} bits/byte (entropy {message['entropy']:.3f}), "
+                      f"BER {result['ber']:.2e}, SHA256 success {result['sha256_success_rate']:.0%}, "
+                      f"client {result['stages']['process_image']['seconds']:.3f}s, "
+                      f"server {result['stages']['decode_message']['seconds']:.3f}s")
+
+    return results
+
+def bench_batch(num_images: int = 64, size: int = 1 << 12, batch_size: int = 8, max_in_flight: int = 4,
+                error_percentage: float = 1.0, wire_format: str = 'binary', seed: int = 0) -> dict:
+    paths = []
+    try:
+        for index in range(num_images):
+            with tempfile.NamedTemporaryFile(suffix='.bmp', delete=False) as f:
+                f.write(synthetic_image(size, seed + index))
+                paths.append(f.name)
+
+        with local_server() as server_url:
+            def new_client():
+                return CompressionClient(server_url, wire_format=wire_format, seed=seed, max_in_flight=max_in_flight)
+
+            client = new_client()
+            with contextlib.redirect_stdout(io.StringIO()):
+                messages = [client.process_image(path, error_percentage) for path in paths]
+            bodies = [client.encode_request(message) for message in messages]
+
+            def fresh_connections():
+                return [requests.post(f"{server_url}/decode", data=body, headers=headers, timeout=120).json()
+                        for body, headers in bodies]
+
+            def pooled():
+                return [client.send_to_server(message) for message in messages]
+
+            def batched():
+                return [result for start in range(0, len(messages), batch_size)
+                        for result in client.send_batch(messages[start:start + batch_size])]
+
+            def sequential_run():
+                sequential = new_client()
+                return [sequential.send_to_server(sequential.process_image(path, error_percentage)) for path in paths]
+
+            def run_many():
+                return new_client().run_many(paths, error_percentage, batch_size)
+
+            def async_client():
+                return asyncio.run(AsyncCompressionClient(new_client()).run(paths, error_percentage))
+
+            results = {}
+            print(f"Sending {num_images} images of {size} bytes ({wire_format}, batches of {batch_size}, "
+                  f"{max_in_flight} in flight)")
+            for name, func in (('fresh_connections', fresh_connections), ('pooled_session', pooled),
+                               ('decode_batch', batched), ('sequential_run', sequential_run),
+                               ('run_many', run_many), ('async_client', async_client)):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    elapsed, replies = time_call(func, repeat=1)
+                results[name] = {
+                    'seconds': elapsed,
+                    'images_per_second': num_images / elapsed,
+                    'sha256_matches': sum(1 for reply in replies if reply and reply.get('sha256_match')),
+                }
+                print(f"  {name:>18}: {results[name]['images_per_second']:.1f} images/s, "
+                      f"{results[name]['sha256_matches']}/{num_images} SHA256 matches")
+            return results
+    finally:
+        for path in paths:
+            os.remove(path)
+
+def bench_retransmission(file_path: str = 'images/volume.png', error_percentages=(0.01, 0.02, 0.05, 0.1),
+                         frame_bits: int = 1 << 11, seed: int = 0) -> list:
+    results = []
+    print(f"Selective retransmission of {frame_bits}-bit frames (burst channel, over HTTP)")
+    with local_server() as server_url:
+        for error_percentage in error_percentages:
+            client = CompressionClient(server_url, wire_format='binary', channel_model='burst',
+                                       seed=seed, frame_bits=frame_bits)
+            with contextlib.redirect_stdout(io.StringIO()):
+                message = client.process_image(file_path, error_percentage)
+                body, _ = client.encode_request(message)
+                elapsed, result = time_call(client.send_to_server, message, repeat=1)
+
+            frame_count = len(message['parameters']['encoding_params']['frame_crcs'])
+            retransmitted = result.get('retransmitted_frames', 0)
+            result = {
+                'error_percentage': error_percentage,
+                'frames': frame_count,
+                'retransmitted_frames': retransmitted,
+                'retransmitted_fraction': retransmitted / frame_count,
+                'message_bytes': len(body),
+                'sha256_match': bool(result.get('sha256_match')),
+                'seconds': elapsed,
+            }
+            results.append(result)
+
+            print(f"  {error_percentage:>5}%: resent {retransmitted}/{frame_count} frames "
+                  f"({result['retransmitted_fraction']:.1%} of a {len(body)} B message), "
+                  f"SHA256 match: {result['sha256_match']}, {elapsed:.3f}s")
+
+    return results
+
+def main() -> dict:
+    return {
+        'hadamard_decode': bench_hadamard_decode(),
+        'bit_pipeline': bench_bit_pipeline(),
+        'fano_decompress': bench_fano_decompress(),
+        'analysis': bench_analysis(),
+        'code_table': bench_code_table(),
+        'wire_format': bench_wire_format(),
+        'source_coders': bench_source_coders(),
+        'adaptive_fano': bench_adaptive_fano(),
+        'channel_codes': bench_channel_codes(),
+        'code_dimension': bench_code_dimension(),
+        'parallel_decode': bench_parallel_decode(),
+        'soft_decoding': bench_soft_decoding(),
+        'interleaver': bench_interleaver(),
+        'retransmission': bench_retransmission(),
+        'batch': bench_batch(),
+        'memory': bench_memory(),
+    }
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import numpy as np
+from typing import Iterable, Union
+
+class BitBuffer:
+    def __init__(self, packed=b'', length: int = None):
+        self.packed = np.frombuffer(packed, dtype=np.uint8) if isinstance(packed, (bytes, bytearray, memoryview)) else np.asarray(packed, dtype=np.uint8)
+        self.length = len(self.packed) * 8 if length is None else length
+        if self.length > len(self.packed) * 8:
+            raise ValueError("Bit length exceeds the packed buffer size")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BitBuffer':
+        return cls(data)
+
+    @classmethod
+    def from_array(cls, bits: np.ndarray) -> 'BitBuffer':
+        bits = np.asarray(bits, dtype=np.uint8).reshape(-1)
+        return cls(np.packbits(bits), len(bits))
+
+    @classmethod
+    def from_str(cls, bits: str) -> 'BitBuffer':
+        return cls.from_array(np.frombuffer(bits.encode('ascii'), dtype=np.uint8) - ord('0'))
+
+    @classmethod
+    def concat(cls, buffers: Iterable['BitBuffer']) -> 'BitBuffer':
+        writer = BitWriter()
+        for buffer in buffers:
+            writer.write_buffer(buffer)
+        return writer.getvalue()
+
+    def to_array(self) -> np.ndarray:
+        return np.unpackbits(self.packed, count=self.length)
+
+    def to_str(self) -> str:
+        return (self.to_array() + ord('0')).tobytes().decode('ascii')
+
+    def to_bytes(self) -> bytes:
+        num_bytes = (self.length + 7) // 8
+        data = self.packed[:num_bytes].copy()
+        tail = self.length % 8
+        if tail:
+            data[-1] &= (0xFF << (8 - tail)) & 0xFF
+        return data.tobytes()
+
+    def to_memoryview(self) -> memoryview:
+        # Whole-byte buffers are exposed as they are; only a partial last byte needs a masked copy
+        if self.length % 8:
+            return memoryview(self.to_bytes())
+        return memoryview(self.packed[:self.length // 8])
+
+    def pad_to_multiple(self, multiple: int) -> 'BitBuffer':
+        padding_needed = (multiple - self.length % multiple) % multiple
+        if padding_needed == 0:
+            return self
+        total = self.length + padding_needed
+        packed = np.zeros((total + 7) // 8, dtype=np.uint8)
+        packed[:(self.length + 7) // 8] = np.frombuffer(self.to_bytes(), dtype=np.uint8)
+        return BitBuffer(packed, total)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            if index < 0:
+                index += self.length
+            if not 0 <= index < self.length:
+                raise IndexError("BitBuffer index out of range")
+            return int((self.packed[index >> 3] >> (7 - (index & 7))) & 1)
+
+        start, stop, step = index.indices(self.length)
+        if step != 1:
+            return BitBuffer.from_array(self.to_array()[index])
+        stop = max(start, stop)
+        if start % 8 == 0:
+            return BitBuffer(self.packed[start // 8:(stop + 7) // 8], stop - start)
+        first, last = start // 8, (stop + 7) // 8
+        bits = np.unpackbits(self.packed[first:last])[start - first * 8:stop - first * 8]
+        return BitBuffer.from_array(bits)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, str):
+            other = BitBuffer.from_str(other)
+        if not isinstance(other, BitBuffer):
+            return NotImplemented
+        return self.length == other.length and self.to_bytes() == other.to_bytes()
+
+    def __str__(self) -> str:
+        return self.to_str()
+
+    def __repr__(self) -> str:
+        return f"BitBuffer(length={self.length})"
+
+class BitWriter:
+    def __init__(self, capacity: int = None):
+        self.chunks = []
+        self.pending = np.zeros(0, dtype=np.uint8)
+        self.length = 0
+        # With a known output length, bytes go straight into one buffer instead of being concatenated at the end
+        self.buffer = None if capacity is None else np.empty((capacity + 7) // 8, dtype=np.uint8)
+        self.position = 0
+
+    def _append(self, packed: np.ndarray):
+        if self.buffer is None:
+            self.chunks.append(packed)
+            return
+        end = self.position + len(packed)
+        if end > len(self.buffer):
+            raise ValueError("BitWriter capacity exceeded")
+        self.buffer[self.position:end] = packed
+        self.position = end
+
+    def write(self, bits: np.ndarray):
+        bits = np.asarray(bits, dtype=np.uint8).reshape(-1)
+        self.length += len(bits)
+        if len(self.pending):
+            bits = np.concatenate((self.pending, bits))
+        aligned = len(bits) - len(bits) % 8
+        if aligned:
+            self._append(np.packbits(bits[:aligned]))
+        self.pending = bits[aligned:].copy()
+
+    def write_buffer(self, buffer: 'BitBuffer'):
+        if len(self.pending) == 0 and buffer.length % 8 == 0:
+            self._append(buffer.packed[:buffer.length // 8])
+            self.length += buffer.length
+        else:
+            self.write(buffer.to_array())
+
+    def getvalue(self) -> BitBuffer:
+        if self.buffer is not None:
+            tail = np.packbits(self.pending)
+            if self.position + len(tail) > len(self.buffer):
+                raise ValueError("BitWriter capacity exceeded")
+            self.buffer[self.position:self.position + len(tail)] = tail
+            return BitBuffer(self.buffer[:self.position + len(tail)], self.length)
+        chunks = self.chunks + [np.packbits(self.pending)] if len(self.pending) else self.chunks
+        packed = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint8)
+        return BitBuffer(packed, self.length)
+
+Bits = Union[str, BitBuffer]
+
+def as_bitbuffer(bits: Bits) -> BitBuffer:
+    if isinstance(bits, BitBuffer):
+        return bits
+    return BitBuffer.from_str(bits)
@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+class LRUCache:
+    def __init__(self, maxsize: int = 128):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        with self.lock:
+            return self.entries.pop(key, default)
+
+    def get_or_create(self, key: Hashable, factory: Callable):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+class ExpiringCache(LRUCache):
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.expired = 0
+
+    def _purge(self, now: float):
+        # Entries are kept in order of last use, so the expired ones are all at the front
+        while self.entries:
+            key, (touched, _) = next(iter(self.entries.items()))
+            if now - touched < self.ttl:
+                break
+            del self.entries[key]
+            self.expired += 1
+
+    def get(self, key: Hashable, default=None):
+        now = time.monotonic()
+        with self.lock:
+            self._purge(now)
+            if key in self.entries:
+                value = self.entries.pop(key)[1]
+                self.entries[key] = (now, value)
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value):
+        now = time.monotonic()
+        with self.lock:
+            self._purge(now)
+            self.entries.pop(key, None)
+            self.entries[key] = (now, value)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            self._purge(now)
+            return key in self.entries
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(ttl=self.ttl, expired=self.expired)
+        return stats
+
+# Bounded by the total size of the values as well as their number; a value larger than
+# the whole budget is not kept at all
+class SizedLRUCache(LRUCache):
+    def __init__(self, max_bytes: int, sizeof: Callable, maxsize: int = 128):
+        super().__init__(maxsize)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.sizes = {}
+        self.bytes = 0
+
+    def put(self, key: Hashable, value):
+        size = self.sizeof(value)
+        with self.lock:
+            self.bytes -= self.sizes.pop(key, 0)
+            self.entries.pop(key, None)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.bytes += size
+            while len(self.entries) > self.maxsize or self.bytes > self.max_bytes:
+                evicted, _ = self.entries.popitem(last=False)
+                self.bytes -= self.sizes.pop(evicted)
+
+    def pop(self, key: Hashable, default=None):
+        with self.lock:
+            self.bytes -= self.sizes.pop(key, 0)
+            return self.entries.pop(key, default)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        return stats
+
+_MISSING = object()
+
+def normalize_code_table(code_table: Dict) -> Dict[int, str]:
+    if code_table and isinstance(next(iter(code_table)), str):
+        return {int(k): v for k, v in code_table.items()}
+    return code_table
+
+def code_table_id(code_table: Dict) -> str:
+    # Models made of several tables (adaptive coders) provide their own canonical form
+    if hasattr(code_table, 'canonical'):
+        canonical = code_table.canonical()
+    else:
+        canonical = ','.join(f"{symbol}:{code}" for symbol, code in sorted(normalize_code_table(code_table).items()))
+    return hashlib.sha256(canonical.encode('ascii')).hexdigest()[:16]
@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Iterator, List, Sequence, Tuple
+
+from bitbuffer import BitBuffer, Bits, as_bitbuffer
+
+CHUNK_BITS = 1 << 20
+
+class ChannelSimulator:
+    MODELS = ('uniform', 'bsc', 'burst', 'erasure')
+
+    def __init__(self, seed: int = None, burst_length: float = 64.0, chunk_bits: int = CHUNK_BITS):
+        if chunk_bits % 8:
+            raise ValueError("Chunk size must be a multiple of 8 bits")
+        self.rng = np.random.default_rng(seed)
+        self.burst_length = burst_length
+        self.chunk_bits = chunk_bits
+
+    def _chunks(self, length: int) -> Iterator[Tuple[int, int]]:
+        for start in range(0, length, self.chunk_bits):
+            yield start, min(length, start + self.chunk_bits)
+
+    def _copy(self, bits: BitBuffer, out: np.ndarray = None) -> np.ndarray:
+        # The noisy copy is written into out when given, e.g. the payload area of a message being packed
+        source = np.frombuffer(bits.to_memoryview(), dtype=np.uint8)
+        if out is None:
+            return source.copy()
+        if len(out) != len(source):
+            raise ValueError("Output buffer must hold exactly the packed input bits")
+        out[:] = source
+        return out
+
+    def _unchanged(self, bits: BitBuffer, out: np.ndarray = None) -> Tuple[BitBuffer, int]:
+        if out is None:
+            return bits, 0
+        return BitBuffer(self._copy(bits, out), len(bits)), 0
+
+    def _apply_masks(self, bits: BitBuffer, masks: Iterator[np.ndarray], out: np.ndarray = None) -> Tuple[BitBuffer, int]:
+        packed = self._copy(bits, out)
+        flipped = 0
+        for (start, stop), mask in zip(self._chunks(len(bits)), masks):
+            packed[start // 8:(stop + 7) // 8] ^= np.packbits(mask)
+            flipped += int(np.count_nonzero(mask))
+        return BitBuffer(packed, len(bits)), flipped
+
+    def uniform(self, bits: BitBuffer, error_percentage: float, out: np.ndarray = None) -> Tuple[BitBuffer, int]:
+        num_errors = min(int(len(bits) * error_percentage / 100), len(bits))
+        sizes = np.array([stop - start for start, stop in self._chunks(len(bits))], dtype=np.int64)
+        if num_errors <= 0 or not len(sizes):
+            return self._unchanged(bits, out)
+
+        # Spread an exact error count over the chunks, then place each chunk's share uniformly
+        counts = self.rng.multivariate_hypergeometric(sizes, num_errors)
+
+        def masks():
+            for size, count in zip(sizes, counts):
+                mask = np.zeros(size, dtype=np.uint8)
+                mask[self.rng.choice(size, count, replace=False)] = 1
+                yield mask
+
+        return self._apply_masks(bits, masks(), out)
+
+    def binary_symmetric(self, bits: BitBuffer, probability: float, out: np.ndarray = None) -> Tuple[BitBuffer, int]:
+        if probability <= 0:
+            return self._unchanged(bits, out)
+
+        def masks():
+            for start, stop in self._chunks(len(bits)):
+                yield (self.rng.random(stop - start) < probability).astype(np.uint8)
+
+        return self._apply_masks(bits, masks(), out)
+
+    def _burst_states(self, length: int, p_good_to_bad: float, p_bad_to_good: float) -> Iterator[np.ndarray]:
+        bad = False
+        remaining = int(self.rng.geometric(p_good_to_bad))
+        for start, stop in self._chunks(length):
+            size = stop - start
+            states = []
+            filled = 0
+            while filled < size:
+                take = min(remaining, size - filled)
+                states.append(np.full(take, bad, dtype=bool))
+                filled += take
+                remaining -= take
+                if remaining == 0:
+                    bad = not bad
+                    remaining = int(self.rng.geometric(p_bad_to_good if bad else p_good_to_bad))
+            yield np.concatenate(states)
+
+    def gilbert_elliott(self, bits: BitBuffer, p_good_to_bad: float, p_bad_to_good: float,
+                        error_good: float = 0.0, error_bad: float = 0.5, out: np.ndarray = None) -> Tuple[BitBuffer, int]:
+        if p_good_to_bad <= 0:
+            return self.binary_symmetric(bits, error_good, out)
+
+        def masks():
+            for states in self._burst_states(len(bits), p_good_to_bad, p_bad_to_good):
+                probabilities = np.where(states, error_bad, error_good)
+                yield (self.rng.random(len(states)) < probabilities).astype(np.uint8)
+
+        return self._apply_masks(bits, masks(), out)
+
+    def burst(self, bits: BitBuffer, error_percentage: float, error_bad: float = 0.5,
+              out: np.ndarray = None) -> Tuple[BitBuffer, int]:
+        bit_error_rate = error_percentage / 100
+        if bit_error_rate <= 0:
+            return self._unchanged(bits, out)
+        if bit_error_rate >= error_bad:
+            raise ValueError(f"Burst channel cannot exceed an error rate of {error_bad * 100}%")
+
+        # Stationary probability of the bad state that yields the requested mean error rate
+        p_bad_to_good = 1 / self.burst_length
+        bad_fraction = bit_error_rate / error_bad
+        p_good_to_bad = bad_fraction * p_bad_to_good / (1 - bad_fraction)
+        return self.gilbert_elliott(bits, p_good_to_bad, p_bad_to_good, 0.0, error_bad, out)
+
+    def _erase(self, bits: BitBuffer, probability: float, out: np.ndarray = None) -> Tuple[BitBuffer, BitBuffer, int]:
+        packed = self._copy(bits, out)
+        erased = np.zeros(len(packed), dtype=np.uint8)
+        changed = 0
+        for start, stop in self._chunks(len(bits)):
+            mask = np.packbits(self.rng.random(stop - start) < probability)
+            erased[start // 8:(stop + 7) // 8] = mask
+            chunk = packed[start // 8:(stop + 7) // 8]
+            changed += int(np.unpackbits(chunk & mask).sum())
+            chunk &= ~mask
+        return BitBuffer(packed, len(bits)), BitBuffer(erased, len(bits)), changed
+
+    def erasure(self, bits: BitBuffer, probability: float, out: np.ndarray = None) -> Tuple[BitBuffer, BitBuffer]:
+        received, erased, _ = self._erase(bits, probability, out)
+        return received, erased
+
+    def awgn(self, bits: BitBuffer, snr_db: float) -> np.ndarray:
+        # BPSK with 1 -> +1 and 0 -> -1, unit symbol energy and noise at the given Es/N0
+        sigma = np.sqrt(1 / (2 * 10 ** (snr_db / 10)))
+        samples = np.empty(len(bits), dtype=np.float64)
+        for start, stop in self._chunks(len(bits)):
+            symbols = 2.0 * bits[start:stop].to_array() - 1.0
+            samples[start:stop] = symbols + self.rng.normal(0.0, sigma, stop - start)
+        return samples
+
+    def apply(self, bits: Bits, error_percentage: float, model: str = 'uniform',
+              out: np.ndarray = None) -> Tuple[Bits, int]:
+        if out is not None:
+            bits = as_bitbuffer(bits)
+        if not bits or error_percentage <= 0:
+            return self._unchanged(bits, out) if out is not None else (bits, 0)
+
+        buffer = as_bitbuffer(bits)
+        if model == 'uniform':
+            received, num_errors = self.uniform(buffer, error_percentage, out)
+        elif model == 'bsc':
+            received, num_errors = self.binary_symmetric(buffer, error_percentage / 100, out)
+        elif model == 'burst':
+            received, num_errors = self.burst(buffer, error_percentage, out=out)
+        elif model == 'erasure':
+            # Hard bits cannot mark an erasure, so erased bits arrive as 0 and only erased ones are errors
+            received, _, num_errors = self._erase(buffer, error_percentage / 100, out)
+        else:
+            raise ValueError(f"Unsupported channel model: {model}")
+
+        if isinstance(bits, str):
+            return received.to_str(), num_errors
+        return received, num_errors
+
+    def sweep(self, bits: Bits, error_percentages: Sequence[float], model: str = 'uniform') -> List[Tuple[float, Bits, int]]:
+        buffer = as_bitbuffer(bits)
+        results = []
+        for error_percentage in error_percentages:
+            received, num_errors = self.apply(buffer, error_percentage, model)
+            results.append((error_percentage, received, num_errors))
+        return results
@@ -0,0 +1,42 @@
+from coding import OrthogonalCoding
+from convolutional import ConvolutionalCoding
+from hamming import HammingCoding, SECDEDCoding
+from reedmuller import ReedMullerCoding
+
+CHANNEL_CODES = {coder.name: coder for coder in (
+    OrthogonalCoding, HammingCoding, SECDEDCoding, ReedMullerCoding, ConvolutionalCoding
+)}
+
+def create_channel_coder(name: str, **options):
+    if name not in CHANNEL_CODES:
+        raise ValueError(f"Unsupported encoding type: {name}")
+    return CHANNEL_CODES[name](**options)
+
+def channel_coder_from_parameters(name: str, parameters: dict):
+    if name not in CHANNEL_CODES:
+        raise ValueError(f"Unsupported encoding type: {name}")
+    return CHANNEL_CODES[name].from_parameters(parameters)
+
+class AdaptiveCodeSelector:
+    CANDIDATES = (
+        ('hamming', {}),
+        ('secded', {}),
+        ('convolutional', {'rate': '3/4'}),
+        ('convolutional', {'rate': '2/3'}),
+        ('convolutional', {'rate': '1/2'}),
+        ('reed-muller', {'m': 5}),
+        ('reed-muller', {'m': 7}),
+        ('orthogonal', {'n': 7})
+    )
+
+    def __init__(self, target_ber: float = 1e-6):
+        self.target_ber = target_ber
+        coders = [create_channel_coder(name, **options) for name, options in self.CANDIDATES]
+        self.coders = sorted(coders, key=lambda coder: coder.rate, reverse=True)
+
+    def select(self, error_rate: float):
+        # Highest-rate code whose estimated block error meets the target, else the most redundant one
+        for coder in self.coders:
+            if coder.estimated_block_error(error_rate) <= self.target_ber:
+                return coder
+        return self.coders[-1]
@@ -1,91 +1,445 @@
+import json
+import math
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
 import requests
-from fanoshannon import FanoShannon
-from coding import OrthogonalCoding
+from requests.adapters import HTTPAdapter
+from cache import LRUCache, SizedLRUCache, code_table_id
+from channel import ChannelSimulator
+from fanoshannon import code_table_cache
+from metrics import request_stages, span
+from channelcoding import AdaptiveCodeSelector, create_channel_coder
+from bitbuffer import BitBuffer
+from coding import OrthogonalCoding, hadamard_cache
+from integrity import DEFAULT_FRAME_BITS, frame_bits_for, frame_checksums, frame_spans
+from interleaver import BlockInterleaver
+from sourcecoding import create_source_coder, negotiate
+from protocol import (
+    BATCH_CONTENT_TYPE, BINARY_CONTENT_TYPE, JSON_CONTENT_TYPE, STREAM_CONTENT_TYPE, BinaryMessage, Message,
+    allocate_message, finish_message, pack_batch, pack_message, pack_stream_header, pack_stream_frame, pack_stream_trailer
+)
+from streaming import (
+    DEFAULT_CHUNK_SIZE, read_chunks, scan_chunks, compress_chunks,
+    align_chunks, encode_chunks, final_chunk_bits, interleave_chunks, add_errors_chunks, frame_chunks
+)
 from utils import (
-    check_mime_type, calculate_entropy, calculate_sha256,
-    bytes_to_bits, add_errors, transform_to_base64,
-    bits_to_bytes_with_padding
+    check_mime_type, analyze_bytes, map_file,
+    pad_bits, transform_to_base64
 )
 
 class CompressionClient:
-    def __init__(self, server_url="http://localhost:5000"):
+    def __init__(self, server_url="http://localhost:5000", symbol_size: int = 1,
+                 wire_format: str = "json", reuse_tables: bool = True,
+                 channel_model: str = "uniform", seed: int = None,
+                 compression: str = "fano-shannon", channel_code: str = "orthogonal",
+                 target_ber: float = 1e-6, interleave_depth: int = 0,
+                 frame_bits: int = DEFAULT_FRAME_BITS, max_retransmissions: int = 3,
+                 max_in_flight: int = 4, n: int = 7, max_held_bytes: int = 64 << 20):
+        if wire_format not in ("json", "binary"):
+            raise ValueError(f"Unsupported wire format: {wire_format}")
+        if channel_model not in ChannelSimulator.MODELS:
+            raise ValueError(f"Unsupported channel model: {channel_model}")
+        if interleave_depth < 0:
+            raise ValueError("Interleave depth cannot be negative")
         self.server_url = server_url
-        self.fano_shannon = FanoShannon()
-        self.walsh_hadamard = OrthogonalCoding(n=7)  # 128-bit blocks
+        self.wire_format = wire_format
+        self.symbol_size = symbol_size
+        self.source_coder = create_source_coder(compression, symbol_size)
+        self.walsh_hadamard = OrthogonalCoding(n=n)  # 2^n-bit blocks, 128 bits for n=7
+        if channel_code == "adaptive":
+            self.code_selector = AdaptiveCodeSelector(target_ber)
+            self.channel_coder = None
+        else:
+            self.code_selector = None
+            self.channel_coder = self.walsh_hadamard if channel_code == "orthogonal" else create_channel_coder(channel_code)
+        self.reuse_tables = reuse_tables
+        self.sent_tables = LRUCache(maxsize=64)
+        self.channel = ChannelSimulator(seed)
+        self.channel_model = channel_model
+        self.interleave_depth = interleave_depth
+        self.frame_bits = frame_bits
+        self.max_retransmissions = max_retransmissions
+        # Clean encoded bits of messages awaiting a reply, in case frames must be resent
+        self.sent_frames = SizedLRUCache(max_held_bytes, lambda entry: len(entry[1]) // 8, maxsize=64)
+        # One keep-alive connection pool for every request, sized for run_many's uploads
+        self.http = requests.Session()
+        self.http.mount('http://', HTTPAdapter(pool_maxsize=max_in_flight))
+        self.http.mount('https://', HTTPAdapter(pool_maxsize=max_in_flight))
+        self.max_in_flight = max_in_flight
+        self.last_stages = {}
+    
+    def cache_stats(self) -> dict:
+        return {
+            'sent_tables': self.sent_tables.stats(),
+            'sent_frames': self.sent_frames.stats(),
+            'code_tables': code_table_cache.stats(),
+            'hadamard_matrices': hadamard_cache.stats()
+        }
+    
+    def channel_coder_for(self, error_percentage: float):
+        if self.code_selector is None:
+            return self.channel_coder
+        coder = self.code_selector.select(error_percentage / 100)
+        print(f"Adaptive coding picked {coder.name} (rate {coder.rate:.3f}) for {error_percentage}% errors")
+        return coder
+    
+    def negotiate(self, preferences=None):
+        preferences = preferences or [self.source_coder.name]
+        try:
+            response = self.http.get(f"{self.server_url}/capabilities", timeout=10)
+            response.raise_for_status()
+            supported = response.json().get('compression_algorithms', [])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Capability negotiation failed, keeping {self.source_coder.name}: {e}")
+            return self.source_coder.name
+        
+        name = negotiate(preferences, supported)
+        if name != self.source_coder.name:
+            self.source_coder = create_source_coder(name, self.symbol_size)
+        print(f"Negotiated compression algorithm: {name}")
+        return name
     
     def process_image(self, file_path: str, error_percentage: float = 0.0):
+        return self.process_image_sweep(file_path, [error_percentage])[0]
+    
+    def process_image_sweep(self, file_path: str, error_percentages):
+        with request_stages() as stages:
+            messages = self._process_image_sweep(file_path, error_percentages)
+        self.last_stages = dict(stages)
+        return messages
+    
+    def _process_image_sweep(self, file_path: str, error_percentages):
         if not check_mime_type(file_path):
             raise ValueError("File is not an image based on MIME type")
         
         try:
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
+            with span('read') as stage:
+                image_data = map_file(file_path)
+                stage.set_bytes(len(image_data))
         except FileNotFoundError:
             raise FileNotFoundError(f"File {file_path} not found")
         
         print(f"Original file size: {len(image_data)} bytes")
         
-        original_sha256 = calculate_sha256(image_data)
-        original_entropy = calculate_entropy(image_data)
+        with span('analyze', len(image_data)):
+            stats = analyze_bytes(image_data)
+        original_sha256 = stats.sha256
+        original_entropy = stats.entropy
         
         print(f"Original SHA256: {original_sha256}")
         print(f"Original entropy: {original_entropy:.4f}")
         
-        compressed_bits, code_table = self.fano_shannon.compress(image_data)
-        print(f"Compressed to {len(compressed_bits)} bits")
-        
-        padded_bytes = bits_to_bytes_with_padding(compressed_bits, block_size=16)
+        with span('source_encode', len(image_data)):
+            histogram = stats.histogram if self.source_coder.symbol_size == 1 else None
+            compressed_bits, code_table = self.source_coder.compress(image_data, packed=True, histogram=histogram)
+        compressed_length = len(compressed_bits)
+        print(f"Compressed to {compressed_length} bits")
         
-        padded_bits = bytes_to_bits(padded_bytes)
+        with span('pad', compressed_length // 8):
+            padded_bits = pad_bits(compressed_bits, block_size=16)
+        del compressed_bits
         
-        encoded_bits, encoding_params = self.walsh_hadamard.encode(padded_bits)
         print(f"Padded bits length: {len(padded_bits)}")
-        print(f"Encoded to {len(encoded_bits)} bits")
-        print(f"Encoded length should be multiple of 128: {len(encoded_bits) % 128 == 0}")
         
-        error_bits, num_errors = add_errors(encoded_bits, error_percentage)
+        table_id = code_table_id(code_table)
+        model_parameter = self.source_coder.model_parameter
+        parameters = {
+            model_parameter: self.source_coder.export_model(code_table),
+            'code_table_id': table_id,
+            'compressed_length': compressed_length,
+            'symbol_size': self.source_coder.symbol_size,
+            'original_size': len(image_data)
+        }
+        if self.source_coder.sync_points:
+            parameters['sync_interval'] = self.source_coder.sync_interval
+            parameters['sync_points'] = self.source_coder.sync_points
         
-        if num_errors > 0:
-            print(f"Added {num_errors} errors ({error_percentage}%)")
+        referenced_model = None
+        if self.reuse_tables and self.sent_tables.get((self.source_coder.name, table_id)) is not None:
+            print(f"Referencing previously sent code table {table_id}")
+            referenced_model = parameters.pop(model_parameter)
         
-        while len(error_bits) % 8 != 0:
-            error_bits += '0'
+        # Error percentages that map to the same channel code share one encoding pass
+        plan = {}
+        for index, error_percentage in enumerate(error_percentages):
+            coder = self.channel_coder_for(error_percentage)
+            plan.setdefault(id(coder), (coder, []))[1].append((index, error_percentage))
         
-        error_bytes = []
-        for i in range(0, len(error_bits), 8):
-            byte_bits = error_bits[i:i+8]
-            error_bytes.append(int(byte_bits, 2))
+        messages = [None] * len(error_percentages)
+        for coder, targets in plan.values():
+            encoded_length = coder.encoded_length(len(padded_bits))
+            # A lone binary message is encoded chunk by chunk straight into its buffer and the noise is
+            # added in place there, so no separate full-size copy of the clean encoding is ever made
+            in_place = (self.wire_format == "binary" and not self.interleave_depth
+                        and len(targets) == 1 and len(padded_bits) > 0)
+            with span('channel_encode', len(padded_bits) // 8):
+                if in_place:
+                    encoding_params, chunks = self.encode_chunks(coder, padded_bits)
+                else:
+                    encoded_bits, encoding_params = coder.encode(padded_bits)
+            print(f"Encoded to {encoded_length} bits with {coder.name} code (rate {coder.rate:.3f})")
+            print(f"Encoded length should be multiple of {coder.block_length}: {encoded_length % coder.block_length == 0}")
+            
+            if self.frame_bits:
+                frame_bits = frame_bits_for(coder, self.frame_bits)
+                with span('checksum', len(padded_bits) // 8):
+                    checksums = frame_checksums(padded_bits, frame_bits)
+                encoding_params.update(crc_frame_bits=frame_bits, frame_crcs=checksums)
+                print(f"Checksummed {len(checksums)} frames of {frame_bits} bits")
+            
+            if not in_place:
+                transmitted_bits = self.interleave(coder, encoded_bits, encoding_params)
+            
+            for index, error_percentage in targets:
+                message = Message({
+                    "compression_algorithm": self.source_coder.name,
+                    "encoding": coder.name,
+                    "parameters": dict(parameters, encoding_params=encoding_params),
+                    "SHA256": original_sha256,
+                    "entropy": original_entropy
+                })
+                
+                if self.frame_bits:
+                    # Keep the source bits rather than the much larger encoding: frames hold whole
+                    # messages, so a failed frame is encoded again on its own when it is resent
+                    message_id = uuid.uuid4().hex
+                    message["parameters"]["message_id"] = message_id
+                    self.sent_frames.put(message_id, (coder, padded_bits, encoding_params, error_percentage))
+                
+                if self.wire_format == "binary":
+                    # The channel writes the noisy bits straight into the serialized message
+                    message = BinaryMessage(message)
+                    payload_bits = encoded_length if in_place else len(transmitted_bits)
+                    message.body, payload = allocate_message(message, (payload_bits + 7) // 8)
+                    packed = np.frombuffer(payload, dtype=np.uint8)
+                    if in_place:
+                        with span('channel_encode', len(padded_bits) // 8):
+                            for offset, chunk in chunks:
+                                data = chunk.to_memoryview()
+                                payload[offset:offset + len(data)] = data
+                        transmitted_bits = BitBuffer(packed, encoded_length)
+                    with span('noise', len(transmitted_bits) // 8):
+                        error_bits, num_errors = self.channel.apply(
+                            transmitted_bits, error_percentage, self.channel_model, out=packed
+                        )
+                    finish_message(message.body, num_errors, len(error_bits))
+                else:
+                    with span('noise', len(transmitted_bits) // 8):
+                        error_bits, num_errors = self.channel.apply(transmitted_bits, error_percentage, self.channel_model)
+                if num_errors > 0:
+                    print(f"Added {num_errors} errors ({error_percentage}%, {self.channel_model} channel)")
+                message["errors"] = num_errors
+                
+                if self.wire_format == "binary":
+                    message["payload"] = payload
+                    message["payload_bits"] = len(error_bits)
+                else:
+                    error_bytes = error_bits.to_memoryview()
+                    with span('base64_encode', len(error_bytes)):
+                        message["encoded_message"] = transform_to_base64(error_bytes)
+                
+                message.referenced_model = referenced_model
+                messages[index] = message
         
-        error_bytes = bytes(error_bytes)
-        encoded_message = transform_to_base64(error_bytes)
+        return messages
+    
+    def encode_chunks(self, coder, padded_bits, chunk_bits: int = 1 << 16):
+        # Whole bytes of whole channel-code messages per chunk, so each chunk encodes on its own to a
+        # byte-aligned slice of the full encoding; the last chunk goes first as it sets the padding
+        align = 8 * coder.message_length
+        chunk_bits = max(1, chunk_bits // align) * align
+        starts = range(0, len(padded_bits), chunk_bits)
+        tail, encoding_params = coder.encode(padded_bits[starts[-1]:])
+        encoding_params['original_length'] = len(padded_bits)
+        
+        def chunks():
+            yield coder.encoded_length(starts[-1]) // 8, tail
+            for start in starts[:-1]:
+                yield coder.encoded_length(start) // 8, coder.encode(padded_bits[start:start + chunk_bits])[0]
+        
+        return encoding_params, chunks()
+    
+    def interleave(self, coder, encoded_bits, encoding_params: dict):
+        if not self.interleave_depth:
+            return encoded_bits
+        interleaver = BlockInterleaver.for_coder(coder, self.interleave_depth)
+        with span('interleave', len(encoded_bits) // 8):
+            interleaved_bits = interleaver.interleave(encoded_bits)
+        encoding_params.update(interleaver.parameters(len(interleaved_bits)))
+        print(f"Interleaved {interleaver.block_bits}-bit blocks to depth {interleaver.depth}")
+        return interleaved_bits
+    
+    def process_image_stream(self, file_path: str, error_percentage: float = 0.0,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if not check_mime_type(file_path):
+            raise ValueError("File is not an image based on MIME type")
+        if not self.source_coder.prefix_code:
+            raise ValueError(f"Compression algorithm {self.source_coder.name} does not support streaming")
+        # The server decodes streams with the orthogonal code only, so any other choice fails here
+        coder = self.channel_coder_for(error_percentage)
+        if not isinstance(coder, OrthogonalCoding):
+            raise ValueError(f"Streaming only supports the orthogonal code, not {coder.name}")
+        
+        try:
+            symbols_freq, original_sha256, original_entropy, size = scan_chunks(
+                read_chunks(file_path, chunk_size), self.source_coder
+            )
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File {file_path} not found")
+        
+        print(f"Original file size: {size} bytes")
+        print(f"Original SHA256: {original_sha256}")
+        print(f"Original entropy: {original_entropy:.4f}")
+        
+        code_table = self.source_coder.build_code_table(symbols_freq)
+        compressed_length = sum(freq * len(code_table[symbol]) for symbol, freq in symbols_freq.items())
+        n = coder.n
+        final_bits = final_chunk_bits(coder)
+        print(f"Compressed to {compressed_length} bits")
         
         parameters = {
-            'code_table': code_table,
-            'encoding_params': encoding_params,
-            'compressed_length': len(compressed_bits)
+            self.source_coder.model_parameter: self.source_coder.export_model(code_table),
+            'encoding_params': {
+                'n': n,
+                'original_length': compressed_length,
+                'padding_added': -compressed_length % final_bits
+            },
+            'compressed_length': compressed_length,
+            'symbol_size': self.source_coder.symbol_size,
+            'original_size': size,
+            'chunk_size': chunk_size,
+            'code_table_id': code_table_id(code_table)
         }
         
-        message = {
-            "encoded_message": encoded_message,
-            "compression_algorithm": "fano-shannon",
-            "encoding": "orthogonal",
+        header = {
+            "compression_algorithm": self.source_coder.name,
+            "encoding": coder.name,
             "parameters": parameters,
-            "errors": num_errors,
+            "errors": 0,
             "SHA256": original_sha256,
             "entropy": original_entropy
         }
         
-        return message
+        # Each stage pulls one chunk at a time, so only a chunk's worth of data is
+        # held at once; header['errors'] is complete once the frames are exhausted
+        chunks = read_chunks(file_path, chunk_size)
+        compressed = compress_chunks(chunks, self.source_coder, code_table)
+        aligned = align_chunks(compressed, math.lcm(n * coder.block_chunk, final_bits), final_bits)
+        encoded = encode_chunks(aligned, coder)
+        if self.interleave_depth:
+            interleaver = BlockInterleaver.for_coder(coder, self.interleave_depth)
+            parameters['encoding_params'].update(interleaver.parameters())
+            encoded = interleave_chunks(encoded, interleaver)
+        frames = frame_chunks(add_errors_chunks(
+            encoded, error_percentage, header, self.channel, self.channel_model
+        ))
+        
+        return header, frames
     
-    def send_to_server(self, message: dict):
+    def encode_request(self, message: dict):
+        with span('serialize') as stage:
+            if 'payload' in message:
+                body, headers = pack_message(message), {'Content-Type': BINARY_CONTENT_TYPE}
+            else:
+                body, headers = json.dumps(message), {'Content-Type': JSON_CONTENT_TYPE}
+            stage.set_bytes(len(body))
+        return body, headers
+    
+    def send_to_server(self, message: dict, resends: int = 0):
         try:
-            headers = {'Content-Type': 'application/json'}
-            response = requests.post(
-                f"{self.server_url}/decode",
-                json=message,
-                headers=headers,
-                timeout=30
-            )
+            body, headers = self.encode_request(message)
+            
+            with span('upload', len(body)):
+                response = self.http.post(
+                    f"{self.server_url}/decode",
+                    data=body,
+                    headers=headers,
+                    timeout=30
+                )
+            
+            if response.status_code == 200:
+                return self.handle_result(message, response.json(), resends)
+            else:
+                print(f"Server error: {response.status_code}")
+                print(response.text)
+                
+        except requests.exceptions.RequestException as e:
+            print(f"Connection error: {e}")
+        
+        self.drop_frames(message)
+        return None
+    
+    def handle_result(self, message: dict, result: dict, resends: int = 0):
+        parameters = message['parameters']
+        if result.get('incomplete'):
+            result = self.complete_session(message, result, resends)
+        if result is None:
+            self.drop_frames(message)
+            return None
+        
+        model_parameter = self.source_coder.model_parameter
+        table_key = (message['compression_algorithm'], parameters.get('code_table_id'))
+        
+        if result.get('unknown_code_table_id') and model_parameter not in parameters:
+            print(f"Server does not know code table {table_key[1]}, resending it")
+            # The message keeps the model it referenced, since sent_tables may have evicted it by now
+            model = getattr(message, 'referenced_model', None)
+            if model is None:
+                model = self.sent_tables.get(table_key)
+            if model is None:
+                self.drop_frames(message)
+                raise ValueError(f"Code table {table_key[1]} is no longer kept and cannot be resent")
+            self.sent_tables.put(table_key, None)
+            message = dict(message, parameters=dict(parameters, **{model_parameter: model}))
+            return self.send_to_server(message, resends)
+        
+        self.drop_frames(message)
+        if result.get('success') and model_parameter in parameters:
+            self.sent_tables.put(table_key, parameters[model_parameter])
+        
+        return result
+    
+    def drop_frames(self, message: dict):
+        # Called on every reply that is not an incomplete session, so nothing is held longer than needed
+        self.sent_frames.pop(message['parameters'].get('message_id'))
+    
+    def retransmit(self, session_id: str, message_id: str, frames):
+        entry = self.sent_frames.get(message_id)
+        if entry is None:
+            raise ValueError(f"No encoded frames kept for message {message_id}")
+        coder, padded_bits, encoding_params, error_percentage = entry
+        
+        frames = sorted(frames)
+        spans = frame_spans(len(padded_bits), encoding_params['crc_frame_bits'])
+        selected_bits = BitBuffer.concat([coder.encode(padded_bits[spans[index][0]:spans[index][1]])[0] for index in frames])
+        
+        frame_params = {}
+        transmitted_bits = self.interleave(coder, selected_bits, frame_params)
+        error_bits, num_errors = self.channel.apply(transmitted_bits, error_percentage, self.channel_model)
+        print(f"Retransmitting {len(frames)} frames ({len(error_bits)} bits, {num_errors} errors)")
+        
+        body = {
+            'session_id': session_id,
+            'frames': frames,
+            'errors': num_errors,
+            'payload_bits': len(error_bits),
+            'encoded_message': transform_to_base64(error_bits.to_memoryview())
+        }
+        if 'interleave_length' in frame_params:
+            body['interleave_length'] = frame_params['interleave_length']
+        
+        try:
+            with span('upload') as stage:
+                payload = json.dumps(body)
+                stage.set_bytes(len(payload))
+                response = self.http.post(
+                    f"{self.server_url}/retransmit",
+                    data=payload,
+                    headers={'Content-Type': JSON_CONTENT_TYPE},
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 return response.json()
@@ -98,15 +452,141 @@ class CompressionClient:
             print(f"Connection error: {e}")
             return None
     
-    def run(self, file_path: str, error_percentage: float = 0.0):
+    def complete_session(self, message: dict, result: dict, resends: int = 0):
+        message_id = message['parameters'].get('message_id')
+        if message_id not in self.sent_frames:
+            print(f"No encoded frames kept for message {message_id}, cannot retransmit")
+            return result
+        for _ in range(self.max_retransmissions):
+            print(f"Server reports {len(result['failed_frames'])} of {result['frame_count']} frames failed")
+            result = self.retransmit(result['session_id'], message_id, result['failed_frames'])
+            if result and result.get('unknown_session_id'):
+                return self.resend(message, result, resends)
+            if not result or not result.get('incomplete'):
+                return result
+        print(f"Giving up after {self.max_retransmissions} retransmissions")
+        return result
+    
+    def resend(self, message: dict, result: dict, resends: int):
+        # The session expired or is held by another server process, so only the whole message can recover it
+        if resends >= self.max_retransmissions:
+            print(f"Giving up after resending the whole message {resends} times")
+            return result
+        print(f"Server lost session {result['unknown_session_id']}, sending the whole message again")
+        return self.send_to_server(message, resends + 1)
+    
+    def send_batch(self, messages: list):
         try:
-            print("\n---CLIENT PROCESSING---")
+            with span('serialize') as stage:
+                if 'payload' in messages[0]:
+                    body, headers = pack_batch(messages), {'Content-Type': BATCH_CONTENT_TYPE}
+                else:
+                    body, headers = json.dumps(messages), {'Content-Type': JSON_CONTENT_TYPE}
+                stage.set_bytes(len(body))
             
-            message = self.process_image(file_path, error_percentage)
+            with span('upload', len(body)):
+                response = self.http.post(
+                    f"{self.server_url}/decode_batch",
+                    data=body,
+                    headers=headers,
+                    timeout=120
+                )
+            
+            if response.status_code == 200:
+                results = response.json()['results']
+                return [self.handle_result(message, result) for message, result in zip(messages, results)]
+            else:
+                print(f"Server error: {response.status_code}")
+                print(response.text)
+                
+        except requests.exceptions.RequestException as e:
+            print(f"Connection error: {e}")
+        
+        for message in messages:
+            self.drop_frames(message)
+        return [None] * len(messages)
+    
+    def run_many(self, paths, error_percentage: float = 0.0, batch_size: int = 8):
+        results = [None] * len(paths)
+        pending = {}
+        
+        def collect(futures):
+            for future in futures:
+                for index, result in zip(pending.pop(future), future.result()):
+                    results[index] = result
+        
+        start_time = time.perf_counter()
+        with request_stages() as stages, ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for start in range(0, len(paths), batch_size):
+                indices, messages = [], []
+                for index in range(start, min(start + batch_size, len(paths))):
+                    try:
+                        messages.append(self.process_image(paths[index], error_percentage))
+                        indices.append(index)
+                    except (ValueError, FileNotFoundError) as e:
+                        print(f"Skipping {paths[index]}: {e}")
+                if not messages:
+                    continue
+                
+                # The next batch is compressed while this one uploads; at most
+                # max_in_flight batches wait on the server at once
+                if len(pending) >= self.max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending[executor.submit(self.send_batch, messages)] = indices
             
-            print("\n---SENDING TO SERVER---")
+            collect(list(pending))
+        self.last_stages = dict(stages)
+        
+        elapsed = time.perf_counter() - start_time
+        # Throughput counts only images the server decoded, so skipped and failed paths do not inflate it
+        decoded = sum(1 for result in results if result and result.get('success'))
+        matched = sum(1 for result in results if result and result.get('sha256_match'))
+        if paths:
+            print(f"Decoded {decoded} of {len(paths)} images in {elapsed:.2f}s ({decoded / elapsed:.1f} images/s), "
+                  f"{matched} with matching SHA256")
+        return results
+    
+    def send_streaming(self, file_path: str, error_percentage: float = 0.0,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE):
+        header, frames = self.process_image_stream(file_path, error_percentage, chunk_size)
+        
+        def body():
+            yield pack_stream_header(header)
+            for frame in frames:
+                yield pack_stream_frame(frame)
+            yield pack_stream_trailer(header['errors'])
+        
+        try:
+            response = self.http.post(
+                f"{self.server_url}/decode_stream",
+                data=body(),
+                headers={'Content-Type': STREAM_CONTENT_TYPE},
+                timeout=30
+            )
             
-            response = self.send_to_server(message)
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"Server error: {response.status_code}")
+                print(response.text)
+                return None
+                
+        except requests.exceptions.RequestException as e:
+            print(f"Connection error: {e}")
+            return None
+    
+    def run(self, file_path: str, error_percentage: float = 0.0):
+        try:
+            with request_stages() as stages:
+                print("\n---CLIENT PROCESSING---")
+                
+                message = self.process_image(file_path, error_percentage)
+                
+                print("\n---SENDING TO SERVER---")
+                
+                response = self.send_to_server(message)
+            self.last_stages = dict(stages)
             
             if response:
                 print("\n---SERVER RESPONSE---")
@@ -116,9 +596,18 @@ class CompressionClient:
                 print(f"SHA256 match: {response.get('sha256_match', False)}")
                 print(f"Decoded SHA256: {response.get('decoded_sha256', 'N/A')}")
                 print(f"Final entropy: {response.get('final_entropy', 'N/A')}")
+                if response.get('retransmitted_frames'):
+                    print(f"Frames retransmitted: {response['retransmitted_frames']}")
+                if response.get('failed_frames'):
+                    print(f"Frames still failing: {response['failed_frames']}")
                 
                 if response.get('message'):
                     print(f"Message: {response['message']}")
+                
+                for side, stages in (('Client', self.last_stages), ('Server', response.get('stages', {}))):
+                    if stages:
+                        breakdown = ', '.join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in stages.items())
+                        print(f"{side} stages: {breakdown}")
                     
                 return response
             else:
@@ -0,0 +1,163 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bitbuffer import BitBuffer
+from cache import normalize_code_table
+
+MAX_CODE_LENGTH = 64
+# Building the pair table costs about as much as coding this many bytes one at a time
+PAIR_THRESHOLD = 1 << 16
+
+def pack_codes(words: np.ndarray, aligned: np.ndarray, lengths: np.ndarray, base: int) -> np.ndarray:
+    # Codes sit left-aligned in 64-bit words, so each lands at its bit offset as a high part in
+    # one output word and a low part in the next; codes sharing a word are OR-ed together first
+    lengths = lengths.astype(np.uint64)
+    ends = np.cumsum(lengths, dtype=np.uint64)
+    ends += np.uint64(base)
+    offsets = ends - lengths
+    index = offsets >> np.uint64(6)
+    shift = offsets & np.uint64(63)
+    first = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    heads = index[first]
+    words[heads] |= np.bitwise_or.reduceat(aligned >> shift, first)
+    words[heads + np.uint64(1)] |= np.bitwise_or.reduceat((aligned << np.uint64(1)) << (np.uint64(63) - shift), first)
+    return ends
+
+def code_words(total_bits: int) -> np.ndarray:
+    return np.zeros(total_bits // 64 + 2, dtype=np.uint64)
+
+def words_to_bits(words: np.ndarray, total_bits: int) -> BitBuffer:
+    if np.little_endian:
+        words.byteswap(inplace=True)
+    return BitBuffer(words.view(np.uint8)[:(total_bits + 7) // 8], total_bits)
+
+class CodeTable:
+    def __init__(self, codes: np.ndarray, lengths: np.ndarray):
+        self.codes = np.asarray(codes, dtype=np.uint64)
+        self.lengths = np.asarray(lengths, dtype=np.uint8)
+        if len(self.codes) != len(self.lengths):
+            raise ValueError("Codes and lengths must have one entry per symbol")
+        if len(self.lengths) and self.lengths.max() > MAX_CODE_LENGTH:
+            raise ValueError(f"Codes longer than {MAX_CODE_LENGTH} bits are not supported")
+        self.max_length = int(self.lengths.max()) if len(self.lengths) else 0
+        wide = self.lengths.astype(np.uint64)
+        self.aligned = np.where(wide > 0, self.codes << ((np.uint64(64) - wide) & np.uint64(63)), np.uint64(0))
+        self._pairs = None
+
+    @property
+    def alphabet_size(self) -> int:
+        return len(self.lengths)
+
+    @classmethod
+    def from_dict(cls, code_table: Dict, alphabet_size: int = 256) -> 'CodeTable':
+        codes = np.zeros(alphabet_size, dtype=np.uint64)
+        lengths = np.zeros(alphabet_size, dtype=np.uint8)
+        for symbol, code in normalize_code_table(code_table).items():
+            if len(code) > MAX_CODE_LENGTH:
+                raise ValueError(f"Codes longer than {MAX_CODE_LENGTH} bits are not supported")
+            codes[symbol] = int(code, 2)
+            lengths[symbol] = len(code)
+        return cls(codes, lengths)
+
+    @classmethod
+    def concat(cls, tables: List['CodeTable']) -> 'CodeTable':
+        # Table t's symbol s becomes entry t * alphabet_size + s, for coders that switch tables per symbol
+        return cls(np.concatenate([table.codes for table in tables]),
+                   np.concatenate([table.lengths for table in tables]))
+
+    def to_dict(self) -> Dict[int, str]:
+        return {
+            int(symbol): format(int(self.codes[symbol]), f'0{self.lengths[symbol]}b')
+            for symbol in np.flatnonzero(self.lengths)
+        }
+
+    def encoded_length(self, histogram: np.ndarray) -> int:
+        return int(np.dot(np.asarray(histogram, dtype=np.int64), self.lengths.astype(np.int64)))
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Two bytes at a time through a 65536-entry table halves the work per input byte
+        if self._pairs is None:
+            wide = self.lengths.astype(np.uint64)
+            aligned = self.aligned[:, None] | (self.aligned[None, :] >> wide[:, None])
+            lengths = self.lengths[:, None] + self.lengths[None, :]
+            self._pairs = aligned.reshape(-1), lengths.reshape(-1)
+        return self._pairs
+
+    def pack(self, words: np.ndarray, symbols: np.ndarray, base: int, sync_interval: int = None,
+             sync_points: list = None) -> int:
+        paired = (self.alphabet_size == 256 and self.max_length <= MAX_CODE_LENGTH // 2
+                  and symbols.dtype == np.uint8 and (sync_interval is None or sync_interval % 2 == 0)
+                  and (self._pairs is not None or len(symbols) >= PAIR_THRESHOLD))
+        step = 2 if paired else 1
+        tail = symbols[len(symbols) - len(symbols) % step:]
+        if paired:
+            aligned, lengths = self.pairs()
+            # Big-endian 16-bit view of the byte pairs is exactly first * 256 + second
+            keys = symbols[:len(symbols) - len(tail)].view('>u2')
+        else:
+            aligned, lengths, keys = self.aligned, self.lengths, symbols
+
+        ends = pack_codes(words, aligned[keys], lengths[keys], base) if len(keys) else None
+        if sync_interval is not None:
+            # Sync symbols are a multiple of the (even) interval into the chunk, so each starts a whole key
+            for position in range(0, len(symbols), sync_interval):
+                key = position // step
+                sync_points.append(base if key == 0 else int(ends[key - 1]))
+        if ends is not None:
+            base = int(ends[-1])
+        if len(tail):
+            base = int(pack_codes(words, self.aligned[tail], self.lengths[tail], base)[-1])
+        return base
+
+    def encode(self, symbols: np.ndarray, total_bits: int = None, sync_interval: int = None,
+               chunk_size: int = 1 << 16) -> Tuple[BitBuffer, List[int]]:
+        symbols = np.asarray(symbols)
+        if total_bits is None:
+            total_bits = sum(int(self.lengths[symbols[start:start + chunk_size]].sum(dtype=np.int64))
+                             for start in range(0, len(symbols), chunk_size))
+        if sync_interval is not None:
+            chunk_size = max(1, chunk_size // sync_interval) * sync_interval
+
+        words = code_words(total_bits)
+        sync_points = [] if sync_interval is not None else None
+        base = 0
+        for start in range(0, len(symbols), chunk_size):
+            base = self.pack(words, symbols[start:start + chunk_size], base, sync_interval, sync_points)
+
+        return words_to_bits(words, total_bits), sync_points or []
+
+    def to_bytes(self, lengths_only: bool = False) -> bytes:
+        # A presence bitmap, one length byte per symbol present and, unless the receiver
+        # rebuilds canonical codes from the lengths, the codes themselves packed back to back
+        present = self.lengths > 0
+        out = [np.packbits(present).tobytes(), self.lengths[present].tobytes()]
+        if not lengths_only:
+            symbols = np.flatnonzero(present)
+            total_bits = int(self.lengths[symbols].sum(dtype=np.int64))
+            words = code_words(total_bits)
+            if len(symbols):
+                pack_codes(words, self.aligned[symbols], self.lengths[symbols], 0)
+            out.append(words_to_bits(words, total_bits).to_bytes())
+        return b''.join(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, alphabet_size: int = 256, lengths_only: bool = False) -> Tuple['CodeTable', int]:
+        bitmap_size = alphabet_size // 8
+        present = np.flatnonzero(np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=bitmap_size)))
+        position = bitmap_size
+        lengths = np.zeros(alphabet_size, dtype=np.uint8)
+        lengths[present] = np.frombuffer(data, dtype=np.uint8, count=len(present), offset=position)
+        position += len(present)
+        codes = np.zeros(alphabet_size, dtype=np.uint64)
+        if not lengths_only:
+            total_bits = int(lengths.sum(dtype=np.int64))
+            packed = np.frombuffer(data, dtype=np.uint8, count=(total_bits + 7) // 8, offset=position)
+            bits = BitBuffer(packed, total_bits).to_str()
+            position += len(packed)
+            offset = 0
+            for symbol in present:
+                length = int(lengths[symbol])
+                codes[symbol] = int(bits[offset:offset + length], 2)
+                offset += length
+        return cls(codes, lengths), position
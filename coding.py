@@ -1,31 +1,125 @@
 import numpy as np
 from typing import Tuple
-import math
+from bitbuffer import BitBuffer, BitWriter, Bits, as_bitbuffer
+from cache import LRUCache
+from utils import binomial_tail
+
+hadamard_cache = LRUCache(maxsize=8)
+
+MAX_N = 20
+# Codeword tables are kept only while they stay small (64 KiB of bits at n=8); longer codes
+# generate the rows of each chunk on the fly, so memory grows with 2^n rather than 4^n
+MAX_TABLE_N = 8
+# Blocks are encoded and correlated a chunk at a time; long codes get fewer blocks per chunk
+CHUNK_SAMPLES = 1 << 19
+
+BYTE_PARITY = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1, dtype=np.uint8) & np.uint8(1)
+
+def parity(x: np.ndarray) -> np.ndarray:
+    # np.bitwise_count needs NumPy 2; on 1.x the 32-bit words are folded down to a byte and looked up
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x) & np.uint8(1)
+    x = x ^ (x >> np.uint32(16))
+    x ^= x >> np.uint32(8)
+    return BYTE_PARITY[x & np.uint32(0xFF)]
+
+def hadamard_rows(rows: np.ndarray, n: int) -> np.ndarray:
+    # Entry (r, c) of the Sylvester matrix is (-1)^popcount(r & c); codewords map +1 to bit 1
+    rows = np.asarray(rows, dtype=np.uint32)
+    columns = np.arange(1 << n, dtype=np.uint32)
+    return np.uint8(1) ^ parity(rows[:, None] & columns)
+
+# Within a byte the low three column bits vary, so r & 7 fixes the byte's pattern and
+# the parity of the higher bits only decides whether the whole byte is inverted
+LOW_PATTERNS = np.packbits(hadamard_rows(np.arange(8), 3), axis=1).reshape(8)
+
+def packed_hadamard_rows(rows: np.ndarray, n: int) -> np.ndarray:
+    if n < 3:
+        raise ValueError("Packed codewords need at least 8-bit blocks (n >= 3)")
+    rows = np.asarray(rows, dtype=np.uint32)
+    high = np.arange(1 << (n - 3), dtype=np.uint32)
+    flips = parity((rows[:, None] >> np.uint32(3)) & high) * np.uint8(0xFF)
+    return flips ^ LOW_PATTERNS[rows & np.uint32(7)][:, None]
+
+def fast_walsh_hadamard(x: np.ndarray, h: int = 1) -> np.ndarray:
+    # h > 1 continues a transform whose butterflies of span below h are already applied
+    x = np.asarray(x)
+    x = np.array(x, dtype=np.float64 if np.issubdtype(x.dtype, np.floating) else np.int32, ndmin=2)
+    blocks, size = x.shape
+    # Each stage writes its butterflies into the other buffer, so no stage allocates
+    y = np.empty_like(x)
+    while h < size:
+        a = x.reshape(blocks, size // (2 * h), 2, h)
+        b = y.reshape(blocks, size // (2 * h), 2, h)
+        np.add(a[:, :, 0], a[:, :, 1], out=b[:, :, 0])
+        np.subtract(a[:, :, 0], a[:, :, 1], out=b[:, :, 1])
+        x, y = y, x
+        h *= 2
+    return x
+
+# The first three butterflies stay inside a byte, so for packed hard bits they are one lookup per byte
+BYTE_WALSH_HADAMARD = fast_walsh_hadamard(
+    2 * np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).astype(np.int32) - 1
+).astype(np.float32)
+
+def packed_walsh_hadamard(packed: np.ndarray, size: int) -> np.ndarray:
+    x = BYTE_WALSH_HADAMARD[packed]
+    groups = size // 8
+    if groups > 1 << (MAX_TABLE_N - 3):
+        return fast_walsh_hadamard(x.astype(np.int32).reshape(-1, size), 8)
+    # The Sylvester matrix is H_groups (x) H_8, so the rest is one small matrix product per block;
+    # sums of at most 2^MAX_TABLE_N signs are exact in float32
+    signs = 2 * hadamard_rows(np.arange(groups), groups.bit_length() - 1).astype(np.float32) - 1
+    return np.matmul(signs, x.reshape(-1, groups, 8)).reshape(-1, size).astype(np.int32)
 
 class OrthogonalCoding:
-    def __init__(self, n: int = 7):
+    name = 'orthogonal'
+    
+    def __init__(self, n: int = 7, block_chunk: int = 4096):
+        if not 1 <= n <= MAX_N:
+            raise ValueError(f"Code dimension n must be between 1 and {MAX_N}")
         self.n = n
         self.code_length = 2 ** n  # 128 bits for n=7
-        self.hadamard_matrix = self._generate_hadamard_matrix(self.code_length)
+        self.block_chunk = max(1, min(block_chunk, CHUNK_SAMPLES // self.code_length))
+        self.block_length = self.code_length
+        self.message_length = n
+        self.rate = n / self.code_length
+        if n <= MAX_TABLE_N:
+            self.codewords, self.packed_codewords = hadamard_cache.get_or_create(n, lambda: self._generate_tables(n))
+        else:
+            self.codewords = self.packed_codewords = None
     
-    def _generate_hadamard_matrix(self, size: int) -> np.ndarray:
-        if size == 1:
-            return np.array([[1]])
-        
-        n = int(math.log2(size))
-        
-        H = np.array([[1, 1], [1, -1]])
-        
-        for i in range(2, n + 1):
-            H_prev = H
-            H = np.zeros((2**i, 2**i), dtype=int)
-            H[:2**(i-1), :2**(i-1)] = H_prev
-            H[:2**(i-1), 2**(i-1):] = H_prev
-            H[2**(i-1):, :2**(i-1)] = H_prev
-            H[2**(i-1):, 2**(i-1):] = -H_prev
-        
-        H = (H + 1) // 2
-        return H
+    @classmethod
+    def from_parameters(cls, parameters: dict) -> 'OrthogonalCoding':
+        return cls(n=parameters['n'])
+    
+    def encoded_length(self, data_length: int) -> int:
+        return -(-data_length // self.n) * self.code_length
+    
+    def estimated_block_error(self, error_rate: float) -> float:
+        # Rows differ in half their bits, so up to a quarter of the block minus one is correctable
+        return binomial_tail(self.code_length, self.code_length // 4 - 1, error_rate)
+    
+    def _generate_tables(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.arange(1 << n)
+        codewords = hadamard_rows(rows, n)
+        # Rows are whole bytes from n=3 up, so encoding can gather packed codewords directly
+        packed_codewords = packed_hadamard_rows(rows, n) if n >= 3 else None
+        # Shared between every coder with the same n, so keep them read-only
+        for table in (codewords, packed_codewords):
+            if table is not None:
+                table.setflags(write=False)
+        return codewords, packed_codewords
+    
+    def codeword_bits(self, rows: np.ndarray) -> np.ndarray:
+        if self.codewords is not None:
+            return self.codewords[rows]
+        return hadamard_rows(rows, self.n)
+    
+    def packed_codeword_rows(self, rows: np.ndarray) -> np.ndarray:
+        if self.packed_codewords is not None:
+            return self.packed_codewords[rows]
+        return packed_hadamard_rows(rows, self.n)
     
     def encode_block(self, data_bits: str) -> str:
         if len(data_bits) != self.n:
@@ -33,19 +127,29 @@ class OrthogonalCoding:
         
         row_index = int(data_bits, 2)
         
-        codeword = self.hadamard_matrix[row_index]
+        codeword = self.codeword_bits(np.array([row_index]))[0]
         
         return ''.join(map(str, codeword))
     
-    def encode(self, data_bits: str) -> Tuple[str, dict]:
+    def encode(self, data_bits: Bits) -> Tuple[Bits, dict]:
         padding_needed = (self.n - len(data_bits) % self.n) % self.n
-        padded_data = data_bits + '0' * padding_needed
         
-        encoded_bits = ''
-        for i in range(0, len(padded_data), self.n):
-            block = padded_data[i:i+self.n]
-            encoded_block = self.encode_block(block)
-            encoded_bits += encoded_block
+        data = as_bitbuffer(data_bits)
+        weights = 1 << np.arange(self.n - 1, -1, -1)
+        # Whole bytes per chunk keep every slice a view into the input buffer
+        chunk_bits = -(-self.block_chunk // 8) * 8 * self.n
+        
+        writer = BitWriter(self.encoded_length(len(data)))
+        for start in range(0, len(data), chunk_bits):
+            bits = data[start:start+chunk_bits].to_array()
+            if len(bits) % self.n:
+                bits = np.concatenate((bits, np.zeros(padding_needed, dtype=np.uint8)))
+            rows = bits.reshape(-1, self.n).astype(np.int64) @ weights
+            if self.n < 3:
+                writer.write(self.codeword_bits(rows))
+            else:
+                writer.write_buffer(BitBuffer(self.packed_codeword_rows(rows).reshape(-1)))
+        encoded = writer.getvalue()
         
         parameters = {
             'n': self.n,
@@ -53,7 +157,9 @@ class OrthogonalCoding:
             'padding_added': padding_needed
         }
         
-        return encoded_bits, parameters
+        if isinstance(data_bits, str):
+            return encoded.to_str(), parameters
+        return encoded, parameters
     
     def decode_block(self, received_bits: str) -> str:
         if len(received_bits) != self.code_length:
@@ -61,19 +167,82 @@ class OrthogonalCoding:
         
         received = np.array([int(b) for b in received_bits])
         
-        correlations = []
-        for i in range(2**self.n):
-            codeword = self.hadamard_matrix[i]
-            correlation = np.sum(received == codeword)
-            correlations.append(correlation)
+        decoded, _ = self.decode_blocks(received)
+        
+        return ''.join(map(str, decoded[0]))
+    
+    def decode_blocks(self, received: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        received = np.asarray(received, dtype=np.int32).reshape(-1, self.code_length)
+        
+        # Correlating the +-1 form of every block against all Hadamard rows at once
+        return self._best_rows(fast_walsh_hadamard(2 * received - 1))
+    
+    def decode_packed_blocks(self, packed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # The bytes of whole blocks (n >= 3), correlated without unpacking every bit
+        return self._best_rows(packed_walsh_hadamard(np.asarray(packed, dtype=np.uint8), self.code_length))
+    
+    def decode_buffer(self, received: BitBuffer) -> Tuple[np.ndarray, np.ndarray]:
+        if self.code_length >= 8:
+            return self.decode_packed_blocks(received.packed[:len(received) // 8])
+        return self.decode_blocks(received.to_array())
+    
+    def _best_rows(self, correlations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        best_rows = np.argmax(correlations, axis=1)
+        best_correlations = correlations[np.arange(len(best_rows)), best_rows]
+        errors = (self.code_length - best_correlations) // 2
+        
+        shifts = np.arange(self.n - 1, -1, -1)
+        decoded = ((best_rows[:, None] >> shifts) & 1).astype(np.uint8)
+        
+        return decoded, errors
+    
+    def decode_blocks_soft(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.code_length)
+        
+        # Same correlation as the hard path, but each sample votes with its reliability;
+        # the gap to the runner-up row is how close the block came to decoding differently
+        correlations = fast_walsh_hadamard(values)
+        best_rows = np.argmax(correlations, axis=1)
+        top_two = np.partition(correlations, -2, axis=1)[:, -2:]
+        margins = top_two[:, 1] - top_two[:, 0]
+        
+        shifts = np.arange(self.n - 1, -1, -1)
+        decoded = ((best_rows[:, None] >> shifts) & 1).astype(np.uint8)
+        
+        return decoded, margins
+    
+    def decode_soft(self, received: np.ndarray, parameters: dict, erasures=None,
+                    llr: bool = False) -> Tuple[BitBuffer, np.ndarray]:
+        # Samples are bipolar with positive meaning 1; LLRs are log(P(0)/P(1)), so they flip sign
+        values = np.asarray(received, dtype=np.float64).reshape(-1)
+        values = -values if llr else values.copy()
+        
+        if erasures is not None:
+            if isinstance(erasures, BitBuffer):
+                erasures = erasures.to_array()
+            values[np.asarray(erasures, dtype=bool)[:len(values)]] = 0.0
+        values[np.isnan(values)] = 0.0
+        
+        if len(values) % self.code_length != 0:
+            truncated_length = (len(values) // self.code_length) * self.code_length
+            print(f"Warning: Truncating encoded data from {len(values)} to {truncated_length} samples")
+            values = values[:truncated_length]
         
-        best_match = np.argmax(correlations)
+        chunk_samples = self.block_chunk * self.code_length
+        writer = BitWriter()
+        margins = []
+        for start in range(0, len(values), chunk_samples):
+            decoded, block_margins = self.decode_blocks_soft(values[start:start+chunk_samples])
+            writer.write(decoded)
+            margins.append(block_margins)
         
-        return format(best_match, f'0{self.n}b')
+        margins = np.concatenate(margins) if margins else np.zeros(0)
+        return writer.getvalue()[:parameters['original_length']], margins
     
-    def decode(self, encoded_bits: str, parameters: dict) -> Tuple[str, int]:
+    def decode(self, encoded_bits: Bits, parameters: dict) -> Tuple[Bits, int]:
         n = parameters['n']
         original_length = parameters['original_length']
+        packed = isinstance(encoded_bits, BitBuffer)
         
         if len(encoded_bits) % self.code_length != 0:
             truncated_length = (len(encoded_bits) // self.code_length) * self.code_length
@@ -81,21 +250,20 @@ class OrthogonalCoding:
             encoded_bits = encoded_bits[:truncated_length]
         
         if len(encoded_bits) == 0:
-            return '', 0
+            return (BitBuffer() if packed else ''), 0
         
-        decoded_bits = ''
-        total_errors_corrected = 0
+        received = as_bitbuffer(encoded_bits)
+        chunk_bits = self.block_chunk * self.code_length
         
-        for i in range(0, len(encoded_bits), self.code_length):
-            block = encoded_bits[i:i+self.code_length]
-            if len(block) == self.code_length: 
-                decoded_block = self.decode_block(block)
-                decoded_bits += decoded_block
-                
-                re_encoded = self.encode_block(decoded_block)
-                errors_in_block = sum(1 for a, b in zip(block, re_encoded) if a != b)
-                total_errors_corrected += errors_in_block
+        writer = BitWriter()
+        total_errors = 0
+        for start in range(0, len(received), chunk_bits):
+            decoded, errors = self.decode_buffer(received[start:start+chunk_bits])
+            writer.write(decoded)
+            total_errors += int(errors.sum())
+        decoded_bits = writer.getvalue()[:original_length]
         
-        decoded_bits = decoded_bits[:original_length]
+        if not packed:
+            decoded_bits = decoded_bits.to_str()
         
-        return decoded_bits, total_errors_corrected
\ No newline at end of file
+        return decoded_bits, total_errors
@@ -0,0 +1,181 @@
+import numpy as np
+from typing import List, Sequence, Tuple
+from bitbuffer import BitBuffer, BitWriter, Bits, as_bitbuffer
+from utils import binomial_tail
+
+# Puncturing patterns for the K=7 (171, 133) code: one row per generator,
+# one column per input bit of the period; 0 drops that output bit
+PUNCTURE_PATTERNS = {
+    '1/2': ((1,), (1,)),
+    '2/3': ((1, 1), (1, 0)),
+    '3/4': ((1, 0, 1), (1, 1, 0))
+}
+FREE_DISTANCES = {'1/2': 10, '2/3': 6, '3/4': 5}
+
+class ConvolutionalCoding:
+    name = 'convolutional'
+
+    def __init__(self, rate: str = '1/2', constraint_length: int = 7, generators: Sequence[int] = (0o171, 0o133),
+                 frame_bits: int = 1024, frame_chunk: int = 256):
+        if rate not in PUNCTURE_PATTERNS:
+            raise ValueError(f"Unsupported convolutional code rate: {rate}")
+        if len(generators) != 2:
+            raise ValueError("Convolutional code needs two generator polynomials")
+        self.rate_name = rate
+        self.constraint_length = constraint_length
+        self.generators = list(generators)
+        self.frame_bits = frame_bits
+        self.frame_chunk = frame_chunk
+        self.block_length = 1
+        # Frames are terminated independently, so whole frames can be encoded and decoded apart
+        self.message_length = frame_bits
+        self.pattern = np.array(PUNCTURE_PATTERNS[rate], dtype=bool).T
+        self.rate = len(self.pattern) / int(self.pattern.sum())
+
+        K = constraint_length
+        self.num_states = 1 << (K - 1)
+        # taps[j][i] is generator j's coefficient for the input delayed by i steps
+        self.taps = np.array([[(g >> (K - 1 - i)) & 1 for i in range(K)] for g in self.generators], dtype=np.uint8)
+        # expected[r][j] is generator j's output for register r, whose top bit is the newest input
+        register_bits = (np.arange(1 << K)[:, None] >> np.arange(K - 1, -1, -1)) & 1
+        self.expected = (register_bits @ self.taps.T.astype(np.int64) % 2).astype(np.int32)
+
+    @classmethod
+    def from_parameters(cls, parameters: dict) -> 'ConvolutionalCoding':
+        return cls(
+            rate=parameters.get('rate', '1/2'),
+            constraint_length=parameters.get('constraint_length', 7),
+            generators=parameters.get('generators', (0o171, 0o133)),
+            frame_bits=parameters.get('frame_bits', 1024)
+        )
+
+    def estimated_block_error(self, error_rate: float) -> float:
+        # Rough figure: errors beyond half the free distance within one constraint span of output
+        window = int(round(self.constraint_length / self.rate))
+        return binomial_tail(window, (FREE_DISTANCES.get(self.rate_name, 5) - 1) // 2, error_rate)
+
+    def _keep_mask(self, steps: int) -> np.ndarray:
+        period = len(self.pattern)
+        return np.tile(self.pattern, (-(-steps // period), 1))[:steps]
+
+    def _frames(self, length: int) -> List[Tuple[int, int]]:
+        full, remainder = divmod(length, self.frame_bits)
+        groups = [(count, self.frame_bits) for count in
+                  [self.frame_chunk] * (full // self.frame_chunk) + [full % self.frame_chunk] if count]
+        if remainder:
+            groups.append((1, remainder))
+        return groups
+
+    def encoded_length(self, data_length: int) -> int:
+        return sum(count * int(self._keep_mask(length + self.constraint_length - 1).sum())
+                   for count, length in self._frames(data_length))
+
+    def _encode_frames(self, frames: np.ndarray) -> np.ndarray:
+        count, length = frames.shape
+        K = self.constraint_length
+        steps = length + K - 1
+        # Leading zeros give the initial state, trailing zeros flush the encoder back to state 0
+        padded = np.zeros((count, steps + K - 1), dtype=np.uint8)
+        padded[:, K - 1:K - 1 + length] = frames
+
+        outputs = np.zeros((count, steps, len(self.generators)), dtype=np.uint8)
+        for j, taps in enumerate(self.taps):
+            for delay in np.flatnonzero(taps):
+                outputs[:, :, j] ^= padded[:, K - 1 - delay:K - 1 - delay + steps]
+
+        return outputs[:, self._keep_mask(steps)]
+
+    def encode(self, data_bits: Bits) -> Tuple[Bits, dict]:
+        data = as_bitbuffer(data_bits)
+
+        writer = BitWriter()
+        position = 0
+        for count, length in self._frames(len(data)):
+            frames = data[position:position + count * length].to_array().reshape(count, length)
+            writer.write(self._encode_frames(frames).reshape(-1))
+            position += count * length
+        encoded = writer.getvalue()
+
+        parameters = {
+            'n': len(self.generators),
+            'original_length': len(data_bits),
+            'padding_added': 0,
+            'rate': self.rate_name,
+            'constraint_length': self.constraint_length,
+            'generators': self.generators,
+            'frame_bits': self.frame_bits
+        }
+
+        if isinstance(data_bits, str):
+            return encoded.to_str(), parameters
+        return encoded, parameters
+
+    def _viterbi(self, received: np.ndarray, length: int) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(received)
+        K = self.constraint_length
+        S = self.num_states
+        steps = length + K - 1
+        keep = self._keep_mask(steps)
+
+        symbols = np.zeros((count, steps, len(self.generators)), dtype=np.int32)
+        symbols[:, keep] = received
+        weights = keep.astype(np.int32)
+
+        # Next state s is reached from register (s << 1) | x, whose low K-1 bits are the previous state
+        next_states = np.arange(S)
+        registers = (next_states[:, None] << 1) | np.array([0, 1])
+        previous = registers & (S - 1)
+        expected_t = self.expected.T
+
+        metrics = np.full((count, S), 1 << 20, dtype=np.int32)
+        metrics[:, 0] = 0
+        decisions = np.empty((steps, count, S), dtype=bool)
+        frames = np.arange(count)
+
+        for t in range(steps):
+            # Hamming distance to every register's output, ignoring punctured positions
+            observed = symbols[:, t] * weights[t]
+            distances = observed.sum(axis=1)[:, None] + (weights[t] @ expected_t)[None, :] - 2 * (observed @ expected_t)
+            candidates = metrics[:, previous] + distances[:, registers]
+            choice = candidates[:, :, 1] < candidates[:, :, 0]
+            metrics = np.where(choice, candidates[:, :, 1], candidates[:, :, 0])
+            decisions[t] = choice
+
+        state = np.zeros(count, dtype=np.int64)
+        decoded = np.empty((count, steps), dtype=np.uint8)
+        for t in range(steps - 1, -1, -1):
+            register = (state << 1) | decisions[t, frames, state]
+            decoded[:, t] = (register >> (K - 1)) & 1
+            state = register & (S - 1)
+
+        return decoded[:, :length], metrics[:, 0]
+
+    def decode(self, encoded_bits: Bits, parameters: dict) -> Tuple[Bits, int]:
+        packed = isinstance(encoded_bits, BitBuffer)
+        received = as_bitbuffer(encoded_bits)
+        original_length = parameters['original_length']
+
+        groups = self._frames(original_length)
+        expected_length = self.encoded_length(original_length)
+        if len(received) < expected_length:
+            print(f"Warning: Padding encoded data from {len(received)} to {expected_length} bits")
+            received = received.pad_to_multiple(expected_length)
+        elif len(received) > expected_length:
+            received = received[:expected_length]
+
+        writer = BitWriter()
+        total_errors = 0
+        position = 0
+        for count, length in groups:
+            frame_length = int(self._keep_mask(length + self.constraint_length - 1).sum())
+            frames = received[position:position + count * frame_length].to_array().reshape(count, frame_length)
+            decoded, errors = self._viterbi(frames, length)
+            writer.write(decoded.reshape(-1))
+            total_errors += int(errors.sum())
+            position += count * frame_length
+        decoded_bits = writer.getvalue()
+
+        if not packed:
+            decoded_bits = decoded_bits.to_str()
+
+        return decoded_bits, total_errors
@@ -1,62 +1,354 @@
-from collections import Counter
+from bisect import bisect_left
+import math
 from typing import Dict, Tuple
+import numpy as np
+import hashlib
+from bitbuffer import BitBuffer, Bits
+from cache import LRUCache, code_table_id, normalize_code_table
+from codetable import CodeTable
+from utils import byte_histogram
+
+code_table_cache = LRUCache(maxsize=64)
+decode_table_cache = LRUCache(maxsize=64)
+encode_table_cache = LRUCache(maxsize=64)
+flat_table_cache = LRUCache(maxsize=16)
+
+# Codes longer than the first table's width continue in a second table for their prefix; windows are
+# read from 32-bit words, so a second table can be at most 24 bits wide
+FLAT_TABLE_BITS = 16
+SUB_TABLE_BITS = 24
+FLAT_TABLE_SIZE = 1 << 24
+# Below this many bits a single pass through the nested table is cheaper than starting the lanes
+LANE_MIN_BITS = 1 << 15
+# Lanes are LANE_SCALE * sqrt(bits) long, which balances the number of steps against their width
+LANE_SCALE = 4
+# A lane is joined to the one before it only where their paths meet within this many codes
+SYNC_STEPS = 64
 
 class FanoShannon:
-    def __init__(self):
-        pass
+    name = 'fano-shannon'
+    model_parameter = 'code_table'
+    prefix_code = True
+    
+    def __init__(self, symbol_size: int = 1, sync_interval: int = 1 << 16):
+        if symbol_size not in (1, 2, 3):
+            raise ValueError("Symbol size must be 1, 2 or 3 bytes")
+        self.symbol_size = symbol_size
+        self.alphabet_size = 1 << (8 * symbol_size)
+        self.sync_interval = sync_interval
+        self.sync_points = []
+    
+    def _symbols(self, data: bytes) -> np.ndarray:
+        if self.symbol_size == 1:
+            return np.frombuffer(data, dtype=np.uint8)
+        
+        padding_needed = (self.symbol_size - len(data) % self.symbol_size) % self.symbol_size
+        raw = np.frombuffer(bytes(data) + bytes(padding_needed) if padding_needed else data, dtype=np.uint8)
+        raw = raw.reshape(-1, self.symbol_size).astype(np.int64)
+        weights = 1 << (8 * np.arange(self.symbol_size - 1, -1, -1))
+        return raw @ weights
+    
+    def _symbols_to_bytes(self, symbols) -> bytes:
+        if self.symbol_size == 1:
+            return bytes(symbols)
+        
+        symbols = np.asarray(symbols, dtype=np.int64)
+        shifts = 8 * np.arange(self.symbol_size - 1, -1, -1)
+        return ((symbols[:, None] >> shifts) & 0xFF).astype(np.uint8).tobytes()
     
-    def _calculate_probabilities(self, data: bytes) -> Dict[int, float]:
-        counter = Counter(data)
-        total = len(data)
-        return {symbol: count / total for symbol, count in counter.items()}
+    def _count_symbols(self, data: bytes, histogram=None) -> Dict[int, int]:
+        if histogram is not None:
+            # A precomputed byte histogram (e.g. from ByteStatistics) saves another pass over the data
+            if self.symbol_size != 1:
+                raise ValueError("A byte histogram only applies to 1-byte symbols")
+            histogram = np.asarray(histogram)
+            return {int(symbol): int(histogram[symbol]) for symbol in np.flatnonzero(histogram)}
+        if self.symbol_size == 1:
+            return self._count_symbols(data, byte_histogram(data))
+        symbols, counts = np.unique(self._symbols(data), return_counts=True)
+        return dict(zip(symbols.tolist(), counts.tolist()))
 
-    def _build_fano_codes(self, symbols_freq):
+    def _build_fano_code_pairs(self, symbols_freq) -> Dict[int, Tuple[int, int]]:
         if not symbols_freq:
             return {}
         if len(symbols_freq) == 1:
-            return {list(symbols_freq.keys())[0]: '0'}
+            return {list(symbols_freq.keys())[0]: (0, 1)}
         
         sorted_symbols = sorted(symbols_freq.items(), key=lambda x: x[1], reverse=True)
         
-        def split_symbols(symbols):
-            if len(symbols) == 1:
-                return {symbols[0][0]: ''}
-            if len(symbols) == 2:
-                return {symbols[0][0]: '0', symbols[1][0]: '1'}
+        prefix = [0]
+        for _, freq in sorted_symbols:
+            prefix.append(prefix[-1] + freq)
+        # Splitting at i is balanced when 2 * prefix[i] is closest to prefix[lo] + prefix[hi]
+        doubled = [2 * total for total in prefix]
+        
+        codes = {}
+        stack = [(0, len(sorted_symbols), 0, 0)]
+        
+        while stack:
+            lo, hi, bits, length = stack.pop()
+            if hi - lo == 1:
+                codes[sorted_symbols[lo][0]] = (bits, length)
+                continue
             
-            total = sum(freq for _, freq in symbols)
-            best_split = min(range(1, len(symbols)), 
-                            key=lambda i: abs(2 * sum(freq for _, freq in symbols[:i]) - total))
+            target = prefix[lo] + prefix[hi]
+            split = min(max(bisect_left(doubled, target, lo + 1, hi), lo + 1), hi - 1)
+            if split - 1 > lo and abs(doubled[split - 1] - target) <= abs(doubled[split] - target):
+                split -= 1
             
-            left, right = symbols[:best_split], symbols[best_split:]
+            stack.append((split, hi, (bits << 1) | 1, length + 1))
+            stack.append((lo, split, bits << 1, length + 1))
         
-            codes = {}
-            for symbol, code in split_symbols(left).items():
-                codes[symbol] = '0' + code
-            for symbol, code in split_symbols(right).items():
-                codes[symbol] = '1' + code
-                
-            return codes
+        return codes
+
+    def _build_fano_codes(self, symbols_freq) -> Dict[int, str]:
+        pairs = self._build_fano_code_pairs(symbols_freq)
+        return {symbol: format(bits, f'0{length}b') for symbol, (bits, length) in pairs.items()}
+    
+    def build_code_table(self, symbols_freq) -> Dict[int, str]:
+        return self._build_fano_codes(symbols_freq)
+    
+    def export_model(self, code_table: Dict[int, str]) -> Dict:
+        return code_table
+    
+    def import_model(self, model: Dict) -> Dict[int, str]:
+        return normalize_code_table(model)
+    
+    def encode_table(self, code_table: Dict[int, str]) -> Tuple[CodeTable, np.ndarray]:
+        def build():
+            codes = normalize_code_table(code_table)
+            if self.symbol_size == 1:
+                return CodeTable.from_dict(codes), None
+            # Wide alphabets are mostly empty, so the table is indexed by rank among the symbols present
+            present = np.array(sorted(codes), dtype=np.int64)
+            return CodeTable.from_dict({rank: codes[symbol] for rank, symbol in enumerate(present.tolist())}, len(present)), present
         
-        return split_symbols(sorted_symbols)
+        return encode_table_cache.get_or_create((code_table_id(code_table), self.symbol_size), build)
     
-    def compress(self, data: bytes) -> Tuple[str, Dict[int, str]]:
+    def _encode_packed(self, data: bytes, code_table: Dict[int, str], chunk_size: int = 1 << 16,
+                       sync_points: list = None, total_bits: int = None) -> BitBuffer:
+        table, present = self.encode_table(code_table)
+        symbols = self._symbols(data)
+        if present is not None:
+            symbols = np.searchsorted(present, symbols)
+        
+        compressed_bits, points = table.encode(
+            symbols, total_bits, chunk_size if sync_points is not None else None
+        )
+        if sync_points is not None:
+            sync_points.extend(points)
+        return compressed_bits
+    
+    def compress(self, data: bytes, packed: bool = False, histogram=None) -> Tuple[Bits, Dict[int, str]]:
         if not data:
-            return '', {}
+            return (BitBuffer() if packed else ''), {}
         
-        symbols_freq = Counter(data)
+        symbols_freq = self._count_symbols(data, histogram)
         
-        self.code_table = self._build_fano_codes(symbols_freq)
+        histogram_key = hashlib.sha256(repr(sorted(symbols_freq.items())).encode('ascii')).hexdigest()
+        self.code_table = code_table_cache.get_or_create(
+            (self.name, histogram_key), lambda: self.build_code_table(symbols_freq)
+        )
         
-        if len(self.code_table) == 1:
-            symbol = list(self.code_table.keys())[0]
-            compressed_bits = '0' * len(data)
+        # The histogram fixes the output length, so the bit stream is written into one preallocated buffer
+        total_bits = sum(count * len(self.code_table[symbol]) for symbol, count in symbols_freq.items())
+        if packed:
+            self.sync_points = []
+            compressed_bits = self._encode_packed(
+                data, self.code_table, self.sync_interval, self.sync_points, total_bits
+            )
         else:
-            compressed_bits = ''.join(self.code_table.get(byte, '0') for byte in data)
+            compressed_bits = self._encode_packed(data, self.code_table, total_bits=total_bits).to_str()
         
         return compressed_bits, self.code_table
     
-    def decompress(self, compressed_bits: str, code_table: Dict) -> bytes:
+    def _build_lookup_table(self, codes, table_bits: int = 12):
+        width = min(table_bits, max(length for _, _, length in codes))
+        table = [None] * (1 << width)
+        groups = {}
+        
+        for symbol, value, length in codes:
+            if length <= width:
+                start = value << (width - length)
+                entry = (symbol, length, None)
+                for index in range(start, start + (1 << (width - length))):
+                    table[index] = entry
+            else:
+                prefix = value >> (length - width)
+                suffix = value & ((1 << (length - width)) - 1)
+                groups.setdefault(prefix, []).append((symbol, suffix, length - width))
+        
+        for prefix, group in groups.items():
+            table[prefix] = (None, width, self._build_lookup_table(group, table_bits))
+        
+        return table, width
+    
+    def build_decode_table(self, code_table: Dict[int, str], table_bits: int = 12):
+        def build():
+            codes = [(symbol, int(code, 2), len(code)) for symbol, code in code_table.items()]
+            return self._build_lookup_table(codes, table_bits)
+        
+        return decode_table_cache.get_or_create((code_table_id(code_table), table_bits), build)
+    
+    def _decode_symbols(self, root, compressed_bits: BitBuffer, count: int = None) -> Tuple[list, int]:
+        data = compressed_bits.to_bytes() + bytes(8)
+        remaining = len(compressed_bits)
+        # Stops after count symbols when the stream carries more than one table's worth of codes
+        symbols_left = -1 if count is None else count
+        
+        result = bytearray() if self.symbol_size == 1 else []
+        accumulator = 0
+        available = 0
+        position = 0
+        
+        while remaining > 0 and symbols_left:
+            table, width = root
+            symbol_remaining = remaining
+            while True:
+                while available < width:
+                    accumulator = (accumulator << 8) | data[position]
+                    position += 1
+                    available += 8
+                
+                entry = table[(accumulator >> (available - width)) & ((1 << width) - 1)]
+                if entry is None or entry[1] > remaining:
+                    return result, len(compressed_bits) - symbol_remaining
+                
+                symbol, length, subtable = entry
+                available -= length
+                remaining -= length
+                if subtable is None:
+                    break
+                table, width = subtable
+            
+            result.append(symbol)
+            accumulator &= (1 << available) - 1
+            symbols_left -= 1
+        
+        return result, len(compressed_bits) - remaining
+    
+    def build_flat_decode_table(self, code_table: Dict[int, str]):
+        def build():
+            width = min(FLAT_TABLE_BITS, max(len(code) for code in code_table.values()))
+            dtype = np.uint8 if self.symbol_size == 1 else np.int32
+            symbols = [np.zeros(1 << width, dtype=dtype)]
+            lengths = [np.zeros(1 << width, dtype=np.int64)]
+            groups = {}
+            for symbol, code in code_table.items():
+                value, length = int(code, 2), len(code)
+                if length <= width:
+                    start = value << (width - length)
+                    symbols[0][start:start + (1 << (width - length))] = symbol
+                    lengths[0][start:start + (1 << (width - length))] = length
+                else:
+                    suffix = value & ((1 << (length - width)) - 1)
+                    groups.setdefault(value >> (length - width), []).append((symbol, suffix, length))
+            
+            # Longer codes continue in a second table per prefix, placed after the first one
+            links = np.zeros(1 << width, dtype=np.int64)
+            link_widths = np.zeros(1 << width, dtype=np.int64)
+            size = 1 << width
+            for prefix, group in groups.items():
+                sub_width = max(length for _, _, length in group) - width
+                if sub_width > SUB_TABLE_BITS or size + (1 << sub_width) > FLAT_TABLE_SIZE:
+                    return None
+                links[prefix], link_widths[prefix] = size, sub_width
+                symbols.append(np.zeros(1 << sub_width, dtype=dtype))
+                lengths.append(np.zeros(1 << sub_width, dtype=np.int64))
+                for symbol, suffix, length in group:
+                    start = suffix << (width + sub_width - length)
+                    symbols[-1][start:start + (1 << (width + sub_width - length))] = symbol
+                    lengths[-1][start:start + (1 << (width + sub_width - length))] = length
+                size += 1 << sub_width
+            
+            return np.concatenate(symbols), np.concatenate(lengths), width, links, link_widths
+        
+        return flat_table_cache.get_or_create((code_table_id(code_table), self.symbol_size), build)
+    
+    def _decode_lanes(self, flat, compressed_bits: BitBuffer) -> Tuple[np.ndarray, int]:
+        # The stream is cut into lanes that all decode one code per step together. A lane starts at a
+        # fixed bit that may fall inside a code, but a prefix code falls back into step within a few
+        # codes, so each lane's symbols are kept from where its path meets the true one
+        symbols, lengths, width, links, link_widths = flat
+        total = len(compressed_bits)
+        data = np.frombuffer(compressed_bits.to_bytes() + bytes(8), dtype=np.uint8).astype(np.uint32)
+        # The 32 bits starting at each byte, so a window is one gather and a shift
+        words = (data[:-3] << 24) | (data[1:-2] << 16) | (data[2:-1] << 8) | data[3:]
+        
+        def lookup(positions, widths):
+            return (words[positions >> 3] >> (32 - widths - (positions & 7))) & ((1 << widths) - 1)
+        
+        def step(positions):
+            codes = lookup(positions, width)
+            linked = np.flatnonzero(links[codes])
+            if len(linked):
+                prefixes = codes[linked]
+                codes[linked] = links[prefixes] + lookup(positions[linked] + width, link_widths[prefixes])
+            return codes, lengths[codes]
+        
+        lane_bits = min(max(LANE_SCALE * math.isqrt(total), 1024), 1 << 16)
+        starts = np.arange(0, total, lane_bits, dtype=np.int64)
+        ends = np.minimum(starts + lane_bits, total)
+        
+        positions = starts.copy()
+        counts = np.zeros(len(starts), dtype=np.int64)
+        live = positions < ends
+        steps, visited = [], []
+        while live.any():
+            codes, code_lengths = step(positions)
+            valid = live & (code_lengths > 0) & (positions + code_lengths <= total)
+            if len(visited) < SYNC_STEPS:
+                visited.append(positions.copy())
+            steps.append(symbols[codes])
+            counts += valid
+            positions += np.where(valid, code_lengths, 0)
+            live = valid & (positions < ends)
+        
+        decoded = np.stack(steps)
+        visited = np.stack(visited)
+        
+        pieces = []
+        position = 0
+        for lane in range(len(starts)):
+            end = int(ends[lane])
+            seen = {p: index for index, p in enumerate(visited[:counts[lane], lane].tolist())}
+            # Until the true path reaches a bit this lane also stopped at, codes are read one at a time
+            single = []
+            while position < end and position not in seen:
+                code = (int(words[position >> 3]) >> (32 - width - (position & 7))) & ((1 << width) - 1)
+                if links[code]:
+                    sub_width, sub_position = int(link_widths[code]), position + width
+                    code = int(links[code]) + ((int(words[sub_position >> 3]) >> (32 - sub_width - (sub_position & 7)))
+                                               & ((1 << sub_width) - 1))
+                length = int(lengths[code])
+                if length == 0 or position + length > total:
+                    break
+                single.append(symbols[code])
+                position += length
+            pieces.append(np.array(single, dtype=symbols.dtype))
+            
+            if position in seen and position < end:
+                pieces.append(decoded[seen[position]:counts[lane], lane])
+                position = int(positions[lane])
+            if position < end:
+                # An incomplete or invalid code stops the whole stream, as in the nested table decoder
+                break
+        
+        return np.concatenate(pieces), position
+    
+    def decode_bits(self, code_table: Dict[int, str], compressed_bits: BitBuffer) -> Tuple[list, int]:
+        flat = self.build_flat_decode_table(code_table) if len(compressed_bits) >= LANE_MIN_BITS else None
+        if flat is None:
+            return self._decode_symbols(self.build_decode_table(code_table), compressed_bits)
+        return self._decode_lanes(flat, compressed_bits)
+    
+    def _decompress_packed(self, compressed_bits: BitBuffer, code_table: Dict[int, str]) -> bytes:
+        decoder = FanoDecoder(self, code_table)
+        result = decoder.feed(compressed_bits)
+        decoder.finish()
+        return result
+    
+    def decompress(self, compressed_bits: Bits, code_table: Dict, original_size: int = None) -> bytes:
         if not compressed_bits or not code_table:
             return b''
         
@@ -65,8 +357,18 @@ class FanoShannon:
         
         if len(code_table) == 1:
             symbol = list(code_table.keys())[0]
-            return bytes([symbol] * len(compressed_bits))
+            result = self._symbols_to_bytes([symbol] * len(compressed_bits))
+        elif isinstance(compressed_bits, BitBuffer):
+            result = self._decompress_packed(compressed_bits, code_table)
+        else:
+            result = self._decompress_str(compressed_bits, code_table)
+        
+        if original_size is not None:
+            result = result[:original_size]
         
+        return result
+    
+    def _decompress_str(self, compressed_bits: str, code_table: Dict[int, str]) -> bytes:
         decode_table = {code: symbol for symbol, code in code_table.items()}
         
         result = []
@@ -81,4 +383,36 @@ class FanoShannon:
         if current_code:
             print(f"Warning: Incomplete code at end of compressed data: {current_code}")
         
-        return bytes(result)
\ No newline at end of file
+        return self._symbols_to_bytes(result)
+
+class FanoDecoder:
+    def __init__(self, fano_shannon: FanoShannon, code_table: Dict, total_bits: int = None):
+        if isinstance(list(code_table.keys())[0], str):
+            code_table = {int(k): v for k, v in code_table.items()}
+        
+        self.fano_shannon = fano_shannon
+        self.code_table = code_table
+        self.remaining_bits = total_bits
+        self.pending = BitBuffer()
+    
+    def feed(self, compressed_bits: BitBuffer) -> bytes:
+        if self.remaining_bits is not None:
+            compressed_bits = compressed_bits[:self.remaining_bits]
+            self.remaining_bits -= len(compressed_bits)
+        
+        if len(self.code_table) == 1:
+            symbol = list(self.code_table.keys())[0]
+            return self.fano_shannon._symbols_to_bytes([symbol] * len(compressed_bits))
+        
+        if len(self.pending):
+            compressed_bits = BitBuffer.concat([self.pending, compressed_bits])
+        
+        symbols, consumed = self.fano_shannon.decode_bits(self.code_table, compressed_bits)
+        self.pending = compressed_bits[consumed:]
+        
+        return self.fano_shannon._symbols_to_bytes(symbols)
+    
+    def finish(self):
+        if len(self.pending):
+            print(f"Warning: Incomplete code at end of compressed data: {self.pending.to_str()}")
+            self.pending = BitBuffer()
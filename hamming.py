@@ -0,0 +1,112 @@
+import numpy as np
+from typing import Tuple
+from bitbuffer import BitBuffer, BitWriter, Bits, as_bitbuffer
+from utils import binomial_tail
+
+class HammingCoding:
+    name = 'hamming'
+    extended = False
+
+    def __init__(self, block_chunk: int = 1 << 16):
+        self.k = 4
+        self.code_length = 8 if self.extended else 7
+        self.block_length = self.code_length
+        self.message_length = self.k
+        self.rate = self.k / self.code_length
+        self.block_chunk = block_chunk
+        self.codewords = self._generate_codewords()
+        self.decoded, self.corrected, self.detected = self._generate_decode_tables()
+
+    @classmethod
+    def from_parameters(cls, parameters: dict) -> 'HammingCoding':
+        return cls()
+
+    def _generate_codewords(self) -> np.ndarray:
+        data = (np.arange(16)[:, None] >> np.arange(3, -1, -1)) & 1
+        d1, d2, d3, d4 = data.T
+        # Positions 1..7 hold p1 p2 d1 p3 d2 d3 d4, so a single error's syndrome is its position
+        columns = [d1 ^ d2 ^ d4, d1 ^ d3 ^ d4, d1, d2 ^ d3 ^ d4, d2, d3, d4]
+        if self.extended:
+            columns.append(np.bitwise_xor.reduce(np.stack(columns), axis=0))
+        return np.stack(columns, axis=1).astype(np.uint8)
+
+    def _generate_decode_tables(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Every possible received word is small enough to decode up front by nearest codeword
+        words = (np.arange(1 << self.code_length)[:, None] >> np.arange(self.code_length - 1, -1, -1)) & 1
+        distances = (words[:, None, :] != self.codewords[None, :, :]).sum(axis=2)
+        nearest = np.argmin(distances, axis=1)
+        best = distances[np.arange(len(words)), nearest]
+        ambiguous = (distances == best[:, None]).sum(axis=1) > 1
+
+        decoded = self.codewords[nearest][:, [2, 4, 5, 6]]
+        # Double errors in the extended code are detected but left uncorrected
+        decoded[ambiguous] = words[ambiguous][:, [2, 4, 5, 6]]
+        corrected = np.where(ambiguous, 0, best)
+        return decoded.astype(np.uint8), corrected, ambiguous
+
+    def encoded_length(self, data_length: int) -> int:
+        return -(-data_length // self.k) * self.code_length
+
+    def estimated_block_error(self, error_rate: float) -> float:
+        return binomial_tail(self.code_length, 1, error_rate)
+
+    def encode(self, data_bits: Bits) -> Tuple[Bits, dict]:
+        padding_needed = (self.k - len(data_bits) % self.k) % self.k
+
+        data = as_bitbuffer(data_bits).pad_to_multiple(self.k)
+        weights = 1 << np.arange(self.k - 1, -1, -1)
+        chunk_bits = self.block_chunk * self.k
+
+        writer = BitWriter()
+        for start in range(0, len(data), chunk_bits):
+            blocks = data[start:start+chunk_bits].to_array().reshape(-1, self.k)
+            writer.write(self.codewords[blocks.astype(np.int64) @ weights])
+        encoded = writer.getvalue()
+
+        parameters = {
+            'n': self.code_length,
+            'original_length': len(data_bits),
+            'padding_added': padding_needed
+        }
+
+        if isinstance(data_bits, str):
+            return encoded.to_str(), parameters
+        return encoded, parameters
+
+    def decode_blocks(self, received: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        blocks = np.asarray(received, dtype=np.int64).reshape(-1, self.code_length)
+        words = blocks @ (1 << np.arange(self.code_length - 1, -1, -1))
+        return self.decoded[words], self.corrected[words], self.detected[words]
+
+    def decode(self, encoded_bits: Bits, parameters: dict) -> Tuple[Bits, int]:
+        packed = isinstance(encoded_bits, BitBuffer)
+
+        if len(encoded_bits) % self.code_length != 0:
+            truncated_length = (len(encoded_bits) // self.code_length) * self.code_length
+            print(f"Warning: Truncating encoded data from {len(encoded_bits)} to {truncated_length} bits")
+            encoded_bits = encoded_bits[:truncated_length]
+
+        received = as_bitbuffer(encoded_bits)
+        chunk_bits = self.block_chunk * self.code_length
+
+        writer = BitWriter()
+        total_errors = 0
+        detected_blocks = 0
+        for start in range(0, len(received), chunk_bits):
+            decoded, corrected, detected = self.decode_blocks(received[start:start+chunk_bits].to_array())
+            writer.write(decoded)
+            total_errors += int(corrected.sum())
+            detected_blocks += int(detected.sum())
+        decoded_bits = writer.getvalue()[:parameters['original_length']]
+
+        if detected_blocks:
+            print(f"Warning: {detected_blocks} blocks had uncorrectable errors")
+
+        if not packed:
+            decoded_bits = decoded_bits.to_str()
+
+        return decoded_bits, total_errors
+
+class SECDEDCoding(HammingCoding):
+    name = 'secded'
+    extended = True
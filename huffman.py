@@ -0,0 +1,57 @@
+import heapq
+from typing import Dict
+
+from cache import normalize_code_table
+from fanoshannon import FanoShannon
+
+def canonical_codes(code_lengths: Dict) -> Dict[int, str]:
+    codes = {}
+    code = 0
+    previous_length = 0
+    for symbol, length in sorted(normalize_code_table(code_lengths).items(), key=lambda x: (x[1], x[0])):
+        code <<= length - previous_length
+        codes[symbol] = format(code, f'0{length}b')
+        code += 1
+        previous_length = length
+    return codes
+
+class CanonicalHuffman(FanoShannon):
+    name = 'huffman'
+    model_parameter = 'code_lengths'
+
+    def _build_code_lengths(self, symbols_freq) -> Dict[int, int]:
+        if not symbols_freq:
+            return {}
+        if len(symbols_freq) == 1:
+            return {next(iter(symbols_freq)): 1}
+
+        # Each heap entry carries the symbols under it, so merging deepens all of them by one
+        heap = [(freq, symbol, [symbol]) for symbol, freq in symbols_freq.items()]
+        heapq.heapify(heap)
+        lengths = dict.fromkeys(symbols_freq, 0)
+
+        while len(heap) > 1:
+            freq_a, key_a, symbols_a = heapq.heappop(heap)
+            freq_b, key_b, symbols_b = heapq.heappop(heap)
+            for symbol in symbols_a:
+                lengths[symbol] += 1
+            for symbol in symbols_b:
+                lengths[symbol] += 1
+            if len(symbols_a) < len(symbols_b):
+                symbols_a, symbols_b = symbols_b, symbols_a
+            symbols_a.extend(symbols_b)
+            heapq.heappush(heap, (freq_a + freq_b, min(key_a, key_b), symbols_a))
+
+        return lengths
+
+    def codes_from_lengths(self, code_lengths: Dict) -> Dict[int, str]:
+        return canonical_codes(code_lengths)
+
+    def build_code_table(self, symbols_freq) -> Dict[int, str]:
+        return self.codes_from_lengths(self._build_code_lengths(symbols_freq))
+
+    def export_model(self, code_table: Dict[int, str]) -> Dict[int, int]:
+        return {symbol: len(code) for symbol, code in code_table.items()}
+
+    def import_model(self, model: Dict) -> Dict[int, str]:
+        return self.codes_from_lengths(model)
@@ -0,0 +1,24 @@
+import math
+import zlib
+from typing import List, Sequence, Tuple
+from bitbuffer import BitBuffer
+
+DEFAULT_FRAME_BITS = 1 << 16
+
+def frame_bits_for(coder, target: int = DEFAULT_FRAME_BITS) -> int:
+    # Frames hold whole channel-code messages and whole bytes, so each one encodes on its
+    # own to a contiguous slice of the encoded stream and is checksummed straight off the bytes
+    align = math.lcm(coder.message_length, 8)
+    return max(1, -(-target // align)) * align
+
+def frame_spans(length: int, frame_bits: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + frame_bits, length)) for start in range(0, length, frame_bits)]
+
+def frame_checksums(bits: BitBuffer, frame_bits: int) -> List[int]:
+    data = bits.to_memoryview()
+    return [zlib.crc32(data[start // 8:-(-stop // 8)]) for start, stop in frame_spans(len(bits), frame_bits)]
+
+def failed_frames(bits: BitBuffer, frame_bits: int, checksums: Sequence[int], frames: Sequence[int] = None) -> List[int]:
+    frames = range(len(checksums)) if frames is None else frames
+    actual = frame_checksums(bits, frame_bits)
+    return [index for index, checksum in zip(frames, actual) if checksum != checksums[index]]
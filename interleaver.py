@@ -0,0 +1,76 @@
+import numpy as np
+from bitbuffer import BitBuffer
+
+class BlockInterleaver:
+    def __init__(self, depth: int, block_bits: int, unit: str = None):
+        if depth < 1:
+            raise ValueError("Interleaver depth must be at least 1")
+        if block_bits < 1:
+            raise ValueError("Interleaver block size must be at least 1 bit")
+        self.depth = depth
+        self.block_bits = block_bits
+        # Whole bytes can be permuted straight on the packed buffer
+        self.unit = unit or ('byte' if block_bits % 8 == 0 else 'bit')
+        if self.unit not in ('byte', 'bit') or (self.unit == 'byte' and block_bits % 8):
+            raise ValueError(f"Unsupported interleaver unit {self.unit} for {block_bits}-bit blocks")
+
+    @classmethod
+    def for_coder(cls, coder, depth: int) -> 'BlockInterleaver':
+        # Block codes interleave whole codewords byte by byte; codes without block structure
+        # get a square bit interleaver, since a Viterbi decoder cannot absorb byte-long bursts
+        if coder.block_length > 1:
+            return cls(depth, coder.block_length)
+        return cls(depth, depth, 'bit')
+
+    @classmethod
+    def from_parameters(cls, parameters: dict):
+        if not parameters.get('interleave_depth'):
+            return None
+        return cls(parameters['interleave_depth'], parameters['interleave_block_bits'], parameters.get('interleave_unit'))
+
+    def parameters(self, length: int = None) -> dict:
+        parameters = {
+            'interleave_depth': self.depth,
+            'interleave_block_bits': self.block_bits,
+            'interleave_unit': self.unit
+        }
+        if length is not None:
+            parameters['interleave_length'] = length
+        return parameters
+
+    def _permute(self, units: np.ndarray, units_per_block: int, inverse: bool) -> np.ndarray:
+        # Rows are codewords; transmitting column by column puts `depth` codewords between
+        # neighbouring units of the same codeword, so a burst is shared out across them
+        blocks = len(units) // units_per_block
+        full = blocks // self.depth * self.depth
+        split = full * units_per_block
+        end = blocks * units_per_block
+        head, tail = units[:split], units[split:end]
+
+        if inverse:
+            head = head.reshape(-1, units_per_block, self.depth).transpose(0, 2, 1)
+            tail = tail.reshape(units_per_block, -1).T
+        else:
+            head = head.reshape(-1, self.depth, units_per_block).transpose(0, 2, 1)
+            tail = tail.reshape(-1, units_per_block).T
+
+        # The transposes are views; the only copy is writing them out in their new order
+        output = np.empty_like(units)
+        output[:split].reshape(head.shape)[...] = head
+        output[split:end].reshape(tail.shape)[...] = tail
+        # A trailing partial block, e.g. the end of a convolutional stream, is sent as is
+        output[end:] = units[end:]
+        return output
+
+    def _apply(self, bits: BitBuffer, inverse: bool) -> BitBuffer:
+        if self.unit == 'byte' and len(bits) % 8 == 0:
+            packed = bits.packed[:len(bits) // 8]
+            return BitBuffer(self._permute(packed, self.block_bits // 8, inverse), len(bits))
+
+        return BitBuffer.from_array(self._permute(bits.to_array(), self.block_bits, inverse))
+
+    def interleave(self, bits: BitBuffer) -> BitBuffer:
+        return self._apply(bits, inverse=False)
+
+    def deinterleave(self, bits: BitBuffer) -> BitBuffer:
+        return self._apply(bits, inverse=True)
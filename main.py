@@ -1,10 +1,41 @@
+import argparse
 import sys
 import os
+from asyncclient import AsyncCompressionClient
 from client import CompressionClient
-from server import run_server
+from channel import ChannelSimulator
+from integrity import DEFAULT_FRAME_BITS
+from server import run_server, run_production_server, server
+from metrics import set_enabled
+from channelcoding import CHANNEL_CODES
+from sourcecoding import SOURCE_CODERS
 
-def run_client_mode():
-    client = CompressionClient()
+def run_client_mode(args):
+    parser = argparse.ArgumentParser(prog="main.py client")
+    parser.add_argument('--url', default="http://localhost:5000")
+    parser.add_argument('--format', choices=['json', 'binary'], default='json')
+    parser.add_argument('--compression', nargs='+', default=['fano-shannon'], choices=list(SOURCE_CODERS))
+    parser.add_argument('--encoding', default='orthogonal', choices=list(CHANNEL_CODES) + ['adaptive'])
+    parser.add_argument('--n', type=int, default=7, help="Orthogonal code dimension: n bits per 2^n-bit block")
+    parser.add_argument('--target-ber', type=float, default=1e-6)
+    parser.add_argument('--channel', default='uniform', choices=ChannelSimulator.MODELS)
+    parser.add_argument('--interleave', type=int, default=0, metavar='DEPTH')
+    parser.add_argument('--frame-bits', type=int, default=DEFAULT_FRAME_BITS, metavar='BITS')
+    parser.add_argument('--dir', help="Send every image in a directory with the pipelined async client")
+    parser.add_argument('--errors', type=float, default=0.0, metavar='PCT', help="Error percentage for --dir")
+    parser.add_argument('--in-flight', type=int, default=4, metavar='N', help="Concurrent uploads for --dir")
+    options = parser.parse_args(args)
+    
+    client = CompressionClient(options.url, wire_format=options.format, compression=options.compression[0],
+                               channel_code=options.encoding, target_ber=options.target_ber,
+                               channel_model=options.channel, interleave_depth=options.interleave,
+                               frame_bits=options.frame_bits, max_in_flight=options.in_flight, n=options.n)
+    if len(options.compression) > 1:
+        client.negotiate(options.compression)
+    
+    if options.dir:
+        AsyncCompressionClient(client).run_dir(options.dir, options.errors)
+        return
     
     while True:
         print("\n---CLIENT---")
@@ -44,28 +75,115 @@ def run_client_mode():
         except Exception as e:
             print(f"Error: {e}")
 
-def run_server_mode():
+def run_server_mode(args):
+    parser = argparse.ArgumentParser(prog="main.py server")
+    parser.add_argument('--production', action='store_true')
+    parser.add_argument('--host', default=None)
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--decode-workers', type=int, default=None, metavar='N',
+                        help="Processes for parallel block decoding per server worker (default ITC_DECODE_WORKERS or 1)")
+    parser.add_argument('--no-metrics', action='store_true')
+    options = parser.parse_args(args)
+    
     print("Starting server mode...")
-    print("Server will run on http://localhost:5000")
+    if options.no_metrics:
+        set_enabled(False)
+    if options.decode_workers is not None:
+        server.set_decode_workers(options.decode_workers)
     
     try:
-        run_server(host='localhost', port=5000, debug=True)
+        if options.production:
+            run_production_server(
+                host=options.host or '0.0.0.0', port=options.port,
+                workers=options.workers, threads=options.threads
+            )
+        else:
+            print(f"Server will run on http://{options.host or 'localhost'}:{options.port}")
+            run_server(host=options.host or 'localhost', port=options.port, debug=True)
     except KeyboardInterrupt:
         print("\nServer stopped.")
 
+def run_bench_mode(args):
+    import json
+    import benchmark
+    
+    parser = argparse.ArgumentParser(prog="main.py bench")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1 << 16, 1 << 18])
+    parser.add_argument('--images', nargs='*', default=['images/linkedin.png', 'images/volume.png'])
+    parser.add_argument('--errors', type=float, nargs='*', default=[0.0, 5.0, 10.0, 20.0])
+    parser.add_argument('--trials', type=int, default=1)
+    parser.add_argument('--http', action='store_true')
+    parser.add_argument('--format', choices=['json', 'binary'], default='binary')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--micro', action='store_true')
+    parser.add_argument('--output', default=None)
+    options = parser.parse_args(args)
+    
+    results = {
+        'pipeline': benchmark.bench_pipeline(
+            options.sizes, options.images, options.errors, options.trials,
+            options.http, options.format, options.seed
+        )
+    }
+    if options.micro:
+        results['micro'] = benchmark.main()
+    
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {options.output}")
+    else:
+        print(output)
+
+def run_loadtest_mode(args):
+    from benchmark import load_test
+    
+    parser = argparse.ArgumentParser(prog="main.py loadtest")
+    parser.add_argument('--url', default="http://localhost:5000")
+    parser.add_argument('--file', default='images/volume.png')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--errors', type=float, default=1.0)
+    parser.add_argument('--format', choices=['json', 'binary'], default='binary')
+    options = parser.parse_args(args)
+    
+    load_test(options.url, options.file, options.requests, options.concurrency,
+              options.errors, options.format)
+
 def show_usage():
     print("""
 Usage: python main.py [mode]
 
 Modes:
   server     - Run only the server
+               [--production] [--host HOST] [--port PORT] [--workers N] [--threads N] [--decode-workers N] [--no-metrics]
   client     - Run only the client (server must be running separately)
+               [--url URL] [--format json|binary]
+               [--compression fano-shannon|huffman|rans|adaptive-fano|context-fano ...]
+               (several --compression values are negotiated with the server in order of preference)
+               [--encoding orthogonal|hamming|secded|reed-muller|convolutional|adaptive] [--n N] [--target-ber BER]
+               [--channel uniform|bsc|burst] [--interleave DEPTH]
+               [--frame-bits BITS] (CRC32 per frame, failed frames are retransmitted; 0 disables)
+               [--dir DIR [--errors PCT] [--in-flight N]] (send a whole directory, compression of the
+               next image overlapping the upload of the previous one, and report images/s)
+  bench      - Run the client -> server pipeline in-process (and optionally over a local server)
+               and report per-stage time, peak memory, compression, BER and SHA256 success as JSON
+               [--sizes N ...] [--images PATH ...] [--errors PCT ...] [--trials N] [--http]
+               [--format json|binary] [--seed N] [--micro] [--output PATH]
+  loadtest   - Send concurrent requests to a running server and report req/s and p50/p99 latency
+               [--url URL] [--file PATH] [--requests N] [--concurrency N] [--errors PCT] [--format json|binary]
   help       - Show this help message
 
 Examples:
-  python main.py server          # Run server only
-  python main.py client          # Run client only
-  python main.py help            # Show help
+  python main.py server                                   # Run development server only
+  python main.py server --production --workers 4          # Run production server (gunicorn)
+  python main.py client                                   # Run client only
+  python main.py bench --http --output results.json       # Benchmark the pipeline
+  python main.py loadtest --requests 200 --concurrency 16 # Load test a running server
+  python main.py help                                     # Show help
 """)
 
 def main():
@@ -76,9 +194,13 @@ def main():
     if mode == "help":
         show_usage()
     elif mode == "server":
-        run_server_mode()
+        run_server_mode(sys.argv[2:])
     elif mode == "client":
-        run_client_mode()
+        run_client_mode(sys.argv[2:])
+    elif mode == "bench":
+        run_bench_mode(sys.argv[2:])
+    elif mode == "loadtest":
+        run_loadtest_mode(sys.argv[2:])
     else:
         print(f"Unknown mode: {mode}")
         show_usage()
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Sequence
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = tuple(float(1 << shift) for shift in range(10, 31, 2))
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator:
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+class Span:
+    __slots__ = ('stage', 'bytes', 'start')
+
+    def __init__(self, stage: str, num_bytes: int = None):
+        self.stage = stage
+        self.bytes = num_bytes
+        self.start = time.perf_counter()
+
+    def set_bytes(self, num_bytes: int):
+        self.bytes = num_bytes
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_bytes(self, num_bytes: int):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+_stages: ContextVar = ContextVar('stages', default=None)
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = 'itc', enabled: bool = True):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.durations: Dict[str, Histogram] = {}
+        self.sizes: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, num_bytes: int = None):
+        with self.lock:
+            if stage not in self.durations:
+                self.durations[stage] = Histogram(DURATION_BUCKETS)
+            self.durations[stage].observe(seconds)
+            if num_bytes is not None:
+                if stage not in self.sizes:
+                    self.sizes[stage] = Histogram(BYTES_BUCKETS)
+                self.sizes[stage].observe(num_bytes)
+
+        stages = _stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def span(self, stage: str, num_bytes: int = None):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._span(stage, num_bytes)
+
+    @contextmanager
+    def _span(self, stage: str, num_bytes: int = None):
+        span = Span(stage, num_bytes)
+        try:
+            yield span
+        finally:
+            self.record(stage, time.perf_counter() - span.start, span.bytes)
+
+    @contextmanager
+    def request(self):
+        # Nested calls share the outermost breakdown so endpoint and decoder stages land together
+        stages = _stages.get()
+        if stages is not None or not self.enabled:
+            yield stages if stages is not None else {}
+            return
+        stages = {}
+        token = _stages.set(stages)
+        try:
+            yield stages
+        finally:
+            _stages.reset(token)
+
+    def _render_histograms(self, name: str, help_text: str, histograms: Dict[str, Histogram]) -> list:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for stage, histogram in sorted(histograms.items()):
+            for bound, total in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {total}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        return lines
+
+    def render_prometheus(self) -> str:
+        with self.lock:
+            lines = self._render_histograms(
+                f"{self.prefix}_stage_duration_seconds", "Time spent in each pipeline stage", self.durations
+            )
+            lines += self._render_histograms(
+                f"{self.prefix}_stage_bytes", "Bytes processed by each pipeline stage", self.sizes
+            )
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry(enabled=os.environ.get('ITC_METRICS', '1') != '0')
+
+def span(stage: str, num_bytes: int = None):
+    return metrics.span(stage, num_bytes)
+
+def request_stages():
+    return metrics.request()
+
+def set_enabled(enabled: bool):
+    metrics.enabled = enabled
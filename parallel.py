@@ -0,0 +1,162 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bitbuffer import BitBuffer
+from coding import OrthogonalCoding
+from fanoshannon import FanoShannon
+
+_coders = {}
+
+def _coder(n: int) -> OrthogonalCoding:
+    if n not in _coders:
+        _coders[n] = OrthogonalCoding(n=n)
+    return _coders[n]
+
+def _decode_channel_shard(input_name: str, output_name: str, n: int, first_block: int, last_block: int) -> int:
+    shm_in = shared_memory.SharedMemory(name=input_name)
+    shm_out = shared_memory.SharedMemory(name=output_name)
+    try:
+        coder = _coder(n)
+        block_bytes = coder.code_length // 8
+        received = np.frombuffer(shm_in.buf, dtype=np.uint8, count=(last_block - first_block) * block_bytes,
+                                 offset=first_block * block_bytes)
+        output = np.frombuffer(shm_out.buf, dtype=np.uint8)
+
+        errors = 0
+        for start in range(0, last_block - first_block, coder.block_chunk):
+            stop = min(last_block - first_block, start + coder.block_chunk)
+            decoded, block_errors = coder.decode_packed_blocks(received[start * block_bytes:stop * block_bytes])
+            packed = np.packbits(decoded.reshape(-1))
+            offset = (first_block + start) * n // 8
+            output[offset:offset + len(packed)] = packed
+            errors += int(block_errors.sum())
+
+        del received, output
+        return errors
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+def _decode_source_segment(input_name: str, code_table: Dict[int, str], symbol_size: int,
+                           start_bit: int, stop_bit: int) -> Tuple[bytes, str]:
+    shm = shared_memory.SharedMemory(name=input_name)
+    try:
+        first, last = start_bit // 8, (stop_bit + 7) // 8
+        segment = BitBuffer(bytes(shm.buf[first:last]))[start_bit - first * 8:stop_bit - first * 8]
+        fano_shannon = FanoShannon(symbol_size=symbol_size)
+        symbols, consumed = fano_shannon.decode_bits(code_table, segment)
+        return fano_shannon._symbols_to_bytes(symbols), segment[consumed:].to_str()
+    finally:
+        shm.close()
+
+class ParallelDecoder:
+    def __init__(self, workers: int = 2, shards_per_worker: int = 4, min_blocks: int = 4096):
+        self.workers = workers
+        self.shards_per_worker = shards_per_worker
+        self.min_blocks = min_blocks
+        self.executor = None
+        self.segments = {}
+        self.lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.executor
+
+    def _segment(self, size: int, data: bytes = None) -> shared_memory.SharedMemory:
+        # Segments are tracked until released, so close() can unlink any an interrupted decode left behind
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        with self.lock:
+            self.segments[shm.name] = shm
+        if data is not None:
+            shm.buf[:len(data)] = data
+        return shm
+
+    def _release(self, *segments: shared_memory.SharedMemory):
+        for shm in segments:
+            if shm is None:
+                continue
+            with self.lock:
+                if self.segments.pop(shm.name, None) is None:
+                    continue
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+            segments = list(self.segments.values())
+        if executor is not None:
+            executor.shutdown()
+        self._release(*segments)
+
+    def _shards(self, total: int, align: int = 1) -> List[Tuple[int, int]]:
+        shard = -(-total // (self.workers * self.shards_per_worker))
+        shard = -(-shard // align) * align
+        return [(start, min(total, start + shard)) for start in range(0, total, shard)]
+
+    def decode_channel(self, received: BitBuffer, parameters: dict) -> Tuple[BitBuffer, int]:
+        n = parameters['n']
+        coder = _coder(n)
+        total_blocks = len(received) // coder.code_length
+
+        if total_blocks < self.min_blocks or coder.code_length % 8:
+            return coder.decode(received, parameters)
+
+        output_size = (total_blocks * n + 7) // 8
+        shm_in = self._segment(total_blocks * coder.code_length // 8,
+                               received[:total_blocks * coder.code_length].to_bytes())
+        shm_out = None
+        try:
+            shm_out = self._segment(output_size)
+            # Shards start on multiples of 8 blocks so every shard writes whole output bytes
+            futures = [
+                self._pool().submit(_decode_channel_shard, shm_in.name, shm_out.name, n, first, last)
+                for first, last in self._shards(total_blocks, align=8)
+            ]
+            errors = sum(future.result() for future in futures)
+            decoded = BitBuffer(bytes(shm_out.buf[:output_size]), total_blocks * n)
+        finally:
+            self._release(shm_in, shm_out)
+
+        return decoded[:parameters['original_length']], errors
+
+    def decompress(self, compressed_bits: BitBuffer, code_table: Dict, symbol_size: int,
+                   sync_points: List[int]) -> bytes:
+        if isinstance(list(code_table.keys())[0], str):
+            code_table = {int(k): v for k, v in code_table.items()}
+
+        if len(code_table) == 1 or len(sync_points) < 2:
+            return FanoShannon(symbol_size=symbol_size).decompress(compressed_bits, code_table)
+
+        total_bits = len(compressed_bits)
+        boundaries = [point for point in sync_points if point < total_bits] + [total_bits]
+
+        data = compressed_bits.to_bytes()
+        shm = self._segment(len(data), data)
+        try:
+            futures = [
+                self._pool().submit(_decode_source_segment, shm.name, code_table, symbol_size, start, stop)
+                for start, stop in zip(boundaries, boundaries[1:])
+            ]
+            results = [future.result() for future in futures]
+        finally:
+            self._release(shm)
+
+        # Only the last segment may end inside a code; anywhere else a sync point was wrong and the
+        # segments would join into truncated output, so the whole stream is decoded serially instead
+        broken = [start for (start, _), (_, tail) in zip(zip(boundaries, boundaries[1:]), results[:-1]) if tail]
+        if broken:
+            print(f"Warning: Segments starting at bits {broken} end inside a code, decoding serially")
+            return FanoShannon(symbol_size=symbol_size).decompress(compressed_bits, code_table)
+
+        tail = results[-1][1]
+        if tail:
+            print(f"Warning: Incomplete code at end of compressed data: {tail}")
+
+        return b''.join(data for data, _ in results)
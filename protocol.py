@@ -0,0 +1,325 @@
+import json
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+from codetable import CodeTable
+
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+JSON_CONTENT_TYPE = 'application/json'
+STREAM_CONTENT_TYPE = 'application/x-itc-stream'
+BATCH_CONTENT_TYPE = 'application/x-itc-batch'
+
+MAGIC = b'ITC1'
+VERSION = 2
+
+# magic, version, algorithm, encoding, n, symbol_size, padding_added,
+# original_length, compressed_length, original_size, errors, payload_bits,
+# entropy, sha256, code table size, extras size
+HEADER = struct.Struct('>4sBBBBBBQQQQQd32sII')
+
+ALGORITHMS = {'fano-shannon': 1, 'huffman': 2, 'rans': 3, 'adaptive-fano': 4, 'context-fano': 5}
+ENCODINGS = {'orthogonal': 1, 'hamming': 2, 'secded': 3, 'reed-muller': 4, 'convolutional': 5}
+
+CORE_PARAMETERS = {'code_table', 'code_lengths', 'frequencies', 'block_model', 'encoding_params',
+                   'compressed_length', 'symbol_size', 'original_size'}
+CORE_ENCODING_PARAMS = {'n', 'original_length', 'padding_added'}
+
+def _lookup(names: Dict[str, int], value: int, kind: str) -> str:
+    for name, identifier in names.items():
+        if identifier == value:
+            return name
+    raise ValueError(f"Unknown {kind} id: {value}")
+
+def serialize_code_table(code_table: Dict, symbol_size: int = 1) -> bytes:
+    if symbol_size == 1:
+        return CodeTable.from_dict(code_table).to_bytes()
+    out = bytearray(struct.pack('>I', len(code_table)))
+    for symbol, code in code_table.items():
+        length = len(code)
+        out += int(symbol).to_bytes(symbol_size, 'big')
+        out.append(length)
+        out += int(code, 2).to_bytes((length + 7) // 8, 'big')
+    return bytes(out)
+
+def deserialize_code_table(data: bytes, symbol_size: int = 1) -> Dict[int, str]:
+    if symbol_size == 1:
+        return CodeTable.from_bytes(data)[0].to_dict()
+    count, = struct.unpack_from('>I', data)
+    position = 4
+    code_table = {}
+    for _ in range(count):
+        symbol = int.from_bytes(data[position:position + symbol_size], 'big')
+        position += symbol_size
+        length = data[position]
+        position += 1
+        num_bytes = (length + 7) // 8
+        value = int.from_bytes(data[position:position + num_bytes], 'big')
+        position += num_bytes
+        code_table[symbol] = format(value, f'0{length}b')
+    return code_table
+
+def lengths_table(code_lengths: Dict) -> CodeTable:
+    lengths = np.zeros(256, dtype=np.uint8)
+    for symbol, length in code_lengths.items():
+        lengths[int(symbol)] = length
+    return CodeTable(np.zeros(256, dtype=np.uint64), lengths)
+
+def lengths_dict(table: CodeTable) -> Dict[int, int]:
+    return {int(symbol): int(table.lengths[symbol]) for symbol in np.flatnonzero(table.lengths)}
+
+def serialize_code_lengths(code_lengths: Dict, symbol_size: int = 1) -> bytes:
+    if symbol_size == 1:
+        return lengths_table(code_lengths).to_bytes(lengths_only=True)
+    out = bytearray(struct.pack('>I', len(code_lengths)))
+    for symbol, length in code_lengths.items():
+        out += int(symbol).to_bytes(symbol_size, 'big')
+        out.append(length)
+    return bytes(out)
+
+def deserialize_code_lengths(data: bytes, symbol_size: int = 1) -> Dict[int, int]:
+    if symbol_size == 1:
+        return lengths_dict(CodeTable.from_bytes(data, lengths_only=True)[0])
+    count, = struct.unpack_from('>I', data)
+    entry_size = symbol_size + 1
+    return {
+        int.from_bytes(data[position:position + symbol_size], 'big'): data[position + symbol_size]
+        for position in range(4, 4 + count * entry_size, entry_size)
+    }
+
+def serialize_frequencies(frequencies: Dict, symbol_size: int = 1) -> bytes:
+    out = bytearray(struct.pack('>I', len(frequencies)))
+    for symbol, freq in frequencies.items():
+        out += int(symbol).to_bytes(symbol_size, 'big')
+        out += struct.pack('>H', freq)
+    return bytes(out)
+
+def deserialize_frequencies(data: bytes, symbol_size: int = 1) -> Dict[int, int]:
+    count, = struct.unpack_from('>I', data)
+    entry_size = symbol_size + 2
+    return {
+        int.from_bytes(data[position:position + symbol_size], 'big'):
+            struct.unpack_from('>H', data, position + symbol_size)[0]
+        for position in range(4, 4 + count * entry_size, entry_size)
+    }
+
+# block size, context flag, table count, selector count
+BLOCK_MODEL_HEADER = struct.Struct('>IBII')
+
+def serialize_block_model(model: Dict, symbol_size: int = 1) -> bytes:
+    tables = model['code_lengths']
+    out = bytearray(BLOCK_MODEL_HEADER.pack(
+        model['block_size'], int(model['context']), len(tables), len(model['selectors'])
+    ))
+    for code_lengths in tables:
+        out += lengths_table(code_lengths).to_bytes(lengths_only=True)
+    out += np.asarray(model['selectors'], dtype='>u1' if len(tables) <= 256 else '>u2').tobytes()
+    return bytes(out)
+
+def deserialize_block_model(data: bytes, symbol_size: int = 1) -> Dict:
+    block_size, context, num_tables, num_selectors = BLOCK_MODEL_HEADER.unpack_from(data)
+    position = BLOCK_MODEL_HEADER.size
+    tables = []
+    for _ in range(num_tables):
+        table, size = CodeTable.from_bytes(memoryview(data)[position:], lengths_only=True)
+        tables.append(lengths_dict(table))
+        position += size
+    selectors = np.frombuffer(data, dtype='>u1' if num_tables <= 256 else '>u2', count=num_selectors, offset=position)
+    return {
+        'block_size': block_size,
+        'context': bool(context),
+        'code_lengths': tables,
+        'selectors': selectors.tolist()
+    }
+
+# The parameter that carries each algorithm's model and how it is laid out on the wire
+MODELS = {
+    'fano-shannon': ('code_table', serialize_code_table, deserialize_code_table),
+    'huffman': ('code_lengths', serialize_code_lengths, deserialize_code_lengths),
+    'rans': ('frequencies', serialize_frequencies, deserialize_frequencies),
+    'adaptive-fano': ('block_model', serialize_block_model, deserialize_block_model),
+    'context-fano': ('block_model', serialize_block_model, deserialize_block_model)
+}
+
+# errors and payload_bits are known only once the payload has gone through the channel
+ERRORS_OFFSET = struct.calcsize('>4sBBBBBBQQQ')
+ERRORS_FIELDS = struct.Struct('>QQ')
+
+class Message(dict):
+    # A code table the message only references by id stays with it here, off the wire, so it
+    # can be sent again if the server has lost it, however long the reply takes to arrive
+    referenced_model = None
+
+class BinaryMessage(Message):
+    # A message whose serialized form was built in place; copies made with dict(...) drop
+    # the body and are packed again, so a changed message is never sent with a stale body
+    body = None
+
+def allocate_message(message: dict, payload_size: int) -> Tuple[bytearray, memoryview]:
+    # One buffer for header, model, extras and payload; the caller writes the payload into
+    # the returned view and then calls finish_message, so the payload is never copied again
+    parameters = message['parameters']
+    encoding_params = parameters['encoding_params']
+    symbol_size = parameters.get('symbol_size', 1)
+
+    extras = {key: value for key, value in parameters.items() if key not in CORE_PARAMETERS}
+    extra_encoding = {key: value for key, value in encoding_params.items() if key not in CORE_ENCODING_PARAMS}
+    if extra_encoding:
+        extras['encoding_params'] = extra_encoding
+    extras_bytes = json.dumps(extras, separators=(',', ':')).encode('utf-8') if extras else b''
+
+    model_parameter, serialize, _ = MODELS[message['compression_algorithm']]
+    model = parameters.get(model_parameter)
+    table_bytes = serialize(model, symbol_size) if model is not None else b''
+
+    body = bytearray(HEADER.size + len(table_bytes) + len(extras_bytes) + payload_size)
+    HEADER.pack_into(
+        body, 0,
+        MAGIC, VERSION,
+        ALGORITHMS[message['compression_algorithm']],
+        ENCODINGS[message['encoding']],
+        encoding_params['n'],
+        symbol_size,
+        encoding_params.get('padding_added', 0),
+        encoding_params['original_length'],
+        parameters['compressed_length'],
+        parameters.get('original_size', 0),
+        0,
+        0,
+        message['entropy'],
+        bytes.fromhex(message['SHA256']),
+        len(table_bytes),
+        len(extras_bytes)
+    )
+    position = HEADER.size
+    body[position:position + len(table_bytes)] = table_bytes
+    position += len(table_bytes)
+    body[position:position + len(extras_bytes)] = extras_bytes
+    position += len(extras_bytes)
+    return body, memoryview(body)[position:]
+
+def finish_message(body: bytearray, errors: int, payload_bits: int) -> bytearray:
+    ERRORS_FIELDS.pack_into(body, ERRORS_OFFSET, errors, payload_bits)
+    return body
+
+def pack_message(message: dict) -> bytes:
+    if getattr(message, 'body', None) is not None:
+        return message.body
+    payload = message['payload']
+    body, view = allocate_message(message, len(payload))
+    view[:] = payload
+    return finish_message(body, message.get('errors', 0), message.get('payload_bits', len(payload) * 8))
+
+def unpack_header(data: bytes) -> dict:
+    if len(data) < HEADER.size:
+        raise ValueError("Binary message is shorter than its header")
+
+    (magic, version, algorithm, encoding, n, symbol_size, padding_added,
+     original_length, compressed_length, original_size, errors, payload_bits,
+     entropy, sha256, table_size, extras_size) = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise ValueError("Not a binary compression message")
+    if version != VERSION:
+        raise ValueError(f"Unsupported protocol version: {version}")
+
+    compression_algorithm = _lookup(ALGORITHMS, algorithm, 'compression algorithm')
+    model_parameter, _, deserialize = MODELS[compression_algorithm]
+    position = HEADER.size
+    model = deserialize(data[position:position + table_size], symbol_size) if table_size else None
+    position += table_size
+
+    parameters = {}
+    if extras_size:
+        parameters = json.loads(bytes(data[position:position + extras_size]).decode('utf-8'))
+        position += extras_size
+    if model is not None:
+        parameters[model_parameter] = model
+
+    encoding_params = parameters.pop('encoding_params', {})
+    encoding_params.update({
+        'n': n,
+        'original_length': original_length,
+        'padding_added': padding_added
+    })
+    parameters.update({
+        'encoding_params': encoding_params,
+        'compressed_length': compressed_length,
+        'symbol_size': symbol_size,
+        'original_size': original_size
+    })
+
+    return {
+        'compression_algorithm': compression_algorithm,
+        'encoding': _lookup(ENCODINGS, encoding, 'encoding'),
+        'parameters': parameters,
+        'errors': errors,
+        'payload_bits': payload_bits,
+        'SHA256': sha256.hex(),
+        'entropy': entropy,
+        'header_size': position
+    }
+
+def unpack_message(data: bytes) -> dict:
+    message = unpack_header(data)
+    message['payload'] = memoryview(data)[message.pop('header_size'):]
+    return message
+
+FRAME_LENGTH = struct.Struct('>I')
+STREAM_TRAILER = struct.Struct('>Q')
+
+def read_exact(stream, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise ValueError(f"Stream ended with {remaining} of {size} bytes missing")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+def pack_stream_header(header: dict) -> bytes:
+    return pack_message(dict(header, payload=b'', payload_bits=0))
+
+def pack_stream_frame(frame: bytes) -> bytes:
+    return FRAME_LENGTH.pack(len(frame)) + frame
+
+def pack_stream_trailer(errors: int) -> bytes:
+    return FRAME_LENGTH.pack(0) + STREAM_TRAILER.pack(errors)
+
+def read_stream_header(stream) -> dict:
+    fixed = read_exact(stream, HEADER.size)
+    table_size, extras_size = HEADER.unpack(fixed)[-2:]
+    header = unpack_header(fixed + read_exact(stream, table_size + extras_size))
+    header.pop('header_size')
+    header.pop('payload_bits')
+    return header
+
+def iter_stream_frames(stream, header: dict):
+    while True:
+        length, = FRAME_LENGTH.unpack(read_exact(stream, FRAME_LENGTH.size))
+        if length == 0:
+            header['errors'], = STREAM_TRAILER.unpack(read_exact(stream, STREAM_TRAILER.size))
+            return
+        yield read_exact(stream, length)
+
+# A batch is the packed messages back to back, each behind its length
+def pack_batch(messages) -> bytes:
+    return b''.join(pack_stream_frame(pack_message(message)) for message in messages)
+
+def unpack_batch(data: bytes) -> list:
+    view = memoryview(data)
+    messages = []
+    position = 0
+    while position < len(view):
+        if position + FRAME_LENGTH.size > len(view):
+            raise ValueError("Batch ends inside a message length")
+        length, = FRAME_LENGTH.unpack_from(view, position)
+        position += FRAME_LENGTH.size
+        if position + length > len(view):
+            raise ValueError(f"Batch ends inside a message of {length} bytes")
+        messages.append(unpack_message(view[position:position + length]))
+        position += length
+    return messages
@@ -0,0 +1,139 @@
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+from bitbuffer import BitBuffer, Bits, as_bitbuffer
+from cache import normalize_code_table
+from utils import byte_histogram
+
+# State lives in [RANS_LOWER, RANS_LOWER << 16) and is renormalized 16 bits at a time
+RANS_LOWER = 1 << 16
+STREAM_HEADER = struct.Struct('>IH')
+
+class RANSCoder:
+    name = 'rans'
+    model_parameter = 'frequencies'
+    prefix_code = False
+
+    def __init__(self, symbol_size: int = 1, scale_bits: int = 12, lanes: int = 64,
+                 min_symbols_per_lane: int = 1024):
+        if symbol_size != 1:
+            raise ValueError("rANS coder supports 1-byte symbols only")
+        if not 8 <= scale_bits <= 15:
+            raise ValueError("Scale bits must be between 8 and 15")
+        self.symbol_size = symbol_size
+        self.scale_bits = scale_bits
+        self.lanes = lanes
+        self.min_symbols_per_lane = min_symbols_per_lane
+        self.sync_interval = None
+        self.sync_points = []
+
+    def _quantize(self, symbols_freq) -> Dict[int, int]:
+        symbols = sorted(symbols_freq)
+        counts = np.array([symbols_freq[symbol] for symbol in symbols], dtype=np.float64)
+        scale = 1 << self.scale_bits
+        quantized = np.maximum(1, np.floor(counts * scale / counts.sum())).astype(np.int64)
+
+        # Rounding leaves the total off by at most the alphabet size; settle it on the largest entries
+        difference = scale - int(quantized.sum())
+        while difference != 0:
+            index = int(np.argmax(quantized))
+            change = max(difference, 1 - int(quantized[index]))
+            quantized[index] += change
+            difference -= change
+
+        return {symbol: int(freq) for symbol, freq in zip(symbols, quantized)}
+
+    def build_code_table(self, symbols_freq) -> Dict[int, int]:
+        return self._quantize(symbols_freq)
+
+    def export_model(self, frequencies: Dict[int, int]) -> Dict[int, int]:
+        return frequencies
+
+    def import_model(self, model: Dict) -> Dict[int, int]:
+        return normalize_code_table(model)
+
+    def _tables(self, frequencies: Dict[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        freq = np.zeros(256, dtype=np.uint64)
+        for symbol, count in frequencies.items():
+            freq[symbol] = count
+        cumulative = np.concatenate(([0], np.cumsum(freq)[:-1])).astype(np.uint64)
+        slot_to_symbol = np.repeat(np.arange(256, dtype=np.uint8), freq.astype(np.int64))
+        return freq, cumulative, slot_to_symbol
+
+    def _encode(self, data: bytes, frequencies: Dict[int, int]) -> bytes:
+        freq, cumulative, _ = self._tables(frequencies)
+        x_max = ((RANS_LOWER >> self.scale_bits) << 16) * freq
+
+        symbols = np.frombuffer(data, dtype=np.uint8)
+        lanes = max(1, min(self.lanes, len(symbols) // self.min_symbols_per_lane))
+        steps = -(-len(symbols) // lanes)
+        grid = np.full(steps * lanes, max(frequencies, key=frequencies.get), dtype=np.uint8)
+        grid[:len(symbols)] = symbols
+        grid = grid.reshape(steps, lanes)
+
+        # Symbol i goes to lane i % lanes; lanes are encoded in reverse so the decoder runs forwards
+        state = np.full(lanes, RANS_LOWER, dtype=np.uint64)
+        words = []
+        for step in range(steps - 1, -1, -1):
+            row = grid[step]
+            emit = state >= x_max[row]
+            if emit.any():
+                words.append((state[emit] & 0xFFFF).astype(np.uint16))
+                state = np.where(emit, state >> np.uint64(16), state)
+            f = freq[row]
+            state = ((state // f) << np.uint64(self.scale_bits)) + state % f + cumulative[row]
+
+        stream = np.concatenate(words)[::-1] if words else np.zeros(0, dtype=np.uint16)
+        return b''.join((
+            STREAM_HEADER.pack(len(symbols), lanes),
+            state.astype('>u4').tobytes(),
+            stream.astype('>u2').tobytes()
+        ))
+
+    def _decode(self, data: bytes, frequencies: Dict[int, int]) -> bytes:
+        freq, cumulative, slot_to_symbol = self._tables(frequencies)
+        mask = np.uint64((1 << self.scale_bits) - 1)
+
+        count, lanes = STREAM_HEADER.unpack_from(data)
+        position = STREAM_HEADER.size
+        state = np.frombuffer(data, dtype='>u4', count=lanes, offset=position).astype(np.uint64)
+        position += 4 * lanes
+        stream = np.frombuffer(data, dtype='>u2', count=(len(data) - position) // 2, offset=position).astype(np.uint64)
+
+        steps = -(-count // lanes)
+        output = np.empty((steps, lanes), dtype=np.uint8)
+        read = 0
+        for step in range(steps):
+            slot = state & mask
+            row = slot_to_symbol[slot]
+            output[step] = row
+            state = freq[row] * (state >> np.uint64(self.scale_bits)) + slot - cumulative[row]
+            refill = np.flatnonzero(state < RANS_LOWER)[::-1]
+            if len(refill):
+                if read + len(refill) > len(stream):
+                    raise ValueError("rANS stream ended early")
+                state[refill] = (state[refill] << np.uint64(16)) | stream[read:read + len(refill)]
+                read += len(refill)
+
+        return output.reshape(-1)[:count].tobytes()
+
+    def compress(self, data: bytes, packed: bool = False, histogram=None) -> Tuple[Bits, Dict[int, int]]:
+        if not data:
+            return (BitBuffer() if packed else ''), {}
+
+        self.sync_points = []
+        counts = byte_histogram(data) if histogram is None else np.asarray(histogram)
+        self.code_table = self.build_code_table({int(symbol): int(counts[symbol]) for symbol in np.flatnonzero(counts)})
+        compressed_bits = BitBuffer.from_bytes(self._encode(data, self.code_table))
+        return (compressed_bits if packed else compressed_bits.to_str()), self.code_table
+
+    def decompress(self, compressed_bits: Bits, code_table: Dict, original_size: int = None) -> bytes:
+        if not compressed_bits or not code_table:
+            return b''
+
+        result = self._decode(as_bitbuffer(compressed_bits).to_bytes(), normalize_code_table(code_table))
+        if original_size is not None:
+            result = result[:original_size]
+        return result
@@ -0,0 +1,94 @@
+import numpy as np
+from typing import Tuple
+from bitbuffer import BitBuffer, BitWriter, Bits, as_bitbuffer
+from coding import OrthogonalCoding, fast_walsh_hadamard
+from utils import binomial_tail
+
+# RM(1,m) is the biorthogonal code: the 2^m Hadamard rows and their complements,
+# so it carries one more bit per block than OrthogonalCoding(n=m) at the same length
+class ReedMullerCoding:
+    name = 'reed-muller'
+
+    def __init__(self, m: int = 5, block_chunk: int = 4096):
+        self.m = m
+        self.k = m + 1
+        self.code_length = 2 ** m
+        self.block_length = self.code_length
+        self.message_length = self.k
+        self.rate = self.k / self.code_length
+        self.block_chunk = block_chunk
+        self.orthogonal = OrthogonalCoding(n=m)
+
+    @classmethod
+    def from_parameters(cls, parameters: dict) -> 'ReedMullerCoding':
+        return cls(m=parameters['n'])
+
+    def encoded_length(self, data_length: int) -> int:
+        return -(-data_length // self.k) * self.code_length
+
+    def estimated_block_error(self, error_rate: float) -> float:
+        return binomial_tail(self.code_length, self.code_length // 4 - 1, error_rate)
+
+    def encode(self, data_bits: Bits) -> Tuple[Bits, dict]:
+        padding_needed = (self.k - len(data_bits) % self.k) % self.k
+
+        data = as_bitbuffer(data_bits).pad_to_multiple(self.k)
+        weights = 1 << np.arange(self.m - 1, -1, -1)
+        chunk_bits = self.block_chunk * self.k
+
+        writer = BitWriter()
+        for start in range(0, len(data), chunk_bits):
+            blocks = data[start:start+chunk_bits].to_array().reshape(-1, self.k)
+            rows = self.orthogonal.codeword_bits(blocks[:, 1:].astype(np.int64) @ weights)
+            writer.write(rows ^ blocks[:, :1])
+        encoded = writer.getvalue()
+
+        parameters = {
+            'n': self.m,
+            'original_length': len(data_bits),
+            'padding_added': padding_needed
+        }
+
+        if isinstance(data_bits, str):
+            return encoded.to_str(), parameters
+        return encoded, parameters
+
+    def decode_blocks(self, received: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        received = np.asarray(received, dtype=np.int32).reshape(-1, self.code_length)
+
+        # The largest correlation magnitude picks the row, its sign picks row or complement
+        correlations = fast_walsh_hadamard(2 * received - 1)
+        best_rows = np.argmax(np.abs(correlations), axis=1)
+        best_correlations = correlations[np.arange(len(best_rows)), best_rows]
+        errors = (self.code_length - np.abs(best_correlations)) // 2
+
+        shifts = np.arange(self.m - 1, -1, -1)
+        decoded = np.empty((len(best_rows), self.k), dtype=np.uint8)
+        decoded[:, 0] = best_correlations < 0
+        decoded[:, 1:] = (best_rows[:, None] >> shifts) & 1
+
+        return decoded, errors
+
+    def decode(self, encoded_bits: Bits, parameters: dict) -> Tuple[Bits, int]:
+        packed = isinstance(encoded_bits, BitBuffer)
+
+        if len(encoded_bits) % self.code_length != 0:
+            truncated_length = (len(encoded_bits) // self.code_length) * self.code_length
+            print(f"Warning: Truncating encoded data from {len(encoded_bits)} to {truncated_length} bits")
+            encoded_bits = encoded_bits[:truncated_length]
+
+        received = as_bitbuffer(encoded_bits)
+        chunk_bits = self.block_chunk * self.code_length
+
+        writer = BitWriter()
+        total_errors = 0
+        for start in range(0, len(received), chunk_bits):
+            decoded, errors = self.decode_blocks(received[start:start+chunk_bits].to_array())
+            writer.write(decoded)
+            total_errors += int(errors.sum())
+        decoded_bits = writer.getvalue()[:parameters['original_length']]
+
+        if not packed:
+            decoded_bits = decoded_bits.to_str()
+
+        return decoded_bits, total_errors
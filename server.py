@@ -1,86 +1,407 @@
-from flask import Flask, request, jsonify
-from fanoshannon import FanoShannon
-from coding import OrthogonalCoding
+import atexit
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify
+from fanoshannon import FanoShannon, decode_table_cache
+from channelcoding import CHANNEL_CODES, channel_coder_from_parameters
+from bitbuffer import BitBuffer
+from coding import OrthogonalCoding, hadamard_cache
+from integrity import failed_frames, frame_spans
+from interleaver import BlockInterleaver
+from cache import ExpiringCache, LRUCache, code_table_id
+from metrics import metrics, request_stages, span
+from parallel import ParallelDecoder
+from protocol import (
+    BATCH_CONTENT_TYPE, BINARY_CONTENT_TYPE, unpack_batch, unpack_message, read_stream_header, iter_stream_frames
+)
+from sourcecoding import SOURCE_CODERS, create_source_coder
+from streaming import StreamDecoder
 from utils import (
-    calculate_entropy, calculate_sha256,
-    transform_from_base64, bytes_to_bits,
+    analyze_bytes, ByteStatistics,
+    transform_from_base64, bytes_to_bits, bits_to_bytes,
     bytes_to_bits_with_unpadding
 )
 
 app = Flask(__name__)
 
+MAX_BATCH_MESSAGES = 256
+
+class UnknownCodeTableError(ValueError):
+    def __init__(self, table_id: str):
+        super().__init__(f"Unknown code table id: {table_id}")
+        self.table_id = table_id
+
+# CompressionServer keeps no per-request state: the coders it holds are only
+# read while decoding, so one instance can serve concurrent requests. The only
+# state carried between requests is in the locked caches, including the partial
+# sessions that wait for retransmitted frames and expire after session_ttl seconds.
+# Each session has its own lock for merging frames. Sessions live in one process,
+# so under several gunicorn workers a retransmission can miss its session; the
+# client then sends the whole message again.
 class CompressionServer:
-    def __init__(self):
+    def __init__(self, workers: int = 1, max_sessions: int = 64, session_ttl: float = 300.0,
+                 batch_workers: int = None, n: int = 7):
         self.fano_shannon = FanoShannon()
-        self.walsh_hadamard = OrthogonalCoding(n=7)
+        # Messages carry their own n in encoding_params; this one is kept for the common case
+        self.walsh_hadamard = OrthogonalCoding(n=n)
+        self.parallel_decoder = ParallelDecoder(workers) if workers > 1 else None
+        self.code_tables = LRUCache(maxsize=256)
+        self.sessions = ExpiringCache(maxsize=max_sessions, ttl=session_ttl)
+        self.batch_executor = ThreadPoolExecutor(max_workers=batch_workers or min(8, os.cpu_count() or 1))
+    
+    def set_decode_workers(self, workers: int):
+        if self.parallel_decoder is not None:
+            self.parallel_decoder.close()
+        self.parallel_decoder = ParallelDecoder(workers) if workers > 1 else None
+    
+    def close(self):
+        if self.parallel_decoder is not None:
+            self.parallel_decoder.close()
+        self.batch_executor.shutdown()
+    
+    def resolve_code_table(self, parameters: dict, source_coder=None):
+        source_coder = source_coder or self.fano_shannon
+        model = parameters.get(source_coder.model_parameter)
+        if model is not None:
+            code_table = source_coder.import_model(model)
+            self.code_tables.put((source_coder.name, code_table_id(code_table)), code_table)
+            return code_table
+        
+        table_id = parameters.get('code_table_id')
+        code_table = self.code_tables.get((source_coder.name, table_id))
+        if code_table is None:
+            raise UnknownCodeTableError(table_id)
+        return code_table
+    
+    def channel_coder(self, name: str, encoding_params: dict):
+        if name == self.walsh_hadamard.name and encoding_params.get('n') == self.walsh_hadamard.n:
+            return self.walsh_hadamard
+        return channel_coder_from_parameters(name, encoding_params)
+    
+    def source_coder(self, name: str, symbol_size: int = 1):
+        if name == self.fano_shannon.name and symbol_size == 1:
+            return self.fano_shannon
+        return create_source_coder(name, symbol_size)
+    
+    def decode_message(self, data: dict, include_data: bool = False):
+        with request_stages() as stages:
+            result = self._decode_message(data, include_data)
+        if stages:
+            result['stages'] = dict(stages)
+        return result
+
+    def _received_bits(self, data: dict):
+        if 'payload' in data:
+            message_bytes = data['payload']
+        else:
+            with span('base64_decode') as stage:
+                message_bytes = transform_from_base64(data['encoded_message'])
+                stage.set_bytes(len(message_bytes))
+        message_bits = bytes_to_bits(message_bytes, packed=True)
+        if 'payload_bits' in data:
+            message_bits = message_bits[:data['payload_bits']]
+        return message_bits
+    
+    def _channel_decode(self, message_bits, encoding_type: str, encoding_params: dict):
+        channel_coder = self.channel_coder(encoding_type, encoding_params)
+        
+        interleaver = BlockInterleaver.from_parameters(encoding_params)
+        if interleaver:
+            message_bits = message_bits[:encoding_params['interleave_length']]
+            with span('deinterleave', len(message_bits) // 8):
+                message_bits = interleaver.deinterleave(message_bits)
+        
+        expected_length = (len(message_bits) // channel_coder.block_length) * channel_coder.block_length
+        if expected_length != len(message_bits):
+            print(f"Truncating from {len(message_bits)} to {expected_length} bits")
+            message_bits = message_bits[:expected_length]
+        
+        with span('channel_decode', len(message_bits) // 8):
+            if self.parallel_decoder and encoding_type == "orthogonal":
+                decoded_bits, errors_corrected = self.parallel_decoder.decode_channel(
+                    message_bits, encoding_params
+                )
+            else:
+                decoded_bits, errors_corrected = channel_coder.decode(
+                    message_bits, encoding_params
+                )
+        if encoding_type == "orthogonal":
+            print(f"Walsh-Hadamard corrected {errors_corrected} errors")
+        else:
+            print(f"{encoding_type} decoding corrected {errors_corrected} errors")
+        return decoded_bits, errors_corrected
+    
+    def _hold_session(self, data: dict, decoded_bits, errors_corrected: int, failed: list):
+        session_id = data['parameters'].get('message_id') or uuid.uuid4().hex
+        session = {
+            'header': {key: value for key, value in data.items() if key not in ('payload', 'payload_bits', 'encoded_message')},
+            'data': bytearray(decoded_bits.to_bytes()),
+            'length': len(decoded_bits),
+            'failed': failed,
+            'errors_corrected': errors_corrected,
+            'retransmitted': 0,
+            'lock': threading.Lock(),
+            'done': False
+        }
+        self.sessions.put(session_id, session)
+        return self._incomplete_result(session_id, session)
     
-    def decode_message(self, data: dict):
+    def _incomplete_result(self, session_id: str, session: dict):
+        failed = session['failed']
+        frame_count = len(session['header']['parameters']['encoding_params']['frame_crcs'])
+        print(f"{len(failed)} of {frame_count} frames failed their checksum, holding session {session_id}")
+        return {
+            'success': False,
+            'incomplete': True,
+            'session_id': session_id,
+            'failed_frames': failed,
+            'frame_count': frame_count,
+            'errors_corrected': session['errors_corrected'],
+            'original_errors': session['header']['errors'],
+            'retransmitted_frames': session['retransmitted'],
+            'message': f"{len(failed)} of {frame_count} frames failed their checksum; retransmit them to session {session_id}."
+        }
+    
+    def _decode_message(self, data: dict, include_data: bool = False):
         try:
-            encoded_message = data['encoded_message']
-            compression_algorithm = data['compression_algorithm']
             encoding_type = data['encoding']
-            parameters = data['parameters']
-            original_errors = data['errors']
-            original_sha256 = data['SHA256']
-            original_entropy = data['entropy']
-            
-            print(f"Received message with {original_errors} errors")
-            print(f"Compression: {compression_algorithm}, Encoding: {encoding_type}")
+            encoding_params = data['parameters']['encoding_params']
             
-            message_bytes = transform_from_base64(encoded_message)
-            message_bits = bytes_to_bits(message_bytes)
+            print(f"Received message with {data['errors']} errors")
+            print(f"Compression: {data['compression_algorithm']}, Encoding: {encoding_type}")
             
+            message_bits = self._received_bits(data)
             print(f"Received message bits length: {len(message_bits)}")
             
-            expected_length = (len(message_bits) // 128) * 128
-            if expected_length != len(message_bits):
-                print(f"Truncating from {len(message_bits)} to {expected_length} bits")
-                message_bits = message_bits[:expected_length]
+            decoded_bits, errors_corrected = self._channel_decode(message_bits, encoding_type, encoding_params)
             
-            if encoding_type == "orthogonal":
-                encoding_params = parameters['encoding_params']
-                decoded_bits, errors_corrected = self.walsh_hadamard.decode(
-                    message_bits, encoding_params
-                )
-                print(f"Walsh-Hadamard corrected {errors_corrected} errors")
-            else:
-                raise ValueError(f"Unsupported encoding type: {encoding_type}")
+            checksums = encoding_params.get('frame_crcs')
+            if checksums:
+                with span('frame_check', len(decoded_bits) // 8):
+                    failed = failed_frames(decoded_bits, encoding_params['crc_frame_bits'], checksums)
+                if failed:
+                    return self._hold_session(data, decoded_bits, errors_corrected, failed)
             
-            try:
-                while len(decoded_bits) % 8 != 0:
-                    decoded_bits += '0'
+            return self._finish_decode(data, decoded_bits, errors_corrected, include_data)
+            
+        except Exception as e:
+            return self._decode_failure(e)
+    
+    def decode_batch(self, messages: list, include_data: bool = False):
+        # The NumPy decoding stages release the GIL, so a batch's messages decode side by side
+        return list(self.batch_executor.map(lambda message: self.decode_message(message, include_data), messages))
+    
+    def retransmit(self, data: dict, include_data: bool = False):
+        with request_stages() as stages:
+            result = self._retransmit(data, include_data)
+        if stages:
+            result['stages'] = dict(stages)
+        return result
+    
+    def _unknown_session(self, session_id: str):
+        print(f"Unknown or expired session: {session_id}")
+        return {
+            'success': False,
+            'error': f"Unknown or expired session: {session_id}",
+            'unknown_session_id': session_id,
+            'message': f"Retransmission failed: unknown or expired session {session_id}"
+        }
+    
+    def _retransmit(self, data: dict, include_data: bool = False):
+        try:
+            session_id = data['session_id']
+            session = self.sessions.get(session_id)
+            if session is None:
+                return self._unknown_session(session_id)
+            
+            header = session['header']
+            encoding_params = header['parameters']['encoding_params']
+            frame_bits = encoding_params['crc_frame_bits']
+            frames = sorted(data['frames'])
+            spans = frame_spans(session['length'], frame_bits)
+            print(f"Received retransmission of {len(frames)} frames for session {session_id}")
+            
+            # The retransmitted frames decode as one message of their own
+            frame_params = dict(encoding_params, original_length=sum(spans[i][1] - spans[i][0] for i in frames))
+            if 'interleave_length' in data:
+                frame_params['interleave_length'] = data['interleave_length']
+            decoded_bits, errors_corrected = self._channel_decode(
+                self._received_bits(data), header['encoding'], frame_params
+            )
+            
+            with span('frame_check', len(decoded_bits) // 8):
+                failed = failed_frames(decoded_bits, frame_bits, encoding_params['frame_crcs'], frames)
+            decoded_bytes = decoded_bits.to_bytes()
+            
+            # Frames are decoded outside the lock; only merging them into the session is serialized
+            with session['lock']:
+                if session['done']:
+                    return self._unknown_session(session_id)
+                for position, index in enumerate(frames):
+                    if index not in failed:
+                        start, stop = spans[index]
+                        offset = position * frame_bits // 8
+                        session['data'][start // 8:-(-stop // 8)] = decoded_bytes[offset:offset + -(-(stop - start) // 8)]
                 
-                decoded_bytes = []
-                for i in range(0, len(decoded_bits), 8):
-                    byte_bits = decoded_bits[i:i+8]
-                    decoded_bytes.append(int(byte_bits, 2))
+                session['errors_corrected'] += errors_corrected
+                session['retransmitted'] += len(frames)
+                session['failed'] = sorted(set(session['failed']) - set(frames) | set(failed))
+                if session['failed']:
+                    return self._incomplete_result(session_id, session)
                 
-                decoded_bytes = bytes(decoded_bytes)
-                unpadded_bits = bytes_to_bits_with_unpadding(decoded_bytes)
+                session['done'] = True
+                self.sessions.pop(session_id)
+            
+            result = self._finish_decode(
+                header, BitBuffer(session['data'], session['length']), session['errors_corrected'], include_data
+            )
+            result['retransmitted_frames'] = session['retransmitted']
+            return result
+            
+        except Exception as e:
+            return self._decode_failure(e)
+    
+    def _decode_failure(self, e: Exception):
+        print(f"Decoding error: {e}")
+        if isinstance(e, UnknownCodeTableError):
+            return {
+                'success': False,
+                'error': str(e),
+                'unknown_code_table_id': e.table_id,
+                'message': f"Decoding failed: {e}"
+            }
+        import traceback
+        traceback.print_exc()
+        return {
+            'success': False,
+            'error': str(e),
+            'message': f"Decoding failed: {e}"
+        }
+    
+    def _finish_decode(self, data: dict, decoded_bits, errors_corrected: int, include_data: bool = False):
+        compression_algorithm = data['compression_algorithm']
+        parameters = data['parameters']
+        original_errors = data['errors']
+        original_sha256 = data['SHA256']
+        original_entropy = data['entropy']
+        
+        with span('unpad', len(decoded_bits) // 8):
+            try:
+                decoded_bytes = bits_to_bytes(decoded_bits)
+                unpadded_bits = bytes_to_bits_with_unpadding(decoded_bytes, packed=True)
             except Exception as e:
                 print(f"Padding error: {e}")
                 unpadded_bits = decoded_bits
-            
-            if compression_algorithm == "fano-shannon":
-                code_table = parameters['code_table']
-                
-                if isinstance(list(code_table.keys())[0], str):
-                    code_table = {int(k): v for k, v in code_table.items()}
-                
-                decompressed_data = self.fano_shannon.decompress(unpadded_bits, code_table)
-                print(f"Decompressed to {len(decompressed_data)} bytes")
+        
+        compressed_length = parameters.get('compressed_length')
+        if compressed_length is not None:
+            unpadded_bits = unpadded_bits[:compressed_length]
+        
+        symbol_size = parameters.get('symbol_size', 1)
+        source_coder = self.source_coder(compression_algorithm, symbol_size)
+        code_table = self.resolve_code_table(parameters, source_coder)
+        
+        sync_points = parameters.get('sync_points')
+        with span('source_decode') as stage:
+            if self.parallel_decoder and sync_points and source_coder.prefix_code:
+                decompressed_data = self.parallel_decoder.decompress(
+                    unpadded_bits, code_table, symbol_size, sync_points
+                )[:parameters.get('original_size')]
             else:
-                raise ValueError(f"Unsupported compression algorithm: {compression_algorithm}")
+                decompressed_data = source_coder.decompress(
+                    unpadded_bits, code_table, parameters.get('original_size')
+                )
+            stage.set_bytes(len(decompressed_data))
+        print(f"Decompressed to {len(decompressed_data)} bytes")
+        
+        with span('analyze', len(decompressed_data)):
+            stats = analyze_bytes(decompressed_data)
+        decoded_sha256 = stats.sha256
+        final_entropy = stats.entropy
+        
+        sha256_match = decoded_sha256 == original_sha256
+        
+        print(f"SHA256 match: {sha256_match}")
+        print(f"Original SHA256: {original_sha256}")
+        print(f"Decoded SHA256:  {decoded_sha256}")
+        print(f"Final entropy: {final_entropy:.4f}")
+        
+        result = {
+            'success': True,
+            'errors_corrected': errors_corrected,
+            'original_errors': original_errors,
+            'sha256_match': sha256_match,
+            'decoded_sha256': decoded_sha256,
+            'original_sha256': original_sha256,
+            'final_entropy': final_entropy,
+            'original_entropy': original_entropy,
+            'decompressed_size': len(decompressed_data),
+            'message': f"Successfully decoded. Corrected {errors_corrected} errors. SHA256 {'matches' if sha256_match else 'does not match'}."
+        }
+        
+        if include_data:
+            result['decompressed_data'] = decompressed_data
+        
+        return result
+
+    def decode_stream(self, header: dict, frames):
+        with request_stages() as stages:
+            result = self._decode_stream(header, frames)
+        if stages:
+            result['stages'] = dict(stages)
+        return result
+
+    def _decode_stream(self, header: dict, frames):
+        try:
+            compression_algorithm = header['compression_algorithm']
+            encoding_type = header['encoding']
+            parameters = header['parameters']
+            original_sha256 = header['SHA256']
+            original_entropy = header['entropy']
             
-            decoded_sha256 = calculate_sha256(decompressed_data)
-            final_entropy = calculate_entropy(decompressed_data)
+            print(f"Receiving stream. Compression: {compression_algorithm}, Encoding: {encoding_type}")
+            
+            if encoding_type != "orthogonal":
+                raise ValueError(f"Unsupported encoding type: {encoding_type}")
             
+            source_coder = self.source_coder(compression_algorithm, parameters.get('symbol_size', 1))
+            if not source_coder.prefix_code:
+                raise ValueError(f"Compression algorithm {compression_algorithm} does not support streaming")
+            decoder = StreamDecoder(
+                source_coder, self.channel_coder(encoding_type, parameters['encoding_params']),
+                self.resolve_code_table(parameters, source_coder), parameters['compressed_length'],
+                BlockInterleaver.from_parameters(parameters['encoding_params'])
+            )
+            
+            stats = ByteStatistics()
+            remaining = parameters.get('original_size')
+            decompressed_size = 0
+            
+            def consume(chunk: bytes):
+                nonlocal remaining, decompressed_size
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                stats.update(chunk)
+                decompressed_size += len(chunk)
+            
+            for frame in frames:
+                decompressed = decoder.feed(frame)
+                with span('analyze', len(decompressed)):
+                    consume(decompressed)
+            decoder.finish()
+            
+            errors_corrected = decoder.errors_corrected
+            original_errors = header.get('errors', 0)
+            decoded_sha256 = stats.sha256
+            final_entropy = stats.entropy
             sha256_match = decoded_sha256 == original_sha256
             
+            print(f"Walsh-Hadamard corrected {errors_corrected} errors")
+            print(f"Decompressed to {decompressed_size} bytes")
             print(f"SHA256 match: {sha256_match}")
-            print(f"Original SHA256: {original_sha256}")
-            print(f"Decoded SHA256:  {decoded_sha256}")
-            print(f"Final entropy: {final_entropy:.4f}")
             
             return {
                 'success': True,
@@ -91,10 +412,18 @@ class CompressionServer:
                 'original_sha256': original_sha256,
                 'final_entropy': final_entropy,
                 'original_entropy': original_entropy,
-                'decompressed_size': len(decompressed_data),
+                'decompressed_size': decompressed_size,
                 'message': f"Successfully decoded. Corrected {errors_corrected} errors. SHA256 {'matches' if sha256_match else 'does not match'}."
             }
             
+        except UnknownCodeTableError as e:
+            print(f"Decoding error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'unknown_code_table_id': e.table_id,
+                'message': f"Decoding failed: {e}"
+            }
         except Exception as e:
             print(f"Decoding error: {e}")
             import traceback
@@ -105,17 +434,80 @@ class CompressionServer:
                 'message': f"Decoding failed: {e}"
             }
 
-server = CompressionServer()
+# The pool starts lazily on the first large message, so a forked gunicorn worker creates its own
+server = CompressionServer(workers=int(os.environ.get('ITC_DECODE_WORKERS', '1')))
+atexit.register(server.close)
 
 @app.route('/decode', methods=['POST'])
 def decode_endpoint():
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data received'}), 400
+        with request_stages():
+            with span('parse') as stage:
+                if request.mimetype == BINARY_CONTENT_TYPE:
+                    body = request.get_data()
+                    if not body:
+                        return jsonify({'error': 'No binary data received'}), 400
+                    data = unpack_message(body)
+                else:
+                    data = request.get_json()
+                    if not data:
+                        return jsonify({'error': 'No JSON data received'}), 400
+                stage.set_bytes(request.content_length or 0)
+            
+            print("\n---SERVER PROCESSING---")
+            result = server.decode_message(data)
         
-        print("\n---SERVER PROCESSING---")
-        result = server.decode_message(data)
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"Server error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/decode_batch', methods=['POST'])
+def decode_batch_endpoint():
+    try:
+        with request_stages():
+            with span('parse') as stage:
+                if request.mimetype == BATCH_CONTENT_TYPE:
+                    messages = unpack_batch(request.get_data())
+                else:
+                    messages = request.get_json()
+                    if not isinstance(messages, list):
+                        return jsonify({'error': 'Expected a JSON array of messages'}), 400
+                stage.set_bytes(request.content_length or 0)
+            
+            if not messages:
+                return jsonify({'error': 'No messages received'}), 400
+            if len(messages) > MAX_BATCH_MESSAGES:
+                return jsonify({'error': f"Batch of {len(messages)} messages exceeds the limit of {MAX_BATCH_MESSAGES}"}), 400
+            
+            print(f"\n---SERVER BATCH PROCESSING ({len(messages)} messages)---")
+            results = server.decode_batch(messages)
+        
+        return jsonify({'results': results})
+        
+    except Exception as e:
+        print(f"Server error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/retransmit', methods=['POST'])
+def retransmit_endpoint():
+    try:
+        with request_stages():
+            with span('parse') as stage:
+                data = request.get_json()
+                if not data:
+                    return jsonify({'error': 'No JSON data received'}), 400
+                stage.set_bytes(request.content_length or 0)
+            
+            print("\n---SERVER RETRANSMISSION---")
+            result = server.retransmit(data)
         
         return jsonify(result)
         
@@ -126,6 +518,57 @@ def decode_endpoint():
             'error': str(e)
         }), 500
 
+def parsed_frames(frames):
+    # Frames are read off the request body as decoding goes, so each read is a parse span of its own
+    frames = iter(frames)
+    while True:
+        with span('parse') as stage:
+            frame = next(frames, None)
+            if frame is not None:
+                stage.set_bytes(len(frame))
+        if frame is None:
+            return
+        yield frame
+
+@app.route('/decode_stream', methods=['POST'])
+def decode_stream_endpoint():
+    try:
+        with request_stages():
+            print("\n---SERVER STREAM PROCESSING---")
+            with span('parse'):
+                header = read_stream_header(request.stream)
+            result = server.decode_stream(header, parsed_frames(iter_stream_frames(request.stream, header)))
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"Server error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'code_tables': server.code_tables.stats(),
+        'sessions': server.sessions.stats(),
+        'decode_tables': decode_table_cache.stats(),
+        'hadamard_matrices': hadamard_cache.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/capabilities', methods=['GET'])
+def capabilities():
+    return jsonify({
+        'compression_algorithms': list(SOURCE_CODERS),
+        'encodings': list(CHANNEL_CODES),
+        'wire_formats': ['json', 'binary', 'stream', 'batch']
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'Server is running'})
@@ -135,7 +578,13 @@ def root():
     return jsonify({
         'message': 'Compression Server',
         'endpoints': {
-            '/decode': 'POST - Decode compressed and encoded messages',
+            '/decode': 'POST - Decode compressed and encoded messages (JSON or application/octet-stream)',
+            '/decode_batch': 'POST - Decode many messages concurrently (JSON array or length-prefixed binary messages)',
+            '/retransmit': 'POST - Resend the frames a /decode reply listed as failed, for a held partial session',
+            '/decode_stream': 'POST - Decode a chunked stream of binary frames as they arrive',
+            '/capabilities': 'GET - Supported compression algorithms, encodings and wire formats',
+            '/cache': 'GET - Code-table and Hadamard-matrix cache hit/miss counters',
+            '/metrics': 'GET - Per-stage duration and byte histograms in Prometheus text format',
             '/health': 'GET - Health check'
         }
     })
@@ -144,5 +593,28 @@ def run_server(host='localhost', port=5000, debug=True):
     print(f"Starting server on {host}:{port}")
     app.run(host=host, port=port, debug=debug)
 
+def run_production_server(host='0.0.0.0', port=5000, workers=2, threads=4):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn is not installed, falling back to the threaded Werkzeug server")
+        print(f"Starting server on {host}:{port}")
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
+    
+    class ProductionApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread' if threads > 1 else 'sync')
+            self.cfg.set('timeout', 120)
+        
+        def load(self):
+            return app
+    
+    print(f"Starting production server on {host}:{port} with {workers} workers x {threads} threads")
+    ProductionApplication().run()
+
 if __name__ == '__main__':
     run_server()
\ No newline at end of file
@@ -0,0 +1,19 @@
+from typing import List
+
+from adaptivefano import AdaptiveFano, ContextFano
+from fanoshannon import FanoShannon
+from huffman import CanonicalHuffman
+from rans import RANSCoder
+
+SOURCE_CODERS = {coder.name: coder for coder in (FanoShannon, CanonicalHuffman, RANSCoder, AdaptiveFano, ContextFano)}
+
+def create_source_coder(name: str, symbol_size: int = 1):
+    if name not in SOURCE_CODERS:
+        raise ValueError(f"Unsupported compression algorithm: {name}")
+    return SOURCE_CODERS[name](symbol_size=symbol_size)
+
+def negotiate(preferences: List[str], supported: List[str]) -> str:
+    for name in preferences:
+        if name in supported and name in SOURCE_CODERS:
+            return name
+    raise ValueError(f"No common compression algorithm among {preferences} and {supported}")
@@ -0,0 +1,138 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Tuple
+
+from bitbuffer import BitBuffer, BitWriter
+from channel import ChannelSimulator
+from coding import OrthogonalCoding
+from fanoshannon import FanoShannon, FanoDecoder
+from interleaver import BlockInterleaver
+from metrics import span
+from utils import ByteStatistics
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+def read_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def scan_chunks(chunks: Iterable[bytes], fano_shannon: FanoShannon) -> Tuple[Dict[int, int], str, float, int]:
+    stats = ByteStatistics()
+    symbols_freq = Counter()
+    carry = b''
+
+    for chunk in chunks:
+        stats.update(chunk)
+        if fano_shannon.symbol_size == 1:
+            continue
+
+        chunk = carry + chunk
+        aligned = len(chunk) - len(chunk) % fano_shannon.symbol_size
+        symbols_freq.update(fano_shannon._count_symbols(chunk[:aligned]))
+        carry = chunk[aligned:]
+
+    if carry:
+        symbols_freq.update(fano_shannon._count_symbols(carry))
+    if fano_shannon.symbol_size == 1:
+        # Byte symbols are exactly the histogram the statistics pass already built
+        symbols_freq = stats.frequencies()
+
+    return symbols_freq, stats.sha256, stats.entropy, stats.size
+
+def compress_chunks(chunks: Iterable[bytes], fano_shannon: FanoShannon, code_table: Dict[int, str]) -> Iterator[BitBuffer]:
+    carry = b''
+    for chunk in chunks:
+        chunk = carry + chunk
+        aligned = len(chunk) - len(chunk) % fano_shannon.symbol_size
+        carry = chunk[aligned:]
+        if aligned:
+            yield fano_shannon._encode_packed(chunk[:aligned], code_table)
+
+    if carry:
+        yield fano_shannon._encode_packed(carry, code_table)
+
+def align_chunks(bit_chunks: Iterable[BitBuffer], multiple: int, final_multiple: int = None) -> Iterator[BitBuffer]:
+    pending = BitBuffer()
+    for bits in bit_chunks:
+        if len(pending):
+            bits = BitBuffer.concat([pending, bits])
+        aligned = len(bits) - len(bits) % multiple
+        pending = bits[aligned:]
+        if aligned:
+            yield bits[:aligned]
+
+    if len(pending):
+        yield pending.pad_to_multiple(final_multiple or multiple)
+
+def final_chunk_bits(coder: OrthogonalCoding) -> int:
+    # Frames travel as whole bytes, so the last chunk is padded to blocks that also fill whole bytes;
+    # otherwise the receiver's byte padding would be deinterleaved into the data of the last blocks
+    return coder.n * 8 // math.gcd(8, coder.code_length)
+
+def encode_chunks(bit_chunks: Iterable[BitBuffer], coder: OrthogonalCoding) -> Iterator[BitBuffer]:
+    for bits in bit_chunks:
+        encoded_bits, _ = coder.encode(bits)
+        yield encoded_bits
+
+def interleave_chunks(bit_chunks: Iterable[BitBuffer], interleaver: BlockInterleaver) -> Iterator[BitBuffer]:
+    for bits in bit_chunks:
+        yield interleaver.interleave(bits)
+
+def add_errors_chunks(bit_chunks: Iterable[BitBuffer], error_percentage: float, stats: dict,
+                      channel: ChannelSimulator = None, model: str = 'uniform') -> Iterator[BitBuffer]:
+    channel = channel or ChannelSimulator()
+    stats.setdefault('errors', 0)
+    for bits in bit_chunks:
+        error_bits, num_errors = channel.apply(bits, error_percentage, model)
+        stats['errors'] += num_errors
+        yield error_bits
+
+def frame_chunks(bit_chunks: Iterable[BitBuffer]) -> Iterator[bytes]:
+    for bits in bit_chunks:
+        yield bits.to_bytes()
+
+class StreamDecoder:
+    def __init__(self, fano_shannon: FanoShannon, coder: OrthogonalCoding, code_table: Dict, compressed_length: int,
+                 interleaver: BlockInterleaver = None):
+        self.coder = coder
+        self.interleaver = interleaver
+        self.fano_decoder = FanoDecoder(fano_shannon, code_table, compressed_length)
+        self.pending = BitBuffer()
+        self.errors_corrected = 0
+
+    def feed(self, frame: bytes) -> bytes:
+        received = BitBuffer.from_bytes(frame)
+        if self.interleaver:
+            # Every frame is one encoded chunk of whole blocks, interleaved on its own
+            with span('deinterleave', len(frame)):
+                received = self.interleaver.deinterleave(received)
+        if len(self.pending):
+            received = BitBuffer.concat([self.pending, received])
+
+        aligned = len(received) - len(received) % self.coder.code_length
+        self.pending = received[aligned:]
+        if not aligned:
+            return b''
+
+        writer = BitWriter()
+        with span('channel_decode', aligned // 8):
+            for start in range(0, aligned, self.coder.block_chunk * self.coder.code_length):
+                stop = min(aligned, start + self.coder.block_chunk * self.coder.code_length)
+                decoded, errors = self.coder.decode_buffer(received[start:stop])
+                writer.write(decoded)
+                self.errors_corrected += int(errors.sum())
+
+        with span('source_decode') as stage:
+            decompressed = self.fano_decoder.feed(writer.getvalue())
+            stage.set_bytes(len(decompressed))
+        return decompressed
+
+    def finish(self):
+        if len(self.pending):
+            print(f"Warning: Dropping {len(self.pending)} trailing bits that do not fill a block")
+            self.pending = BitBuffer()
+        self.fano_decoder.finish()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer, BitWriter
+from utils import (bits_to_bytes, bits_to_bytes_with_padding, bytes_to_bits,
+                   bytes_to_bits_with_unpadding, pad_bits)
+
+LENGTHS = [0, 1, 7, 8, 9, 63, 64, 1000]
+
+def random_bits(length: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed + length)
+    return ''.join(map(str, rng.integers(0, 2, length)))
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_round_trips_through_str(length):
+    bits = random_bits(length)
+    buffer = BitBuffer.from_str(bits)
+    assert len(buffer) == length
+    assert buffer.to_str() == bits
+    assert buffer == bits
+    assert list(buffer.to_array()) == [int(b) for b in bits]
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_bytes_match_str_shim(length):
+    bits = random_bits(length)
+    buffer = BitBuffer.from_str(bits)
+    assert buffer.to_bytes() == bits_to_bytes(bits)
+    assert bytes(buffer.to_memoryview()) == bits_to_bytes(bits)
+    assert bytes_to_bits(buffer.to_bytes(), packed=True).to_str() == bytes_to_bits(bits_to_bytes(bits))
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_padding_matches_str_shim(length):
+    bits = random_bits(length)
+    padded = pad_bits(BitBuffer.from_str(bits))
+    assert padded.to_bytes() == bits_to_bytes_with_padding(bits)
+    assert bytes_to_bits_with_unpadding(padded.to_bytes(), packed=True) == bytes_to_bits(bits_to_bytes(bits))
+
+@pytest.mark.parametrize('multiple', [1, 3, 8, 16])
+def test_pad_to_multiple_matches_str_shim(multiple):
+    bits = random_bits(21)
+    expected = bits + '0' * ((multiple - len(bits) % multiple) % multiple)
+    assert BitBuffer.from_str(bits).pad_to_multiple(multiple) == expected
+
+@pytest.mark.parametrize('index', [slice(0, 5), slice(3, 11), slice(8, 24), slice(13, None), slice(None, -3),
+                                   slice(5, 2), slice(1, 30, 3), slice(None, None, -1)])
+def test_slices_match_str_slices(index):
+    bits = random_bits(37)
+    assert BitBuffer.from_str(bits)[index] == bits[index]
+
+def test_indexing_matches_str():
+    bits = random_bits(19)
+    buffer = BitBuffer.from_str(bits)
+    assert [buffer[i] for i in range(-19, 19)] == [int(bits[i]) for i in range(-19, 19)]
+    with pytest.raises(IndexError):
+        buffer[19]
+
+def test_concat_and_writer_match_str_join():
+    pieces = [random_bits(length, seed=i) for i, length in enumerate([3, 8, 0, 13, 16, 5])]
+    assert BitBuffer.concat(BitBuffer.from_str(piece) for piece in pieces) == ''.join(pieces)
+
+    for capacity in (None, sum(map(len, pieces))):
+        writer = BitWriter(capacity)
+        for i, piece in enumerate(pieces):
+            if i % 2:
+                writer.write_buffer(BitBuffer.from_str(piece))
+            else:
+                writer.write(np.array([int(b) for b in piece], dtype=np.uint8))
+        assert writer.getvalue() == ''.join(pieces)
+
+def test_writer_rejects_overflow():
+    writer = BitWriter(8)
+    writer.write(np.ones(9, dtype=np.uint8))
+    with pytest.raises(ValueError):
+        writer.getvalue()
+
+def test_rejects_length_beyond_buffer():
+    with pytest.raises(ValueError):
+        BitBuffer(b'\x00', 9)
@@ -0,0 +1,113 @@
+import pytest
+import cache
+from cache import ExpiringCache, LRUCache, SizedLRUCache, code_table_id
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+    assert 'b' not in lru
+    assert lru.get('a') == 1 and lru.get('c') == 3
+    assert lru.get('b', 'gone') == 'gone'
+    assert lru.stats() == {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1}
+
+def test_get_or_create_calls_the_factory_once():
+    lru = LRUCache(maxsize=4)
+    calls = []
+    for _ in range(3):
+        assert lru.get_or_create('key', lambda: calls.append(1) or 'value') == 'value'
+    assert len(calls) == 1
+
+def test_non_positive_size_is_rejected():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+def test_entries_expire_after_ttl(clock):
+    sessions = ExpiringCache(maxsize=8, ttl=10.0)
+    sessions.put('a', 1)
+    clock[0] += 9.9
+    assert sessions.get('a') == 1
+    clock[0] += 9.9
+    # Reading an entry renews it, so it is still there 19.8s after it was stored
+    assert 'a' in sessions
+    clock[0] += 10.0
+    assert sessions.get('a') is None
+    assert sessions.stats()['expired'] == 1
+
+def test_expiry_purges_every_stale_entry(clock):
+    sessions = ExpiringCache(maxsize=8, ttl=5.0)
+    for key in 'abc':
+        sessions.put(key, key)
+        clock[0] += 2.0
+    # Stored 6s, 4s and 2s ago: one lookup drops only the entry past the ttl
+    assert sessions.get('c') == 'c'
+    assert sessions.stats()['expired'] == 1
+    clock[0] += 4.0
+    # b is now 8s old and c was renewed 4s ago
+    assert sessions.get('b') is None
+    assert 'c' in sessions
+    stats = sessions.stats()
+    assert stats['expired'] == 2
+    assert stats['size'] == 1
+    assert stats['ttl'] == 5.0
+
+def test_expiring_cache_is_bounded_and_pops(clock):
+    sessions = ExpiringCache(maxsize=2, ttl=60.0)
+    for key in 'abc':
+        sessions.put(key, key.upper())
+    assert 'a' not in sessions
+    assert sessions.pop('b') == 'B'
+    assert sessions.pop('b', 'missing') == 'missing'
+    assert sessions.stats()['expired'] == 0
+
+def test_sized_cache_evicts_by_bytes():
+    tables = SizedLRUCache(max_bytes=100, sizeof=len, maxsize=10)
+    tables.put('a', b'x' * 40)
+    tables.put('b', b'x' * 40)
+    tables.get('a')
+    tables.put('c', b'x' * 40)
+    # 120 bytes do not fit, so the least recently used entry goes
+    assert 'b' not in tables
+    assert 'a' in tables and 'c' in tables
+    assert tables.stats()['bytes'] == 80
+
+def test_sized_cache_skips_values_over_budget():
+    tables = SizedLRUCache(max_bytes=100, sizeof=len)
+    tables.put('a', b'x' * 30)
+    tables.put('big', b'x' * 101)
+    assert 'big' not in tables
+    assert 'a' in tables
+    # Replacing a kept value with one over the budget drops the old value too
+    tables.put('a', b'x' * 200)
+    assert 'a' not in tables
+    assert tables.stats()['bytes'] == 0
+
+def test_sized_cache_tracks_bytes_through_replace_and_pop():
+    tables = SizedLRUCache(max_bytes=100, sizeof=len, maxsize=2)
+    tables.put('a', b'x' * 10)
+    tables.put('a', b'x' * 25)
+    assert tables.stats()['bytes'] == 25
+    tables.put('b', b'x' * 5)
+    tables.put('c', b'x' * 5)
+    # The entry count still bounds the cache
+    assert 'a' not in tables
+    assert tables.pop('b') == b'x' * 5
+    assert tables.pop('missing') is None
+    stats = tables.stats()
+    assert stats['bytes'] == 5
+    assert stats['max_bytes'] == 100
+    assert stats['size'] == 1
+
+def test_code_table_id_ignores_key_type_and_order():
+    table = {97: '0', 98: '10', 99: '11'}
+    same = {'99': '11', '97': '0', '98': '10'}
+    assert code_table_id(table) == code_table_id(same)
+    assert code_table_id(table) != code_table_id({97: '1', 98: '00', 99: '01'})
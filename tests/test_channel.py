@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer
+from channel import ChannelSimulator
+from client import CompressionClient
+
+def random_buffer(length: int, seed: int = 0) -> BitBuffer:
+    return BitBuffer.from_array(np.random.default_rng(seed).integers(0, 2, length, dtype=np.uint8))
+
+def flipped_bits(sent: BitBuffer, received: BitBuffer) -> np.ndarray:
+    return sent.to_array() ^ received.to_array()
+
+@pytest.mark.parametrize('length, error_percentage', [(1000, 3), (12345, 1.5), (3_000_001, 0.1)])
+def test_uniform_flips_exact_count(length, error_percentage):
+    # Lengths past one chunk check that the count is split over the chunks without loss
+    bits = random_buffer(length)
+    received, num_errors = ChannelSimulator(seed=1, chunk_bits=1 << 20).apply(bits, error_percentage, 'uniform')
+    assert num_errors == int(length * error_percentage / 100)
+    assert int(flipped_bits(bits, received).sum()) == num_errors
+
+def test_bsc_rate():
+    bits = random_buffer(1 << 20)
+    received, num_errors = ChannelSimulator(seed=2).apply(bits, 5, 'bsc')
+    assert int(flipped_bits(bits, received).sum()) == num_errors
+    assert num_errors == pytest.approx(0.05 * len(bits), rel=0.02)
+
+def test_burst_errors_cluster_at_the_requested_rate():
+    bits = random_buffer(1 << 22)
+    received, num_errors = ChannelSimulator(seed=3, burst_length=64).apply(bits, 2, 'burst')
+    flips = flipped_bits(bits, received)
+    assert int(flips.sum()) == num_errors
+    assert num_errors == pytest.approx(0.02 * len(bits), rel=0.1)
+    # Inside a burst half the bits are wrong, so an error is followed by another far more often than 2%
+    assert flips[1:][flips[:-1] == 1].mean() > 0.3
+
+def test_burst_rejects_rates_past_the_bad_state():
+    with pytest.raises(ValueError):
+        ChannelSimulator(seed=0).apply(random_buffer(1000), 50, 'burst')
+
+def test_erasure_clears_bits_and_counts_changed_ones():
+    bits = random_buffer(1 << 20)
+    received, erased = ChannelSimulator(seed=4).erasure(bits, 0.1)
+    sent, marks = bits.to_array(), erased.to_array()
+    assert marks.mean() == pytest.approx(0.1, rel=0.02)
+    assert np.array_equal(received.to_array(), sent & (1 - marks))
+
+    # apply draws the same erasures and counts only the ones that were 1
+    received_bits, num_errors = ChannelSimulator(seed=4).apply(bits, 10, 'erasure')
+    assert received_bits == received
+    assert num_errors == int((sent & marks).sum())
+
+@pytest.mark.parametrize('model', ChannelSimulator.MODELS)
+def test_seed_fixes_the_noise(model):
+    bits = random_buffer(50_000)
+    first = ChannelSimulator(seed=5).apply(bits, 2, model)
+    second = ChannelSimulator(seed=5).apply(bits, 2, model)
+    other = ChannelSimulator(seed=6).apply(bits, 2, model)
+    assert first == second
+    assert first[0] != other[0]
+
+@pytest.mark.parametrize('model', ChannelSimulator.MODELS)
+def test_out_receives_the_noisy_bits(model):
+    bits = random_buffer(10_001)
+    expected, expected_errors = ChannelSimulator(seed=7).apply(bits, 2, model)
+    out = np.zeros((len(bits) + 7) // 8, dtype=np.uint8)
+    received, num_errors = ChannelSimulator(seed=7).apply(bits, 2, model, out=out)
+    assert received == expected
+    assert num_errors == expected_errors
+    assert np.shares_memory(received.packed, out)
+    assert bits == random_buffer(10_001)
+
+def test_out_of_the_wrong_size_is_rejected():
+    with pytest.raises(ValueError):
+        ChannelSimulator(seed=0).apply(random_buffer(100), 2, 'uniform', out=np.zeros(3, dtype=np.uint8))
+
+@pytest.mark.parametrize('model', ChannelSimulator.MODELS)
+def test_str_bits_come_back_as_str(model):
+    bits = random_buffer(5000)
+    received, num_errors = ChannelSimulator(seed=8).apply(bits.to_str(), 3, model)
+    assert isinstance(received, str)
+    assert sum(a != b for a, b in zip(received, bits.to_str())) == num_errors
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        ChannelSimulator(seed=0).apply(random_buffer(100), 2, 'fading')
+    with pytest.raises(ValueError):
+        CompressionClient(channel_model='fading')
+
+def test_client_accepts_every_model():
+    for model in ChannelSimulator.MODELS:
+        assert CompressionClient(channel_model=model, seed=0).channel_model == model
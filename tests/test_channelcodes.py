@@ -0,0 +1,106 @@
+from itertools import combinations
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer
+from channelcoding import channel_coder_from_parameters, create_channel_coder
+
+def random_bits(length: int, seed: int = 0) -> BitBuffer:
+    return BitBuffer.from_array(np.random.default_rng(seed).integers(0, 2, length, dtype=np.uint8))
+
+def all_messages(k: int) -> BitBuffer:
+    # Every k-bit message once, so each codeword is exercised
+    return BitBuffer.from_array(((np.arange(1 << k)[:, None] >> np.arange(k - 1, -1, -1)) & 1).reshape(-1))
+
+def flip(bits: BitBuffer, positions) -> BitBuffer:
+    array = bits.to_array()
+    array[np.asarray(positions, dtype=np.int64)] ^= 1
+    return BitBuffer.from_array(array)
+
+@pytest.mark.parametrize('name, options', [
+    ('hamming', {}), ('secded', {}), ('reed-muller', {'m': 3}), ('reed-muller', {'m': 5}),
+    ('convolutional', {'rate': '1/2'}), ('convolutional', {'rate': '2/3'}), ('convolutional', {'rate': '3/4'}),
+])
+@pytest.mark.parametrize('length', [1, 13, 1000, 3001])
+def test_clean_round_trip(name, options, length):
+    coder = create_channel_coder(name, **options)
+    data = random_bits(length, length)
+    encoded, parameters = coder.encode(data)
+    assert len(encoded) == coder.encoded_length(length)
+
+    decoder = channel_coder_from_parameters(name, parameters)
+    decoded, errors = decoder.decode(encoded, parameters)
+    assert decoded == data
+    assert errors == 0
+
+    decoded_str, _ = decoder.decode(encoded.to_str(), parameters)
+    assert decoded_str == data.to_str()
+
+@pytest.mark.parametrize('name', ['hamming', 'secded'])
+def test_hamming_corrects_every_single_error(name):
+    coder = create_channel_coder(name)
+    data = all_messages(coder.k)
+    encoded, parameters = coder.encode(data)
+    blocks = len(encoded) // coder.code_length
+    for position in range(coder.code_length):
+        received = flip(encoded, np.arange(blocks) * coder.code_length + position)
+        decoded, errors = coder.decode(received, parameters)
+        assert decoded == data
+        assert errors == blocks
+
+def test_hamming_miscorrects_double_errors():
+    # Distance 3 corrects one error, so two errors decode to the wrong codeword
+    coder = create_channel_coder('hamming')
+    encoded, parameters = coder.encode(all_messages(coder.k))
+    decoded, _, detected = coder.decode_blocks(flip(encoded, [0, 1]).to_array())
+    assert not detected.any()
+    assert not np.array_equal(decoded[0], [0, 0, 0, 0])
+
+def test_secded_detects_every_double_error():
+    coder = create_channel_coder('secded')
+    data = all_messages(coder.k)
+    encoded, _ = coder.encode(data)
+    blocks = len(encoded) // coder.code_length
+    for first, second in combinations(range(coder.code_length), 2):
+        offsets = np.arange(blocks) * coder.code_length
+        received = flip(encoded, np.concatenate([offsets + first, offsets + second]))
+        _, corrected, detected = coder.decode_blocks(received.to_array())
+        assert detected.all()
+        assert not corrected.any()
+
+@pytest.mark.parametrize('m', [3, 4, 5, 6])
+def test_reed_muller_corrects_up_to_half_distance(m):
+    # RM(1,m) has distance 2^(m-1), so any 2^(m-2) - 1 errors per block are corrected
+    coder = create_channel_coder('reed-muller', m=m)
+    correctable = (1 << (m - 2)) - 1
+    data = random_bits(coder.k * 500, m)
+    encoded, parameters = coder.encode(data)
+    rng = np.random.default_rng(m)
+    blocks = len(encoded) // coder.code_length
+    positions = [block * coder.code_length + rng.choice(coder.code_length, correctable, replace=False)
+                 for block in range(blocks)]
+    received = flip(encoded, np.concatenate(positions))
+
+    decoded, errors = coder.decode(received, parameters)
+    assert decoded == data
+    assert errors == correctable * blocks
+
+@pytest.mark.parametrize('rate, spacing', [('1/2', 40), ('2/3', 60), ('3/4', 80)])
+@pytest.mark.parametrize('length', [1024, 2500])
+def test_punctured_viterbi_corrects_sparse_errors(rate, spacing, length):
+    # Errors farther apart than the code's memory are each within half the free distance
+    coder = create_channel_coder('convolutional', rate=rate, frame_chunk=2)
+    data = random_bits(length, length)
+    encoded, parameters = coder.encode(data)
+    assert len(encoded) / length == pytest.approx(1 / coder.rate, rel=0.05)
+    positions = np.arange(spacing // 2, len(encoded), spacing)
+    received = flip(encoded, positions)
+
+    decoded, errors = coder.decode(received, parameters)
+    assert decoded == data
+    assert errors == len(positions)
+
+def test_unknown_codes_and_rates_are_rejected():
+    with pytest.raises(ValueError):
+        create_channel_coder('turbo')
+    with pytest.raises(ValueError):
+        create_channel_coder('convolutional', rate='5/6')
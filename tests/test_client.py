@@ -0,0 +1,48 @@
+import pytest
+from benchmark import local_server
+from cache import LRUCache
+from client import CompressionClient
+import server as server_module
+
+IMAGE = 'images/volume.png'
+
+@pytest.fixture(scope='module')
+def server_url():
+    with local_server() as url:
+        yield url
+
+@pytest.mark.parametrize('wire_format', ['json', 'binary'])
+def test_referenced_table_is_resent_after_eviction(server_url, monkeypatch, wire_format):
+    client = CompressionClient(server_url, wire_format=wire_format, frame_bits=0, seed=1)
+    assert client.send_to_server(client.process_image(IMAGE, 0.0))['sha256_match']
+
+    message = client.process_image(IMAGE, 0.0)
+    model_parameter = client.source_coder.model_parameter
+    assert model_parameter not in message['parameters']
+
+    # The server forgets the table and the client evicts it before the reply comes back
+    monkeypatch.setattr(server_module.server, 'code_tables', LRUCache(maxsize=4))
+    client.sent_tables = LRUCache(maxsize=4)
+    result = client.send_to_server(message)
+    assert result['sha256_match']
+
+def test_missing_referenced_table_raises(server_url, monkeypatch):
+    client = CompressionClient(server_url, frame_bits=0, seed=1)
+    client.send_to_server(client.process_image(IMAGE, 0.0))
+    message = client.process_image(IMAGE, 0.0)
+    message = dict(message)
+
+    monkeypatch.setattr(server_module.server, 'code_tables', LRUCache(maxsize=4))
+    client.sent_tables = LRUCache(maxsize=4)
+    with pytest.raises(ValueError):
+        client.send_to_server(message)
+
+def test_stream_and_retransmit_replies_carry_parse_stage(server_url):
+    client = CompressionClient(server_url, seed=1)
+    result = client.send_streaming(IMAGE, 1.0, chunk_size=8192)
+    assert result['sha256_match']
+    assert {'parse', 'channel_decode', 'source_decode'} <= set(result['stages'])
+
+    reply = client.http.post(f"{server_url}/retransmit", json={'session_id': 'missing', 'frames': [0]}).json()
+    assert reply['unknown_session_id'] == 'missing'
+    assert 'parse' in reply['stages']
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from codetable import PAIR_THRESHOLD, CodeTable
+from fanoshannon import FanoShannon
+
+def fano_table(seed: int = 0, alphabet: int = 256) -> dict:
+    counts = np.random.default_rng(seed).integers(1, 1000, alphabet)
+    return FanoShannon().build_code_table(dict(enumerate(counts.tolist())))
+
+def wide_table() -> dict:
+    # A prefix code whose longest codes use all 64 bits, including the top one
+    table = {symbol: '1' * symbol + '0' for symbol in range(63)}
+    table[63] = '1' * 63 + '0'
+    table[64] = '1' * 64
+    return table
+
+def reference_bits(code_table: dict, symbols) -> str:
+    return ''.join(code_table[int(symbol)] for symbol in symbols)
+
+@pytest.mark.parametrize('code_table', [fano_table(), {65: '0', 66: '10', 67: '11'}, wide_table()])
+def test_round_trip_through_bytes(code_table):
+    table = CodeTable.from_dict(code_table)
+    data = table.to_bytes()
+    # Whatever follows the table in a message is left for the caller
+    restored, position = CodeTable.from_bytes(data + b'trailing')
+    assert position == len(data)
+    assert restored.to_dict() == code_table
+    assert np.array_equal(restored.codes, table.codes)
+
+def test_lengths_only_round_trip():
+    code_table = fano_table(1)
+    table = CodeTable.from_dict(code_table)
+    data = table.to_bytes(lengths_only=True)
+    assert len(data) == 32 + len(code_table)
+    restored, position = CodeTable.from_bytes(data, lengths_only=True)
+    assert position == len(data)
+    assert np.array_equal(restored.lengths, table.lengths)
+    assert not restored.codes.any()
+
+@pytest.mark.parametrize('lengths_only', [False, True])
+def test_empty_table_round_trip(lengths_only):
+    data = CodeTable.from_dict({}).to_bytes(lengths_only)
+    assert data == bytes(32)
+    restored, position = CodeTable.from_bytes(data, lengths_only=lengths_only)
+    assert position == 32
+    assert restored.to_dict() == {}
+    assert restored.max_length == 0
+
+def test_two_byte_alphabet_round_trip():
+    code_table = {symbol * 257: code for symbol, code in fano_table(2, 200).items()}
+    table = CodeTable.from_dict(code_table, 1 << 16)
+    restored, _ = CodeTable.from_bytes(table.to_bytes(), 1 << 16)
+    assert restored.to_dict() == code_table
+
+def test_64_bit_codes_encode_like_strings():
+    code_table = wide_table()
+    table = CodeTable.from_dict(code_table)
+    symbols = np.random.default_rng(3).integers(0, 65, 5000).astype(np.uint8)
+    bits, _ = table.encode(symbols)
+    assert bits.to_str() == reference_bits(code_table, symbols)
+
+def test_codes_over_64_bits_are_rejected():
+    with pytest.raises(ValueError):
+        CodeTable.from_dict({0: '0', 1: '1' * 65})
+
+@pytest.mark.parametrize('size', [PAIR_THRESHOLD, PAIR_THRESHOLD + 1, 3 * PAIR_THRESHOLD + 7])
+@pytest.mark.parametrize('sync_interval', [None, 1 << 12])
+def test_pair_table_matches_single_symbols(size, sync_interval):
+    code_table = fano_table(4)
+    symbols = np.random.default_rng(size).integers(0, 256, size, dtype=np.uint8)
+    # Only uint8 input goes through the pair table, so int64 symbols take the one-at-a-time path
+    paired = CodeTable.from_dict(code_table).encode(symbols, sync_interval=sync_interval)
+    single = CodeTable.from_dict(code_table).encode(symbols.astype(np.int64), sync_interval=sync_interval)
+    assert paired[0] == single[0]
+    assert paired[1] == single[1]
+    assert paired[0].to_str() == reference_bits(code_table, symbols)
+
+def test_built_pair_table_serves_short_inputs():
+    code_table = fano_table(5)
+    table = CodeTable.from_dict(code_table)
+    table.pairs()
+    symbols = np.random.default_rng(5).integers(0, 256, 999, dtype=np.uint8)
+    bits, _ = table.encode(symbols)
+    assert bits.to_str() == reference_bits(code_table, symbols)
+
+def test_long_codes_skip_the_pair_table():
+    # Pairs of codes over 32 bits would not fit a 64-bit word, so the single path is used
+    code_table = wide_table()
+    table = CodeTable.from_dict(code_table)
+    symbols = np.random.default_rng(6).integers(0, 65, PAIR_THRESHOLD, dtype=np.uint8)
+    bits, _ = table.encode(symbols)
+    assert table._pairs is None
+    assert bits == CodeTable.from_dict(code_table).encode(symbols.astype(np.int64))[0]
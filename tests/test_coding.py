@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer
+from coding import OrthogonalCoding, fast_walsh_hadamard, packed_walsh_hadamard
+
+def sylvester(n: int) -> np.ndarray:
+    H = np.array([[1]])
+    for _ in range(n):
+        H = np.block([[H, H], [H, -H]])
+    return H
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 7, 9])
+def test_fwht_matches_matrix_product(n):
+    rng = np.random.default_rng(n)
+    x = rng.integers(-4, 5, size=(6, 1 << n))
+    assert np.array_equal(fast_walsh_hadamard(x), x @ sylvester(n).T)
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 7, 9])
+def test_decode_blocks_matches_brute_force_correlation(n):
+    rng = np.random.default_rng(n)
+    coder = OrthogonalCoding(n=n)
+    H = sylvester(n)
+    rows = rng.integers(0, 1 << n, size=200)
+    received = ((H[rows] + 1) // 2).astype(np.uint8)
+    # Enough flips that some blocks decode to the wrong row, which must still be the best correlated one
+    flips = rng.random(received.shape) < 0.3
+    received ^= flips.astype(np.uint8)
+
+    correlations = (2 * received.astype(np.int64) - 1) @ H.T
+    best_rows = np.argmax(correlations, axis=1)
+    expected_errors = (coder.code_length - correlations.max(axis=1)) // 2
+
+    decoded, errors = coder.decode_blocks(received)
+    decoded_rows = decoded.astype(np.int64) @ (1 << np.arange(n - 1, -1, -1))
+    assert np.array_equal(decoded_rows, best_rows)
+    assert np.array_equal(errors, expected_errors)
+
+@pytest.mark.parametrize('n', [3, 4, 7, 8, 9, 10])
+def test_packed_transform_matches_bitwise_transform(n):
+    # n up to 8 uses the matrix product, longer blocks continue the butterflies
+    received = np.random.default_rng(n).integers(0, 2, size=(50, 1 << n), dtype=np.uint8)
+    correlations = packed_walsh_hadamard(np.packbits(received), 1 << n)
+    assert correlations.dtype == np.int32
+    assert np.array_equal(correlations, fast_walsh_hadamard(2 * received.astype(np.int32) - 1))
+
+@pytest.mark.parametrize('n', [2, 3, 7, 9])
+def test_encoded_blocks_are_sylvester_rows(n):
+    coder = OrthogonalCoding(n=n)
+    rows = np.arange(1 << n)
+    data = ((rows[:, None] >> np.arange(n - 1, -1, -1)) & 1).astype(np.uint8).reshape(-1)
+    encoded, _ = coder.encode(BitBuffer.from_array(data))
+    assert np.array_equal(encoded.to_array().reshape(-1, 1 << n), (sylvester(n) + 1) // 2)
+
+@pytest.mark.parametrize('n', [3, 7])
+def test_round_trip_corrects_errors_below_half_distance(n):
+    rng = np.random.default_rng(0)
+    coder = OrthogonalCoding(n=n)
+    data = BitBuffer.from_array(rng.integers(0, 2, 1000, dtype=np.uint8))
+    encoded, parameters = coder.encode(data)
+
+    received = encoded.to_array().reshape(-1, coder.code_length)
+    # Rows differ in 2^(n-1) places, so fewer than 2^(n-2) flips per block always decode
+    correctable = coder.code_length // 4 - 1
+    for block in received:
+        block[rng.choice(coder.code_length, correctable, replace=False)] ^= 1
+
+    decoded, errors = coder.decode(BitBuffer.from_array(received.reshape(-1)), parameters)
+    assert decoded == data
+    assert errors == correctable * len(received)
+
+def test_string_blocks_match_packed_blocks():
+    coder = OrthogonalCoding(n=5)
+    assert coder.decode_block(coder.encode_block('10110')) == '10110'
+    encoded, parameters = coder.encode('1011001')
+    assert isinstance(encoded, str)
+    assert coder.decode(encoded, parameters)[0] == '1011001'
+
+def test_rejects_unsupported_dimension():
+    with pytest.raises(ValueError):
+        OrthogonalCoding(n=0)
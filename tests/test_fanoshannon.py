@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer
+from fanoshannon import FanoDecoder, FanoShannon
+
+def skewed_data(seed: int = 0) -> bytes:
+    # Halving counts give codes well past the 12-bit root table, so subtables are exercised
+    counts = [1 << (16 - k) for k in range(16)] + [1] * 40
+    symbols = np.repeat(np.arange(len(counts), dtype=np.uint8), counts)
+    return np.random.default_rng(seed).permutation(symbols).tobytes()
+
+def uniform_data(size: int = 50_000, seed: int = 0) -> bytes:
+    return np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+
+@pytest.mark.parametrize('data', [skewed_data(), uniform_data(), b'ab', b'abracadabra' * 100])
+def test_table_decoder_matches_bitwise_decoder(data):
+    coder = FanoShannon()
+    compressed, code_table = coder.compress(data, packed=True)
+
+    packed = coder.decompress(compressed, code_table)
+    bitwise = coder.decompress(compressed.to_str(), code_table)
+    assert packed == bitwise == data
+
+def test_single_symbol_and_empty_inputs():
+    coder = FanoShannon()
+    for data in (b'', b'x', b'x' * 1000):
+        compressed, code_table = coder.compress(data, packed=True)
+        assert coder.decompress(compressed, code_table, len(data)) == data
+
+@pytest.mark.parametrize('table_bits', [1, 3, 8, 12])
+def test_nested_tables_decode_every_code(table_bits):
+    coder = FanoShannon()
+    data = skewed_data(1)
+    compressed, code_table = coder.compress(data, packed=True)
+    assert max(map(len, code_table.values())) > 12
+    root = coder.build_decode_table(code_table, table_bits)
+    symbols, consumed = coder._decode_symbols(root, compressed)
+    assert bytes(symbols) == data
+    assert consumed == len(compressed)
+
+def test_streaming_feed_matches_whole_stream():
+    coder = FanoShannon()
+    data = skewed_data(2)
+    compressed, code_table = coder.compress(data, packed=True)
+
+    decoder = FanoDecoder(coder, code_table, total_bits=len(compressed))
+    cuts = [0, 1, 9, 1000, 1003, 40_000, len(compressed)]
+    result = b''.join(decoder.feed(compressed[start:stop]) for start, stop in zip(cuts, cuts[1:]))
+    decoder.finish()
+    assert result == data
+    assert len(decoder.pending) == 0
+
+def test_truncated_stream_keeps_incomplete_code_pending():
+    coder = FanoShannon()
+    data = skewed_data(3)
+    compressed, code_table = coder.compress(data, packed=True)
+    longest = max(code_table, key=lambda symbol: len(code_table[symbol]))
+    code = code_table[longest]
+
+    decoder = FanoDecoder(coder, code_table)
+    assert decoder.feed(BitBuffer.from_str(code[:-1])) == b''
+    assert decoder.feed(BitBuffer.from_str(code[-1])) == bytes([longest])
+
+def test_two_byte_symbols():
+    coder = FanoShannon(symbol_size=2)
+    data = uniform_data(4000)
+    compressed, code_table = coder.compress(data, packed=True)
+    assert coder.decompress(compressed, code_table, len(data)) == data
+
+@pytest.mark.parametrize('symbol_size, data', [
+    (1, skewed_data(4)), (1, uniform_data(200_000)), (2, uniform_data(100_000)), (1, b'abracadabra' * 20_000),
+])
+def test_lane_decoder_matches_nested_table(symbol_size, data):
+    coder = FanoShannon(symbol_size=symbol_size)
+    compressed, code_table = coder.compress(data, packed=True)
+    flat = coder.build_flat_decode_table(code_table)
+    root = coder.build_decode_table(code_table)
+    # Cutting the stream short leaves an incomplete code at the end of the last lane
+    for cut in (0, 1, 7, 1001):
+        bits = compressed[:len(compressed) - cut]
+        assert len(bits) >= 1 << 15
+        symbols, consumed = coder._decode_lanes(flat, bits)
+        expected, expected_consumed = coder._decode_symbols(root, bits)
+        assert coder._symbols_to_bytes(symbols) == coder._symbols_to_bytes(expected)
+        assert consumed == expected_consumed
+
+def test_lane_decoder_uses_second_tables_for_long_codes():
+    coder = FanoShannon()
+    data = skewed_data(5)
+    compressed, code_table = coder.compress(data, packed=True)
+    symbols, lengths, width, links, link_widths = coder.build_flat_decode_table(code_table)
+    assert max(map(len, code_table.values())) > width
+    assert links.any()
+    assert coder.decompress(compressed, code_table) == data
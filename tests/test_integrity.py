@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from benchmark import local_server
+from bitbuffer import BitBuffer
+from channelcoding import CHANNEL_CODES
+from client import CompressionClient
+from integrity import failed_frames, frame_bits_for, frame_checksums, frame_spans
+import server as server_module
+
+IMAGE = 'images/volume.png'
+
+@pytest.fixture(scope='module')
+def server_url():
+    with local_server() as url:
+        yield url
+
+def random_bits(length: int, seed: int = 0) -> BitBuffer:
+    return BitBuffer.from_array(np.random.default_rng(seed).integers(0, 2, length, dtype=np.uint8))
+
+def test_failed_frames_finds_corrupted_frames():
+    bits = random_bits(10_000)
+    checksums = frame_checksums(bits, 1024)
+    packed = bits.packed.copy()
+    packed[[0, 700]] ^= 1
+    assert failed_frames(BitBuffer(packed, len(bits)), 1024, checksums) == [0, 5]
+    assert failed_frames(bits, 1024, checksums) == []
+
+@pytest.mark.parametrize('name', list(CHANNEL_CODES))
+def test_frames_encode_to_slices_of_the_whole_encoding(name):
+    # Retransmission encodes failed frames on their own, which must reproduce the original bits
+    coder = CHANNEL_CODES[name]()
+    bits = random_bits(100_000 + 24, seed=1)
+    encoded, _ = coder.encode(bits)
+    frame_bits = frame_bits_for(coder, 1 << 13)
+    position = 0
+    for start, stop in frame_spans(len(bits), frame_bits):
+        frame, _ = coder.encode(bits[start:stop])
+        assert frame == encoded[position:position + len(frame)]
+        position += len(frame)
+    assert position == len(encoded)
+
+@pytest.mark.parametrize('wire_format', ['json', 'binary'])
+def test_failed_frames_are_retransmitted(server_url, wire_format):
+    client = CompressionClient(server_url, wire_format=wire_format, channel_code='hamming',
+                               frame_bits=4096, seed=3)
+    result = client.send_to_server(client.process_image(IMAGE, 0.3))
+    assert result['sha256_match']
+    assert result['retransmitted_frames'] > 0
+    assert len(client.sent_frames) == 0
+
+def test_lost_session_resends_the_whole_message(server_url, monkeypatch):
+    sessions = server_module.server.sessions
+    original_get = sessions.get
+    lost = []
+
+    def get_once_lost(key, default=None):
+        if not lost:
+            lost.append(key)
+            return default
+        return original_get(key, default)
+
+    monkeypatch.setattr(sessions, 'get', get_once_lost)
+    client = CompressionClient(server_url, channel_code='hamming', frame_bits=4096, seed=3)
+    result = client.send_to_server(client.process_image(IMAGE, 0.3))
+    assert lost
+    assert result['sha256_match']
+    assert len(client.sent_frames) == 0
+
+def test_frames_are_dropped_when_the_server_is_unreachable():
+    client = CompressionClient('http://127.0.0.1:1', frame_bits=4096, seed=1)
+    assert client.send_to_server(client.process_image(IMAGE, 0.5)) is None
+    assert len(client.sent_frames) == 0
+
+def test_frames_over_budget_are_not_held():
+    client = CompressionClient(frame_bits=4096, seed=1, max_held_bytes=1000)
+    client.process_image(IMAGE, 0.5)
+    assert len(client.sent_frames) == 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer
+from coding import OrthogonalCoding
+from fanoshannon import FanoShannon
+from parallel import ParallelDecoder
+
+@pytest.fixture(scope='module')
+def decoder():
+    decoder = ParallelDecoder(workers=2, min_blocks=16)
+    yield decoder
+    decoder.close()
+
+def sample_data(size: int = 200_000) -> bytes:
+    rng = np.random.default_rng(0)
+    return np.clip(rng.normal(128, 20, size), 0, 255).astype(np.uint8).tobytes()
+
+def test_decode_channel_matches_serial_decoder(decoder):
+    coder = OrthogonalCoding(n=7)
+    bits = BitBuffer.from_array(np.random.default_rng(1).integers(0, 2, 70_000, dtype=np.uint8))
+    encoded, parameters = coder.encode(bits)
+    received = encoded.to_array()
+    received[::97] ^= 1
+    received = BitBuffer.from_array(received)
+
+    assert decoder.decode_channel(received, parameters) == coder.decode(received, parameters)
+
+def test_decompress_splits_at_sync_points(decoder):
+    data = sample_data()
+    coder = FanoShannon(sync_interval=1 << 14)
+    compressed, code_table = coder.compress(data, packed=True)
+    assert len(coder.sync_points) > 2
+    assert decoder.decompress(compressed, code_table, 1, coder.sync_points) == data
+
+def test_wrong_sync_point_falls_back_to_serial_decoding(decoder):
+    data = sample_data()
+    coder = FanoShannon(sync_interval=1 << 14)
+    compressed, code_table = coder.compress(data, packed=True)
+    sync_points = list(coder.sync_points)
+    sync_points[2] += 1
+    assert decoder.decompress(compressed, code_table, 1, sync_points) == data
@@ -0,0 +1,119 @@
+import io
+import numpy as np
+import pytest
+from bitbuffer import BitBuffer
+from protocol import (HEADER, BinaryMessage, allocate_message, finish_message, iter_stream_frames,
+                      pack_batch, pack_message, pack_stream_frame, pack_stream_header, pack_stream_trailer,
+                      read_stream_header, unpack_batch, unpack_message)
+from sourcecoding import SOURCE_CODERS, create_source_coder
+from utils import analyze_bytes
+
+def sample_data(size: int = 20_000, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(128, 20, size), 0, 255).astype(np.uint8).tobytes()
+
+def build_message(algorithm: str, data: bytes, errors: int = 3) -> dict:
+    coder = create_source_coder(algorithm)
+    bits, code_table = coder.compress(data, packed=True)
+    stats = analyze_bytes(data)
+    parameters = {
+        coder.model_parameter: coder.export_model(code_table),
+        'encoding_params': {'n': 7, 'original_length': len(bits), 'padding_added': 2,
+                            'crc_frame_bits': 4096, 'frame_crcs': [1, 2, 3]},
+        'compressed_length': len(bits),
+        'symbol_size': 1,
+        'original_size': len(data),
+        'message_id': 'abc123'
+    }
+    if coder.sync_points:
+        parameters['sync_interval'] = coder.sync_interval
+        parameters['sync_points'] = coder.sync_points
+    return {
+        'compression_algorithm': algorithm,
+        'encoding': 'orthogonal',
+        'parameters': parameters,
+        'errors': errors,
+        'payload': bits.to_bytes(),
+        'payload_bits': len(bits),
+        'SHA256': stats.sha256,
+        'entropy': stats.entropy
+    }
+
+def assert_same_message(unpacked: dict, message: dict):
+    for key in ('compression_algorithm', 'encoding', 'errors', 'payload_bits', 'SHA256', 'entropy'):
+        assert unpacked[key] == message[key]
+    assert bytes(unpacked['payload']) == bytes(message['payload'])
+    for key in ('compressed_length', 'symbol_size', 'original_size', 'message_id', 'encoding_params'):
+        assert unpacked['parameters'][key] == message['parameters'][key]
+
+@pytest.mark.parametrize('algorithm', list(SOURCE_CODERS))
+def test_message_round_trip_decodes(algorithm):
+    data = sample_data()
+    message = build_message(algorithm, data)
+    unpacked = unpack_message(pack_message(message))
+    assert_same_message(unpacked, message)
+
+    coder = create_source_coder(algorithm)
+    parameters = unpacked['parameters']
+    for key in ('sync_interval', 'sync_points'):
+        if key in parameters:
+            setattr(coder, key, parameters[key])
+    code_table = coder.import_model(parameters[coder.model_parameter])
+    compressed = BitBuffer(unpacked['payload'], unpacked['payload_bits'])
+    assert coder.decompress(compressed, code_table, parameters['original_size']) == data
+
+def test_message_without_model_references_a_cached_table():
+    message = build_message('huffman', sample_data())
+    del message['parameters']['code_lengths']
+    unpacked = unpack_message(pack_message(message))
+    assert 'code_lengths' not in unpacked['parameters']
+    assert_same_message(unpacked, message)
+
+def test_allocated_message_matches_packed_message():
+    message = build_message('fano-shannon', sample_data())
+    built = BinaryMessage({key: value for key, value in message.items() if key != 'payload'})
+    built.body, view = allocate_message(built, len(message['payload']))
+    view[:] = message['payload']
+    finish_message(built.body, message['errors'], message['payload_bits'])
+
+    assert pack_message(built) is built.body
+    assert bytes(built.body) == bytes(pack_message(message))
+
+def test_copied_binary_message_is_packed_again():
+    message = build_message('fano-shannon', sample_data())
+    built = BinaryMessage(message)
+    built.body = pack_message(message)
+    changed = dict(built, errors=0)
+    assert unpack_message(pack_message(changed))['errors'] == 0
+
+def test_stream_round_trip():
+    message = build_message('fano-shannon', sample_data())
+    header = {key: value for key, value in message.items() if key not in ('payload', 'payload_bits')}
+    frames = [b'abc', b'', b'\x00' * 1000]
+    stream = io.BytesIO(pack_stream_header(header) + b''.join(pack_stream_frame(frame) for frame in frames if frame)
+                        + pack_stream_trailer(42))
+
+    received = read_stream_header(stream)
+    assert list(iter_stream_frames(stream, received)) == [frame for frame in frames if frame]
+    assert received['errors'] == 42
+    assert received['SHA256'] == message['SHA256']
+
+def test_batch_round_trip():
+    messages = [build_message(algorithm, sample_data(seed=i)) for i, algorithm in enumerate(SOURCE_CODERS)]
+    unpacked = unpack_batch(pack_batch(messages))
+    assert len(unpacked) == len(messages)
+    for received, message in zip(unpacked, messages):
+        assert_same_message(received, message)
+
+def test_rejects_malformed_messages():
+    packed = bytes(pack_message(build_message('fano-shannon', sample_data())))
+    with pytest.raises(ValueError):
+        unpack_message(packed[:HEADER.size - 1])
+    with pytest.raises(ValueError):
+        unpack_message(b'XXXX' + packed[4:])
+    with pytest.raises(ValueError):
+        unpack_message(packed[:4] + bytes([99]) + packed[5:])
+    with pytest.raises(ValueError):
+        unpack_batch(pack_stream_frame(packed)[:-1])
+    with pytest.raises(ValueError):
+        read_stream_header(io.BytesIO(packed[:10]))
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sourcecoding import create_source_coder, negotiate
+
+CODERS = ['fano-shannon', 'huffman', 'rans', 'adaptive-fano', 'context-fano']
+ONE_BYTE_ONLY = {'rans', 'adaptive-fano', 'context-fano'}
+
+def skewed(size: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(128, 12, size), 0, 255).astype(np.uint8).tobytes()
+
+INPUTS = {
+    'empty': b'',
+    'one byte': b'\x07',
+    'single symbol': b'\x07' * 1000,
+    'all 256 once': bytes(range(256)),
+    'all 256 shuffled': np.random.default_rng(1).permutation(np.tile(np.arange(256, dtype=np.uint8), 40)).tobytes(),
+    'skewed': skewed(300_000),
+}
+
+def round_trip(name: str, data: bytes, packed: bool = True) -> bytes:
+    coder = create_source_coder(name)
+    compressed, code_table = coder.compress(data, packed=packed)
+    # The decoder only sees what goes over the wire: the exported model and the sync points
+    decoder = create_source_coder(name)
+    decoder.sync_points = coder.sync_points
+    return decoder.decompress(compressed, decoder.import_model(coder.export_model(code_table)), len(data))
+
+@pytest.mark.parametrize('name', CODERS)
+@pytest.mark.parametrize('label', list(INPUTS))
+def test_round_trip(name, label):
+    assert round_trip(name, INPUTS[label]) == INPUTS[label]
+
+@pytest.mark.parametrize('name', CODERS)
+def test_compresses_skewed_data_near_entropy(name):
+    data = INPUTS['skewed']
+    coder = create_source_coder(name)
+    compressed, _ = coder.compress(data, packed=True)
+    counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+    probabilities = counts[counts > 0] / len(data)
+    entropy_bits = -(probabilities * np.log2(probabilities)).sum() * len(data)
+    assert entropy_bits <= len(compressed) <= entropy_bits * 1.05 + 64
+
+@pytest.mark.parametrize('name', CODERS)
+def test_string_bits_match_packed_bits(name):
+    data = INPUTS['all 256 shuffled']
+    coder = create_source_coder(name)
+    packed, _ = coder.compress(data, packed=True)
+    if coder.prefix_code:
+        assert coder.compress(data)[0] == packed.to_str()
+    assert round_trip(name, data, packed=False) == data
+
+@pytest.mark.parametrize('name', CODERS)
+def test_two_byte_symbols(name):
+    data = skewed(20_000, seed=2)
+    if name in ONE_BYTE_ONLY:
+        with pytest.raises(ValueError):
+            create_source_coder(name, symbol_size=2)
+        return
+    coder = create_source_coder(name, symbol_size=2)
+    compressed, code_table = coder.compress(data, packed=True)
+    assert coder.decompress(compressed, code_table, len(data)) == data
+
+def compressed_bits(name: str, data: bytes) -> int:
+    coder = create_source_coder(name)
+    return len(coder.compress(data, packed=True)[0])
+
+def test_adaptive_fano_follows_changing_statistics():
+    # Each 64 KiB block uses its own narrow band of byte values
+    rng = np.random.default_rng(3)
+    data = b''.join((rng.integers(0, 16, 1 << 16) + 16 * block).astype(np.uint8).tobytes() for block in range(6))
+    assert round_trip('adaptive-fano', data) == data
+    assert compressed_bits('adaptive-fano', data) < 0.65 * compressed_bits('fano-shannon', data)
+
+def test_context_fano_uses_the_previous_byte():
+    # Each byte is close to the one before it, which an order-0 code cannot see
+    rng = np.random.default_rng(4)
+    data = np.cumsum(rng.integers(-2, 3, 200_000)).astype(np.uint8).tobytes()
+    assert round_trip('context-fano', data) == data
+    assert compressed_bits('context-fano', data) < 0.5 * compressed_bits('fano-shannon', data)
+
+def test_negotiation_picks_first_common_coder():
+    assert negotiate(['rans', 'huffman'], ['huffman', 'fano-shannon']) == 'huffman'
+    with pytest.raises(ValueError):
+        negotiate(['rans'], ['huffman'])
+    with pytest.raises(ValueError):
+        create_source_coder('lzw')
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from client import CompressionClient
+from server import CompressionServer
+
+def write_image(tmp_path, size: int) -> str:
+    path = tmp_path / f"stream-{size}.bmp"
+    path.write_bytes(np.random.default_rng(size).integers(0, 40, size, dtype=np.uint8).tobytes())
+    return str(path)
+
+@pytest.fixture(scope='module')
+def server():
+    return CompressionServer()
+
+@pytest.mark.parametrize('size', [70001, 12345])
+@pytest.mark.parametrize('depth', [0, 3, 4])
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 7])
+def test_stream_round_trip(tmp_path, server, n, depth, size):
+    client = CompressionClient(n=n, interleave_depth=depth, seed=1)
+    header, frames = client.process_image_stream(write_image(tmp_path, size), 0.0, chunk_size=5000)
+    result = server.decode_stream(header, frames)
+    assert result['success']
+    assert result['sha256_match']
+
+@pytest.mark.parametrize('depth', [0, 4])
+def test_stream_corrects_channel_errors(tmp_path, server, depth):
+    client = CompressionClient(n=7, interleave_depth=depth, seed=2)
+    header, frames = client.process_image_stream(write_image(tmp_path, 50_000), 5.0, chunk_size=8192)
+    result = server.decode_stream(header, frames)
+    assert result['sha256_match']
+    assert result['errors_corrected'] == header['errors'] > 0
+
+def test_stream_rejects_codes_the_server_cannot_stream(tmp_path):
+    client = CompressionClient(channel_code='hamming')
+    with pytest.raises(ValueError):
+        client.process_image_stream(write_image(tmp_path, 1000))
@@ -1,25 +1,66 @@
-from collections import Counter
 import hashlib
 import mimetypes
 import math
+import mmap
+import os
 import base64
 import random
+import numpy as np
 from typing import Tuple
+from bitbuffer import BitBuffer, Bits
 
 def calculate_entropy(data: bytes) -> float:
         if not data:
             return 0
         
-        counter = Counter(data)
-        total = len(data)
-        entropy = 0
+        return entropy_from_histogram(byte_histogram(data), len(data))
 
-        for count in counter.values():
-            probability = count/total
-            if probability>0:
-                entropy -= probability * math.log2(probability)
+def byte_histogram(data) -> np.ndarray:
+    return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
 
-        return entropy
+def entropy_from_histogram(histogram: np.ndarray, total: int) -> float:
+    if not total:
+        return 0
+    probabilities = histogram[histogram > 0] / total
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+# Histogram, entropy and SHA-256 in one pass: each chunk is hashed and counted while it is
+# still in cache, and chunks can be fed one at a time as they are read
+class ByteStatistics:
+    def __init__(self, chunk_size: int = 1 << 20):
+        self.chunk_size = chunk_size
+        self.histogram = np.zeros(256, dtype=np.int64)
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def update(self, data) -> 'ByteStatistics':
+        view = memoryview(data).cast('B')
+        for start in range(0, len(view), self.chunk_size):
+            chunk = view[start:start + self.chunk_size]
+            self.hasher.update(chunk)
+            self.histogram += byte_histogram(chunk)
+        self.size += len(view)
+        return self
+
+    @property
+    def sha256(self) -> str:
+        return self.hasher.hexdigest()
+
+    @property
+    def entropy(self) -> float:
+        return entropy_from_histogram(self.histogram, self.size)
+
+    def frequencies(self) -> dict:
+        return {int(symbol): int(self.histogram[symbol]) for symbol in np.flatnonzero(self.histogram)}
+
+def analyze_bytes(data, chunk_size: int = 1 << 20) -> ByteStatistics:
+    return ByteStatistics(chunk_size).update(data)
+
+def binomial_tail(n: int, t: int, p: float) -> float:
+    # Probability that more than t of n independent bits are flipped
+    if p <= 0:
+        return 0.0
+    return max(0.0, 1.0 - sum(math.comb(n, i) * p**i * (1 - p)**(n - i) for i in range(t + 1)))
 
 def calculate_sha256(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
@@ -28,29 +69,49 @@ def check_mime_type(file_path: str) -> bool:
     mime_type, _ = mimetypes.guess_type(file_path)
     return mime_type is not None and mime_type.startswith('image/')
 
+def map_file(file_path: str) -> memoryview:
+    # Pages are read on demand and stay in the page cache instead of a private copy; the view keeps the map open
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b'')
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
 def transform_to_base64(data: bytes) -> str:
     return base64.b64encode(data).decode('utf-8')
 
 def transform_from_base64(base64_string: str) -> bytes:
     return base64.b64decode(base64_string.encode('utf-8'))
 
-def add_errors(data: str, error_percentage: float) -> Tuple[str, int]:
+def add_errors(data: Bits, error_percentage: float) -> Tuple[Bits, int]:
         if not data or error_percentage <= 0:
             return data, 0
         
-        data_list = list(data)
-        num_errors = int(len(data) * error_percentage / 100)
-        error_positions = random.sample(range(len(data)), min(num_errors, len(data)))
+        num_errors = min(int(len(data) * error_percentage / 100), len(data))
+        # Seeded from random so random.seed() still fixes the positions; a small share of a long
+        # stream is drawn without building a permutation of every bit position
+        rng = np.random.default_rng(random.getrandbits(64))
+        positions = np.sort(rng.choice(len(data), num_errors, replace=False))
+        
+        if isinstance(data, BitBuffer):
+            packed = data.packed.copy()
+            np.bitwise_xor.at(packed, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+            return BitBuffer(packed, data.length), num_errors
         
-        for pos in error_positions:
+        data_list = list(data)
+        for pos in positions.tolist():
             data_list[pos] = '1' if data_list[pos] == '0' else '0'
         
-        return ''.join(data_list), len(error_positions)
+        return ''.join(data_list), num_errors
 
-def bytes_to_bits(data: bytes) -> str:
+def bytes_to_bits(data: bytes, packed: bool = False) -> Bits:
+        if packed:
+            return BitBuffer.from_bytes(data)
         return ''.join(format(byte, '08b') for byte in data)
     
-def bits_to_bytes(bits: str) -> bytes:
+def bits_to_bytes(bits: Bits) -> bytes:
+    if isinstance(bits, BitBuffer):
+        return bits.to_bytes()
+    
     while len(bits) % 8 != 0:
         bits += '0'
     
@@ -86,12 +147,26 @@ def pkcs7_unpad(padded_data: bytes) -> bytes:
     
     return padded_data[:-padding_length]
 
-def bits_to_bytes_with_padding(bits: str, block_size: int = 16) -> bytes:
+def bits_to_bytes_with_padding(bits: Bits, block_size: int = 16) -> bytes:
     byte_data = bits_to_bytes(bits)
     
     return pkcs7_pad(byte_data, block_size)
 
-def bytes_to_bits_with_unpadding(padded_data: bytes) -> str:
+def pad_bits(bits: BitBuffer, block_size: int = 16) -> BitBuffer:
+    # Same result as bytes_to_bits(bits_to_bytes_with_padding(bits)), written into one buffer
+    if block_size <= 0 or block_size > 255:
+        raise ValueError("Block size must be between 1 and 255")
+    
+    num_bytes = (len(bits) + 7) // 8
+    padding_length = block_size - num_bytes % block_size
+    padded = np.empty(num_bytes + padding_length, dtype=np.uint8)
+    padded[:num_bytes] = bits.packed[:num_bytes]
+    if len(bits) % 8:
+        padded[num_bytes - 1] &= (0xFF << (8 - len(bits) % 8)) & 0xFF
+    padded[num_bytes:] = padding_length
+    return BitBuffer(padded)
+
+def bytes_to_bits_with_unpadding(padded_data: bytes, packed: bool = False) -> Bits:
     unpadded_data = pkcs7_unpad(padded_data)
     
-    return bytes_to_bits(unpadded_data)
\ No newline at end of file
+    return bytes_to_bits(unpadded_data, packed)
\ No newline at end of file